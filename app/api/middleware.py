@@ -0,0 +1,73 @@
+import time
+from typing import Any, Dict
+
+from app.core.metrics import REQUEST_DURATION
+
+
+def route_template(scope: Dict[str, Any], root_path: str = "") -> str:
+    """
+    Rebuild the path template of a matched request, e.g. /code/status/{job_id}
+
+    Path parameter values are put back as their names, which works the
+    same for nested routers and mounts. Requests that matched no route are
+    grouped as "unmatched" to keep the number of series bounded.
+    
+    Args:
+        scope: ASGI scope after the request was routed
+        root_path: Root path before routing, a longer one means a mounted app served the request
+    """
+    params = scope.get("path_params") or {}
+    if scope.get("route") is None and not params:
+        mount = scope.get("root_path", "")[len(root_path):]
+        return f"{mount}/{{path}}" if mount else "unmatched"
+    path = scope.get("path", "")
+    for name, value in sorted(params.items(), key=lambda item: -len(str(item[1]))):
+        value = str(value)
+        start = path.rfind("/" + value)
+        end = start + len(value) + 1
+        if value and start >= 0 and (end == len(path) or path[end] == "/"):
+            path = path[:start + 1] + "{" + name + "}" + path[end:]
+    return path
+
+
+class RequestMetricsMiddleware:
+    """
+    Records request latency by route template
+
+    Latency is measured until the response starts, so streamed answers and
+    job status streams count their time to first byte rather than their
+    whole lifetime. Routes are labelled by their path template rather than
+    the requested path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            REQUEST_DURATION.labels(scope["method"], route_template(scope, root_path), status).observe(
+                time.perf_counter() - started
+            )
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            record(500)
+            raise
\ No newline at end of file
@@ -1,9 +1,13 @@
 from fastapi import APIRouter
 from app.api.routes.code_routes import router as code_router
+from app.api.routes.qa_routes import router as qa_router
+from app.api.routes.log_routes import router as log_router
 
 # Create main API router
 api_router = APIRouter()
 
 
 # Include all route modules
-api_router.include_router(code_router, prefix="/code", tags=["code"])
\ No newline at end of file
+api_router.include_router(code_router, prefix="/code", tags=["code"])
+api_router.include_router(qa_router, prefix="/qa", tags=["qa"])
+api_router.include_router(log_router, prefix="/logs", tags=["logs"])
\ No newline at end of file
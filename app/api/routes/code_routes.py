@@ -1,22 +1,40 @@
 import os
-import tempfile
-from typing import Optional, List
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
-from pydantic import BaseModel, HttpUrl
+import json
+from typing import Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 
-from app.services.processing_service import get_status
+from app.services.processing_service import get_status, list_jobs, watch_status
 from app.services.code_service import CodeService
-from app.services.processing_service import create_job
+from app.services.retrieval_service import RetrievalService
+from app.services.processing_service import create_job, fail_job
+from app.services.job_scheduler import get_scheduler, QueueFullError
+from app.services.job_profiler import PROFILE_FORMATS, load_summary, profile_path, run_profiled, should_profile
+from app.core.archive_stream import supported_extensions
+from app.core.embedding_cache import get_embedding_cache
+from app.core.collection_registry import get_collection_registry
+from app.core.symbol_index import SymbolIndex
+from app.core.sharding import open_vector_store, shard_layout
 from app.schemas.code_routes import (
     GithubRepo,
     ProcessingResponse, 
     ProcessingStatusResponse,
     JobResponse,
-    ReIndexRequest
+    ReIndexRequest,
+    EmbeddingCacheStatsResponse,
+    CollectionInfoResponse,
+    VectorIndexRequest,
+    VectorIndexResponse,
+    RecallResponse,
+    JobListResponse,
+    SchedulerStatsResponse,
+    SearchRequest,
+    SearchResponse,
+    SymbolDefinitionsResponse,
+    SymbolReferencesResponse
 )
 from app.tasks.background_tasks import (
-    process_zip_file,
-    process_rar_file,
+    process_archive_file,
     process_github_repo,
     process_code_files
 )
@@ -24,84 +42,112 @@ from app.tasks.background_tasks import (
 router = APIRouter()
 
 
-@router.post("/upload/zip", response_model=ProcessingResponse)
-async def upload_zip_file(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    project_name: Optional[str] = Form(None)
-):
-    """Upload and process a zip file containing code"""
-    if not file.filename.lower().endswith('.zip'):
-        raise HTTPException(status_code=400, detail="File must be a zip file")
+def _too_busy(error: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def _check_capacity(job_type: str) -> None:
+    """Reject a submission up front, before any upload is written to disk"""
+    try:
+        get_scheduler().check_capacity(job_type)
+    except QueueFullError as e:
+        raise _too_busy(e)
+
+def _create_job(name: Optional[str], job_type: str) -> Tuple[str, str]:
+    """Create a job, rejecting collection names that are not safe as directory names"""
+    try:
+        return create_job(name, job_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _schedule(job_type: str, job_id: str, task, *args, temp_file: Optional[str] = None, profile: bool = False) -> None:
+    """Hand a job to the ingest scheduler, failing it cleanly if the queue filled up meanwhile"""
+    if should_profile(profile):
+        task, args = run_profiled, (job_id, task) + args
+    try:
+        get_scheduler().submit(job_type, job_id, task, *args)
+    except QueueFullError as e:
+        fail_job(job_id=job_id, error_message=str(e))
+        if temp_file and os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise _too_busy(e)
+
+
+async def _upload_archive(file: UploadFile, project_name: Optional[str], job_type: str, profile: bool) -> ProcessingResponse:
+    """Save an uploaded archive and schedule it for indexing"""
+    _check_capacity(job_type)
     
     # Create job and get ID
-    job_id, collection_name = create_job(project_name, "zip")
+    job_id, collection_name = _create_job(project_name, job_type)
     
-    # Save the uploaded file temporarily
+    # Stream the upload to disk without blocking the event loop
     code_service = CodeService()
-    temp_file = code_service.save_file_temporarily(file.file, file.filename)
-    
-    # Process in background
-    background_tasks.add_task(
-        process_zip_file, 
-        temp_file,
-        job_id,
-        collection_name
-    )
+    temp_file = await code_service.save_upload_streaming(file, file.filename)
+    
+    # Process on the ingest scheduler
+    _schedule(job_type, job_id, process_archive_file, temp_file, job_id, collection_name, job_type,
+              temp_file=temp_file, profile=profile)
     
     return ProcessingResponse(
         job_id=job_id,
-        message="Zip file uploaded successfully, processing started",
+        message="Archive uploaded successfully, processing started",
         status="processing"
     )
 
+@router.post("/upload/archive", response_model=ProcessingResponse)
+async def upload_archive_file(
+    file: UploadFile = File(...),
+    project_name: Optional[str] = Form(None),
+    profile: bool = Form(False)
+):
+    """Upload and process an archive containing code: zip, tar, tar.gz, tar.bz2, tar.xz, tar.zst or rar"""
+    extensions = supported_extensions()
+    if not (file.filename or "").lower().endswith(tuple(extensions)):
+        raise HTTPException(status_code=400, detail=f"File must be an archive ({', '.join(extensions)})")
+    
+    return await _upload_archive(file, project_name, "archive", profile)
+
+@router.post("/upload/zip", response_model=ProcessingResponse)
+async def upload_zip_file(
+    file: UploadFile = File(...),
+    project_name: Optional[str] = Form(None),
+    profile: bool = Form(False)
+):
+    """Upload and process a zip file containing code"""
+    if not (file.filename or "").lower().endswith('.zip'):
+        raise HTTPException(status_code=400, detail="File must be a zip file")
+    
+    return await _upload_archive(file, project_name, "zip", profile)
+
 @router.post("/upload/rar", response_model=ProcessingResponse)
 async def upload_rar_file(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    project_name: Optional[str] = Form(None)
+    project_name: Optional[str] = Form(None),
+    profile: bool = Form(False)
 ):
     """Upload and process a rar file containing code"""
-    if not file.filename.lower().endswith('.rar'):
+    if not (file.filename or "").lower().endswith('.rar'):
         raise HTTPException(status_code=400, detail="File must be a rar file")
+    if '.rar' not in supported_extensions():
+        raise HTTPException(status_code=400, detail="Rar archives need bsdtar or unrar installed on the server")
     
-    # Create job and get ID
-    job_id, collection_name = create_job(project_name, "rar")
-    
-    # Save the uploaded file temporarily
-    code_service = CodeService()
-    temp_file = code_service.save_file_temporarily(file.file, file.filename)
-    
-    # Process in background
-    background_tasks.add_task(
-        process_rar_file, 
-        temp_file,
-        job_id,
-        collection_name
-    )
-    
-    return ProcessingResponse(
-        job_id=job_id,
-        message="Rar file uploaded successfully, processing started",
-        status="processing"
-    )
+    return await _upload_archive(file, project_name, "rar", profile)
 
 @router.post("/github", response_model=ProcessingResponse)
 async def process_github_repository(
-    background_tasks: BackgroundTasks,
     repo: GithubRepo
 ):
     """Process a GitHub repository"""
+    _check_capacity("github")
+    
     # Create job and get ID
-    job_id, collection_name = create_job(repo.name, "github")
-    
-    # Process in background
-    background_tasks.add_task(
-        process_github_repo, 
-        str(repo.url), 
-        job_id, 
-        collection_name
-    )
+    job_id, collection_name = _create_job(repo.name, "github")
+    
+    # Process on the ingest scheduler
+    _schedule("github", job_id, process_github_repo, str(repo.url), job_id, collection_name, profile=repo.profile)
     
     return ProcessingResponse(
         job_id=job_id,
@@ -119,25 +165,102 @@ async def get_processing_status(job_id: str):
             job_id=job_id,
             status=status_info["status"],
             message=status_info["message"],
-            collection_name=status_info.get("collection_name")
+            collection_name=status_info.get("collection_name"),
+            details=status_info.get("details")
         )
     except KeyError:
         raise HTTPException(status_code=404, detail="Job not found")
 
+@router.get("/status/{job_id}/events")
+async def stream_processing_status(job_id: str, request: Request):
+    """Stream status changes of a processing job as Server-Sent Events"""
+    try:
+        get_status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        try:
+            async for status_info in watch_status(job_id):
+                if await request.is_disconnected():
+                    return
+                if status_info is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                finished = status_info["status"] in ("completed", "failed")
+                payload = json.dumps({"job_id": job_id, **status_info})
+                yield f"event: {'result' if finished else 'progress'}\ndata: {payload}\n\n"
+        except KeyError:
+            # The job was evicted while we were watching it
+            yield f"event: error\ndata: {json.dumps({'job_id': job_id, 'message': 'Job not found'})}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/status/{job_id}/ws")
+async def websocket_processing_status(websocket: WebSocket, job_id: str):
+    """Push status changes of a processing job over a WebSocket"""
+    await websocket.accept()
+    try:
+        async for status_info in watch_status(job_id):
+            if status_info is not None:
+                await websocket.send_json({"job_id": job_id, **status_info})
+    except KeyError:
+        await websocket.send_json({"job_id": job_id, "status": "failed", "message": "Job not found"})
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+@router.get("/jobs/{job_id}/profile")
+def get_job_profile(job_id: str, format: str = "summary"):
+    """
+    Download the profile of a job submitted with profile enabled
+    
+    Formats: summary (JSON with timings, top functions and allocation
+    sites), pstats (binary, for pstats or snakeviz) and collapsed (stacks
+    for flame graph tools).
+    """
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(PROFILE_FORMATS)}")
+    path = profile_path(job_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No profile recorded for this job")
+    if format == "summary":
+        return load_summary(job_id)
+    if format == "collapsed":
+        with open(path, "r") as f:
+            return PlainTextResponse(f.read())
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{job_id}.pstats")
+
+@router.get("/jobs", response_model=JobListResponse)
+async def get_jobs(
+    collection_name: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 100
+):
+    """List processing jobs, optionally filtered by collection and status"""
+    return JobListResponse(
+        jobs=list_jobs(collection_name=collection_name, status=status, limit=limit)
+    )
+
 @router.post("/reindex", response_model=JobResponse)
 async def reindex_code(
-    background_tasks: BackgroundTasks,
     reindex_req: ReIndexRequest
 ):
-    """Re-index a code collection that might have issues"""
+    """Incrementally re-index a code collection in place"""
+    _check_capacity("reindex")
+    
     try:
-        # Create a new job
-        job_id, new_collection_name = create_job(
-            f"{reindex_req.collection_name}_reindexed", 
-            "reindex"
-        )
+        if reindex_req.shard is not None:
+            layout = shard_layout(reindex_req.collection_name)
+            if layout is None or not 0 <= reindex_req.shard < layout.shards:
+                raise HTTPException(status_code=400, detail=f"Collection has no shard {reindex_req.shard}")
         
-        # Find source files
+        # Find source files before creating the job, so a 404 leaves no orphan job behind
         code_service = CodeService()
         file_paths = code_service.find_files_for_collection(reindex_req.collection_name)
         
@@ -147,23 +270,133 @@ async def reindex_code(
                 detail="No code files found to reindex. Please upload your code again."
             )
         
-        # Start the background task
-        background_tasks.add_task(
-            process_code_files,
-            file_paths,
-            new_collection_name,
-            job_id
-        )
+        # Create a new job for the existing collection
+        job_id, collection_name = create_job(reindex_req.collection_name, "reindex")
+        
+        # Start the job on the ingest scheduler
+        _schedule("reindex", job_id, process_code_files, file_paths, collection_name, job_id, reindex_req.shard,
+                  profile=reindex_req.profile)
         
         return JobResponse(
             job_id=job_id,
             status="processing",
             message="Re-indexing started",
-            collection_name=new_collection_name
+            collection_name=collection_name
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Error starting re-indexing process: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/embedding-cache", response_model=EmbeddingCacheStatsResponse)
+async def get_embedding_cache_stats():
+    """Get hit/miss counters and size of the shared embedding cache"""
+    return EmbeddingCacheStatsResponse(**get_embedding_cache().stats())
+
+@router.get("/collections/{collection_name}", response_model=CollectionInfoResponse)
+async def get_collection_info(collection_name: str, include_files: bool = False):
+    """Get the registry record of a collection"""
+    registry = get_collection_registry()
+    record = registry.get(collection_name)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    if include_files:
+        record["files"] = registry.list_files(collection_name)
+    return CollectionInfoResponse(**record)
+
+@router.get("/collections/{collection_name}/index", response_model=VectorIndexResponse)
+def get_vector_index(collection_name: str):
+    """Get the vector index settings of a collection"""
+    if get_collection_registry().get(collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    store = open_vector_store(collection_name)
+    try:
+        return VectorIndexResponse(**store.index_stats())
+    finally:
+        store.close()
+
+@router.put("/collections/{collection_name}/index", response_model=VectorIndexResponse)
+def configure_vector_index(collection_name: str, index_req: VectorIndexRequest):
+    """Select flat or IVF search and float32 or int8 storage for a collection"""
+    if get_collection_registry().get(collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    store = open_vector_store(collection_name)
+    try:
+        return VectorIndexResponse(**store.configure_index(
+            index_req.kind,
+            nlist=index_req.nlist,
+            nprobe=index_req.nprobe,
+            storage=index_req.storage,
+            rerank=index_req.rerank
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        store.close()
+
+@router.get("/collections/{collection_name}/index/recall", response_model=RecallResponse)
+def measure_vector_recall(collection_name: str, k: int = 10, queries: int = 100):
+    """Measure recall@k of the configured index and storage against an exact float32 scan"""
+    if get_collection_registry().get(collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    store = open_vector_store(collection_name)
+    try:
+        return RecallResponse(**store.measure_recall(k=k, queries=min(queries, 1000)))
+    finally:
+        store.close()
+
+@router.get("/scheduler", response_model=SchedulerStatsResponse)
+async def get_scheduler_stats():
+    """Get running and queued ingest job counts"""
+    return SchedulerStatsResponse(**get_scheduler().stats())
+
+@router.post("/search", response_model=SearchResponse)
+def search_collection(search_req: SearchRequest):
+    """Search a collection with hybrid BM25 + vector retrieval"""
+    if get_collection_registry().get(search_req.collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    try:
+        results = RetrievalService().search(
+            search_req.collection_name,
+            search_req.query,
+            k=search_req.k,
+            mode=search_req.mode,
+            exact=search_req.exact,
+            nprobe=search_req.nprobe
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return SearchResponse(results=results)
+
+@router.get("/symbols/{collection_name}/definitions", response_model=SymbolDefinitionsResponse)
+def get_symbol_definitions(collection_name: str, name: str):
+    """Find where a function, class or method is defined"""
+    if get_collection_registry().get(collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    symbol_index = SymbolIndex(collection_name)
+    try:
+        return SymbolDefinitionsResponse(definitions=symbol_index.definitions(name))
+    finally:
+        symbol_index.close()
+
+@router.get("/symbols/{collection_name}/references", response_model=SymbolReferencesResponse)
+def get_symbol_references(collection_name: str, name: str, kind: Optional[str] = None):
+    """Find call sites and imports of a symbol"""
+    if get_collection_registry().get(collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    symbol_index = SymbolIndex(collection_name)
+    try:
+        return SymbolReferencesResponse(references=symbol_index.references(name, kind=kind))
+    finally:
+        symbol_index.close()
\ No newline at end of file
@@ -0,0 +1,83 @@
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+
+from app.api.routes.code_routes import _check_capacity, _create_job, _schedule
+from app.api.routes.qa_routes import stream_events
+from app.services.code_service import CodeService
+from app.services.processing_service import get_status
+from app.services.qa_service import LogQAService
+from app.schemas.code_routes import ProcessingResponse
+from app.schemas.qa_routes import QuestionRequest, QuestionResponse
+from app.schemas.log_routes import LogStatusResponse
+from app.tasks.background_tasks import process_log_file
+
+router = APIRouter()
+
+@router.post("/upload", response_model=ProcessingResponse)
+async def upload_log_file(
+    file: UploadFile = File(...),
+    project_name: Optional[str] = Form(None),
+    profile: bool = Form(False)
+):
+    """Upload and index a log file"""
+    _check_capacity("log")
+    
+    # Create job and get ID
+    job_id, collection_name = _create_job(project_name, "log")
+    
+    # Stream the upload to disk without blocking the event loop
+    temp_file = await CodeService().save_upload_streaming(file, file.filename)
+    
+    # Process on the ingest scheduler
+    _schedule("log", job_id, process_log_file, temp_file, job_id, collection_name,
+              temp_file=temp_file, profile=profile)
+    
+    return ProcessingResponse(
+        job_id=job_id,
+        message="Log file uploaded successfully, processing started",
+        status="processing"
+    )
+
+@router.get("/status/{job_id}", response_model=LogStatusResponse)
+async def get_log_status(job_id: str):
+    """Get the status of a log job, with the automatic analysis once completed"""
+    try:
+        status_info = get_status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    details = status_info.get("details") or {}
+    return LogStatusResponse(
+        job_id=job_id,
+        status=status_info["status"],
+        message=status_info["message"],
+        collection_name=status_info.get("collection_name"),
+        details=details,
+        analysis=details.get("analysis")
+    )
+
+@router.post("/question", response_model=QuestionResponse)
+def ask_log_question(question_req: QuestionRequest):
+    """Answer a question about an indexed log file"""
+    try:
+        result = LogQAService().answer_question(
+            question_req.collection_name,
+            question_req.question,
+            k=question_req.k
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error answering question: {str(e)}")
+    
+    return QuestionResponse(**result)
+
+@router.post("/question/stream")
+async def ask_log_question_streaming(question_req: QuestionRequest, request: Request):
+    """Answer a question about an indexed log file as Server-Sent Events"""
+    events = LogQAService().stream_answer(
+        question_req.collection_name,
+        question_req.question,
+        k=question_req.k
+    )
+    return stream_events(request, events)
\ No newline at end of file
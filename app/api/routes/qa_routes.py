@@ -0,0 +1,137 @@
+import json
+import threading
+from typing import Any, Dict, Iterator, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.collection_registry import get_collection_registry
+from app.services.qa_service import QAService, QA_BATCH_CONCURRENCY, QA_BATCH_MAX_QUESTIONS
+from app.services.query_cache import get_query_cache
+from app.schemas.qa_routes import (
+    QuestionRequest,
+    BatchQuestionRequest,
+    QuestionResponse,
+    QueryCacheStatsResponse
+)
+
+router = APIRouter()
+
+_END = object()
+
+def _check_collection(collection_name: str) -> None:
+    """Return 404 for an unknown collection instead of searching a new empty one"""
+    if collection_name and get_collection_registry().get(collection_name) is None:
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+def stream_events(request: Request, events: Iterator[Tuple[str, Dict[str, Any]]]) -> StreamingResponse:
+    """
+    Send (event, payload) tuples from a blocking iterator as Server-Sent Events
+    
+    The iterator is advanced in the thread pool and closed as soon as the
+    client disconnects, which stops generation and frees the worker.
+    """
+    lock = threading.Lock()
+    cancelled = threading.Event()
+    
+    def advance():
+        with lock:
+            if cancelled.is_set():
+                return _END
+            return next(events, _END)
+    
+    def close():
+        # Waits for a fragment in progress, then stops the generator
+        with lock:
+            events.close()
+    
+    async def body():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    item = await run_in_threadpool(advance)
+                except Exception as e:
+                    yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+                    return
+                if item is _END:
+                    return
+                event, payload = item
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            cancelled.set()
+            threading.Thread(target=close, daemon=True).start()
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/question", response_model=QuestionResponse)
+def ask_question(question_req: QuestionRequest):
+    """Answer a question about a collection, or a general question without one"""
+    _check_collection(question_req.collection_name)
+    try:
+        result = QAService().answer_question(
+            question_req.collection_name,
+            question_req.question,
+            k=question_req.k
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error answering question: {str(e)}")
+    
+    return QuestionResponse(**result)
+
+@router.post("/question/stream")
+async def ask_question_streaming(question_req: QuestionRequest, request: Request):
+    """
+    Answer a question as Server-Sent Events
+    
+    Sends a sources event first, then token events as the answer is
+    generated and a final done event with the complete answer.
+    """
+    _check_collection(question_req.collection_name)
+    events = QAService().stream_answer(
+        question_req.collection_name,
+        question_req.question,
+        k=question_req.k
+    )
+    return stream_events(request, events)
+
+@router.post("/batch")
+def ask_questions(batch_req: BatchQuestionRequest):
+    """
+    Answer many questions about a collection
+    
+    Streams one JSON object per line as each answer completes; each carries
+    the index of its question in the request.
+    """
+    _check_collection(batch_req.collection_name)
+    if not batch_req.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    if len(batch_req.questions) > QA_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {QA_BATCH_MAX_QUESTIONS} questions per batch"
+        )
+    
+    concurrency = min(batch_req.concurrency or QA_BATCH_CONCURRENCY, QA_BATCH_CONCURRENCY)
+    results = QAService().answer_batch(
+        batch_req.collection_name,
+        batch_req.questions,
+        k=batch_req.k,
+        concurrency=concurrency
+    )
+    
+    def lines():
+        for result in results:
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/cache/stats", response_model=QueryCacheStatsResponse)
+async def get_query_cache_stats():
+    """Return query cache hit rates and latency saved"""
+    return QueryCacheStatsResponse(**get_query_cache().stats())
\ No newline at end of file
@@ -0,0 +1,244 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Number of inverted lists, 0 picks about 4 * sqrt(rows)
+IVF_NLIST = int(os.getenv("IVF_NLIST", 0))
+
+# Lists scanned per query, more lists trade latency for recall
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+
+# Vectors sampled to train the centroids
+IVF_TRAIN_SAMPLE = int(os.getenv("IVF_TRAIN_SAMPLE", 100000))
+
+# k-means iterations when training the centroids
+IVF_TRAIN_ITERATIONS = int(os.getenv("IVF_TRAIN_ITERATIONS", 10))
+
+# Rows scored per block when assigning vectors to lists
+ASSIGN_BLOCK_ROWS = 65536
+
+
+def default_nlist(rows: int) -> int:
+    return max(1, min(rows, int(4 * np.sqrt(rows))))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _assign(vectors: np.ndarray, rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(rows), dtype=np.int64)
+    for start in range(0, len(rows), ASSIGN_BLOCK_ROWS):
+        block = vectors[rows[start:start + ASSIGN_BLOCK_ROWS]]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors: np.ndarray, rows: np.ndarray, nlist: int,
+                    sample: int = IVF_TRAIN_SAMPLE,
+                    iterations: int = IVF_TRAIN_ITERATIONS,
+                    seed: int = 0) -> np.ndarray:
+    """
+    Train inner-product centroids with spherical k-means on a sample
+
+    Args:
+        vectors: Matrix of all stored vectors, may be memory-mapped
+        rows: Rows of the live vectors
+        nlist: Number of centroids
+        sample: Maximum number of vectors used for training
+        iterations: Number of k-means iterations
+        seed: Random seed, fixed so rebuilds are reproducible
+
+    Returns:
+        Centroid matrix of shape (nlist, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    if len(rows) > sample:
+        rows = np.sort(rng.choice(rows, size=sample, replace=False))
+    training = _normalize(np.asarray(vectors[rows], dtype=np.float32))
+
+    centroids = training[rng.choice(len(training), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(training @ centroids.T, axis=1)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Summing sorted members with reduceat is much faster than np.add.at
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(training[order], starts[filled], axis=0)
+
+        # Empty lists are reseeded with random training vectors
+        empty = counts == 0
+        sums[empty] = training[rng.choice(len(training), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-flat) index over a collection's vector file
+
+    Vectors are grouped into lists around trained centroids; a query scores
+    only the lists whose centroids are closest to it. Centroids, list
+    offsets and row numbers are stored as flat files and memory-mapped, so
+    loading an index deserializes nothing and the page cache is shared
+    between processes. The vectors themselves are never copied: lists hold
+    row numbers into the collection's vector file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta_path = os.path.join(path, "ivf.json")
+
+    def _file(self, generation: int, name: str) -> str:
+        return os.path.join(self.path, f"ivf-{generation}.{name}")
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Load the current index
+
+        Returns:
+            Dictionary with meta, centroids, offsets and rows, or None if no index was built
+        """
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, "r") as f:
+            meta = json.load(f)
+
+        generation, dimension, nlist = meta["generation"], meta["dimension"], meta["nlist"]
+        return {
+            "meta": meta,
+            "centroids": np.memmap(self._file(generation, "centroids.f32"), dtype=np.float32,
+                                   mode="r", shape=(nlist, dimension)),
+            "offsets": np.memmap(self._file(generation, "offsets.i64"), dtype=np.int64,
+                                 mode="r", shape=(nlist + 1,)),
+            # An empty file cannot be memory-mapped
+            "rows": np.memmap(self._file(generation, "rows.i64"), dtype=np.int64, mode="r",
+                              shape=(meta["indexed"],))
+            if meta["indexed"] else np.zeros(0, dtype=np.int64)
+        }
+
+    def build(self, vectors: np.ndarray, rows: np.ndarray, total_rows: int, nlist: int = IVF_NLIST) -> Dict[str, Any]:
+        """
+        Build the index from the live rows
+
+        A new generation of files is written next to the current one and
+        swapped in by rewriting the meta file, so concurrent readers keep a
+        consistent view.
+
+        Args:
+            vectors: Matrix of all stored vectors, may be memory-mapped
+            rows: Rows of the live vectors
+            total_rows: Rows in the vector file, later rows are scanned exactly until the next build
+            nlist: Number of lists, 0 picks a size from the number of rows
+
+        Returns:
+            Meta dictionary of the new index
+        """
+        rows = np.sort(np.asarray(rows, dtype=np.int64))
+        nlist = min(nlist or default_nlist(len(rows)), max(len(rows), 1))
+        dimension = vectors.shape[1]
+
+        if len(rows):
+            centroids = train_centroids(vectors, rows, nlist)
+            assignments = _assign(vectors, rows, centroids)
+        else:
+            centroids = np.zeros((nlist, dimension), dtype=np.float32)
+            assignments = np.zeros(0, dtype=np.int64)
+
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=offsets[1:])
+
+        previous = self.load()
+        generation = previous["meta"]["generation"] + 1 if previous else 1
+        centroids.astype(np.float32).tofile(self._file(generation, "centroids.f32"))
+        offsets.tofile(self._file(generation, "offsets.i64"))
+        rows[order].tofile(self._file(generation, "rows.i64"))
+
+        meta = {
+            "generation": generation,
+            "dimension": dimension,
+            "nlist": nlist,
+            "indexed": int(len(rows)),
+            "built_rows": int(total_rows)
+        }
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.meta_path)
+
+        if previous:
+            for name in ("centroids.f32", "offsets.i64", "rows.i64"):
+                try:
+                    os.remove(self._file(previous["meta"]["generation"], name))
+                except OSError:
+                    pass
+        return meta
+
+    def drop(self) -> None:
+        """Remove the index files"""
+        index = self.load()
+        if index is None:
+            return
+        os.remove(self.meta_path)
+        for name in ("centroids.f32", "offsets.i64", "rows.i64"):
+            try:
+                os.remove(self._file(index["meta"]["generation"], name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def candidates(index: Dict[str, Any], queries: np.ndarray, total_rows: int, nprobe: int) -> List[np.ndarray]:
+        """
+        Select candidate rows for each query
+
+        Args:
+            index: Loaded index
+            queries: Query matrix
+            total_rows: Rows in the vector file
+            nprobe: Lists scanned per query
+
+        Returns:
+            One array of candidate rows per query, including rows added since the build
+        """
+        centroids, offsets, rows = index["centroids"], index["offsets"], index["rows"]
+        nprobe = max(1, min(nprobe, len(centroids)))
+        tail = np.arange(index["meta"]["built_rows"], total_rows, dtype=np.int64)
+
+        probes = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        result = []
+        for query_probes in probes:
+            parts = [rows[offsets[probe]:offsets[probe + 1]] for probe in query_probes]
+            parts.append(tail)
+            result.append(np.concatenate(parts))
+        return result
+
+
+def top_rows(vectors: np.ndarray, candidate_rows: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score candidate rows exactly and keep the best
+
+    Args:
+        vectors: Matrix of all stored vectors
+        candidate_rows: Rows to score
+        query: Query vector
+        k: Number of rows to keep
+
+    Returns:
+        Tuple of (rows, scores), best first
+    """
+    if not len(candidate_rows):
+        return candidate_rows, np.zeros(0, dtype=np.float32)
+    # Sorted rows read the memory map sequentially
+    candidate_rows = np.sort(candidate_rows)
+    scores = vectors[candidate_rows] @ query
+    k = min(k, len(candidate_rows))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return candidate_rows[top], scores[top]
@@ -0,0 +1,591 @@
+import os
+import queue
+import re
+import shutil
+import signal
+import subprocess
+import tarfile
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Members larger than this are skipped instead of being read into memory
+MAX_MEMBER_SIZE = int(os.getenv("ARCHIVE_MAX_MEMBER_SIZE", 5 * 1024 * 1024))
+
+# Archives that would decompress to more than this many bytes are rejected
+ARCHIVE_MAX_TOTAL_SIZE = int(os.getenv("ARCHIVE_MAX_TOTAL_SIZE", 2 * 1024 * 1024 * 1024))
+
+# Archives with more file members than this are rejected
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", 200000))
+
+# Zip members over 1 MB that claim a higher compression ratio than this are skipped
+ARCHIVE_MAX_RATIO = int(os.getenv("ARCHIVE_MAX_RATIO", 200))
+
+# Threads decompressing members of formats whose members are compressed independently
+ARCHIVE_WORKERS = int(os.getenv("ARCHIVE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Members decompressed ahead of the indexer, per worker
+ARCHIVE_READ_AHEAD = int(os.getenv("ARCHIVE_READ_AHEAD", 8))
+
+_DRIVE = re.compile(r"^[A-Za-z]:")
+
+
+class ArchiveError(ValueError):
+    """Raised for archives that are unsupported, corrupt or exceed the safety limits"""
+
+
+def safe_member_name(name: str) -> Optional[str]:
+    """
+    Normalize an archive member name, rejecting names that escape the archive root
+
+    Args:
+        name: Member name as stored in the archive
+
+    Returns:
+        Relative "/" separated name, or None for absolute names and names with ".." parts
+    """
+    normalized = name.replace("\\", "/")
+    if normalized.startswith("/") or _DRIVE.match(normalized):
+        return None
+    parts = [part for part in normalized.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+
+def _windows(items: List, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        window = list(islice(iterator, size))
+        if not window:
+            return
+        yield window
+
+
+class ArchiveReader:
+    """
+    Base class of the archive formats
+
+    A reader lists the regular file members of an archive and yields their
+    contents without extracting anything to disk. Member names are checked
+    for path traversal, and the member count, member size and total size
+    limits are enforced while the archive is decompressed, so a zip bomb
+    is stopped before it is read in full.
+
+    Subclasses set name, extensions and magic and implement _list and
+    _read. register_format makes them available to open_archive.
+    """
+
+    # Name of the format, reported in job details
+    name = ""
+    # Lower case file name suffixes of the format
+    extensions: Tuple[str, ...] = ()
+    # Byte signatures at the start of the file
+    magic: Tuple[bytes, ...] = ()
+
+    def __init__(self,
+                 path: str,
+                 max_total_size: int = ARCHIVE_MAX_TOTAL_SIZE,
+                 max_members: int = ARCHIVE_MAX_MEMBERS,
+                 workers: int = ARCHIVE_WORKERS):
+        self.path = path
+        self.max_total_size = max_total_size
+        self.max_members = max_members
+        self.workers = max(1, workers)
+        self._members: Optional[List[Tuple[str, Optional[str], int, object]]] = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Return whether the libraries or tools the format needs are installed"""
+        return True
+
+    @classmethod
+    def detect(cls, head: bytes) -> bool:
+        """Return whether the first bytes of a file carry the signature of the format"""
+        return bool(cls.magic) and head.startswith(cls.magic)
+
+    def _list(self) -> Iterator[Tuple[str, int, object]]:
+        """Yield (stored_name, size, handle) for each regular file member"""
+        raise NotImplementedError
+
+    def _read(self, members: List[Tuple[str, object]], limit: int) -> Iterator[Tuple[str, bytes]]:
+        """Yield (name, content) for (name, handle) members in order, reading at most limit + 1 bytes of each"""
+        raise NotImplementedError
+
+    def _check_member(self, size: int, handle: object) -> Optional[str]:
+        """Return a reason to skip a member before it is decompressed"""
+        return None
+
+    def _collect(self, listing: Iterator[Tuple[str, int, object]]) -> List[Tuple[str, Optional[str], int, object]]:
+        members = []
+        for stored_name, size, handle in listing:
+            members.append((stored_name, safe_member_name(stored_name), size, handle))
+            if len(members) > self.max_members:
+                raise ArchiveError(f"Archive has more than {self.max_members} files")
+        return members
+
+    def _listed(self) -> List[Tuple[str, Optional[str], int, object]]:
+        if self._members is None:
+            self._members = self._collect(self._list())
+        return self._members
+
+    def names(self) -> List[str]:
+        """Return the normalized names of the file members, leaving out unsafe names"""
+        return [name for _, name, _, _ in self._listed() if name]
+
+    def scan(self,
+             capture: Callable[[str], bool],
+             max_member_size: int = MAX_MEMBER_SIZE) -> Tuple[List[str], Dict[str, bytes]]:
+        """
+        List the members and read the few selected by name, such as .gitignore files
+
+        Args:
+            capture: Callable returning True for the normalized names to read
+            max_member_size: Members with a larger size are left out
+
+        Returns:
+            Tuple of (names as returned by names(), mapping of captured name to content)
+        """
+        names = self.names()
+        return names, self.read([name for name in names if capture(name)], max_member_size)
+
+    def read(self, names: Iterable[str], max_member_size: int = MAX_MEMBER_SIZE) -> Dict[str, bytes]:
+        """
+        Read a few members by their normalized names
+
+        Args:
+            names: Names returned by names()
+            max_member_size: Members with a larger size are left out
+
+        Returns:
+            Mapping of name to content
+        """
+        wanted = set(names)
+        if not wanted:
+            return {}
+        return dict(self.iter_members(
+            max_member_size=max_member_size,
+            skip_path=lambda name: None if name in wanted else "not requested"
+        ))
+
+    def iter_members(self,
+                     max_member_size: int = MAX_MEMBER_SIZE,
+                     on_skip: Optional[Callable[[str, str], None]] = None,
+                     skip_path: Optional[Callable[[str], Optional[str]]] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yield the files of the archive one at a time without extracting it
+
+        Args:
+            max_member_size: Members with a larger uncompressed size are skipped
+            on_skip: Optional callback receiving (member_name, reason) for skipped members
+            skip_path: Optional callable returning a reason to skip a member by its name, before it is decompressed
+
+        Yields:
+            Tuples of (member_name, content)
+
+        Raises:
+            ArchiveError: If the archive exceeds the member count or total size limit
+        """
+        def skip(name: str, reason: str) -> None:
+            if on_skip:
+                on_skip(name, reason)
+
+        selected = []
+        declared = 0
+        for stored_name, name, size, handle in self._listed():
+            if name is None:
+                skip(stored_name, "unsafe path")
+                continue
+            reason = skip_path(name) if skip_path else None
+            if reason is None and size > max_member_size:
+                reason = f"too large ({size} bytes)"
+            if reason is None:
+                reason = self._check_member(size, handle)
+            if reason is not None:
+                skip(name, reason)
+                continue
+            declared += size
+            selected.append((name, handle))
+
+        if declared > self.max_total_size:
+            raise ArchiveError(f"Archive would decompress to more than {self.max_total_size} bytes")
+
+        total = 0
+        for name, content in self._read(selected, max_member_size):
+            # Sizes in archive headers can lie, so count what was actually decompressed
+            total += len(content)
+            if total > self.max_total_size:
+                raise ArchiveError(f"Archive decompressed to more than {self.max_total_size} bytes")
+            if len(content) > max_member_size:
+                skip(name, f"too large (over {max_member_size} bytes)")
+                continue
+            yield name, content
+
+    def close(self) -> None:
+        """Release the resources held by the reader"""
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_FORMATS: List[type] = []
+
+
+def register_format(reader_class: type) -> type:
+    """Make an ArchiveReader subclass available to open_archive, usable as a class decorator"""
+    _FORMATS.append(reader_class)
+    return reader_class
+
+
+@contextmanager
+def _command_output(args: List[str]):
+    """Run a command and yield its standard output as a binary stream"""
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=errors)
+
+        def failure() -> str:
+            errors.seek(0)
+            message = errors.read().decode("utf-8", errors="replace").strip()
+            return f"{os.path.basename(args[0])} failed: {message or process.returncode}"
+
+        complete = False
+        try:
+            try:
+                yield process.stdout
+                # Drain trailing padding; a reader that stopped well before the end does not care how the command ends
+                complete = len(process.stdout.read(64 * 1024)) < 64 * 1024
+            finally:
+                process.stdout.close()
+                if not complete and process.poll() is None:
+                    process.kill()
+                process.wait()
+        except Exception as e:
+            if process.returncode not in (0, -signal.SIGKILL):
+                raise ArchiveError(failure()) from e
+            raise
+        if complete and process.returncode != 0:
+            raise ArchiveError(failure())
+
+
+def _prefetch(items: Iterator, depth: int) -> Iterator:
+    """Run an iterator on a background thread, keeping up to depth items ready"""
+    ready: queue.Queue = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+        finally:
+            items.close()
+
+    thread = threading.Thread(target=produce, name="archive-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = ready.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
+
+
+@register_format
+class ZipReader(ArchiveReader):
+    """
+    Zip archives
+
+    Every member is compressed on its own, so members are decompressed in
+    parallel by a pool of threads, each with its own handle on the file.
+    zlib, bz2 and lzma release the GIL while they decompress.
+    """
+
+    name = "zip"
+    extensions = (".zip",)
+    magic = (b"PK\x03\x04", b"PK\x05\x06")
+
+    def _list(self) -> Iterator[Tuple[str, int, object]]:
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                infos = archive.infolist()
+        except zipfile.BadZipFile as e:
+            raise ArchiveError(f"Invalid zip archive: {e}")
+        for info in infos:
+            if not info.is_dir():
+                yield info.filename, info.file_size, info
+
+    def _check_member(self, size: int, handle: object) -> Optional[str]:
+        if size > 1024 * 1024 and size > handle.compress_size * ARCHIVE_MAX_RATIO:
+            return f"suspicious compression ratio ({size // max(handle.compress_size, 1)}:1)"
+        return None
+
+    def _read(self, members: List[Tuple[str, object]], limit: int) -> Iterator[Tuple[str, bytes]]:
+        local = threading.local()
+        opened = []
+
+        def read_member(member: Tuple[str, object]) -> Tuple[str, bytes]:
+            name, info = member
+            archive = getattr(local, "archive", None)
+            if archive is None:
+                archive = local.archive = zipfile.ZipFile(self.path)
+                opened.append(archive)
+            # Read through the size limit + 1 so a lying header cannot blow up memory
+            with archive.open(info) as stream:
+                return name, stream.read(limit + 1)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # Bounded windows keep at most one window of members in memory
+                for window in _windows(members, self.workers * ARCHIVE_READ_AHEAD):
+                    yield from pool.map(read_member, window)
+        finally:
+            for archive in opened:
+                archive.close()
+
+
+class TarStreamReader(ArchiveReader):
+    """
+    Base class of the formats read as a tar stream
+
+    A compressed tar is a single stream, so it cannot be split between
+    cores. It is decompressed on a background thread instead, while the
+    indexer works on the members already read. scan lists the members and
+    reads the ones it captures in the same pass, so an archive is
+    decompressed twice at most. Links and special files are ignored.
+    Subclasses implement _stream.
+    """
+
+    @contextmanager
+    def _stream(self):
+        """Open the tar stream"""
+        raise NotImplementedError
+
+    @contextmanager
+    def _tar(self):
+        with self._stream() as stream:
+            try:
+                with tarfile.open(fileobj=stream, mode="r|*") as archive:
+                    yield archive
+            except (tarfile.TarError, EOFError, OSError) as e:
+                raise ArchiveError(f"Invalid {self.name} archive: {e}")
+
+    def _list(self,
+              capture: Optional[Callable[[str], bool]] = None,
+              limit: int = MAX_MEMBER_SIZE,
+              captured: Optional[Dict[str, bytes]] = None) -> Iterator[Tuple[str, int, object]]:
+        declared = 0
+        with self._tar() as archive:
+            for info in archive:
+                if not info.isreg():
+                    continue
+                # Tar headers cannot understate the data that follows them, so this is exact
+                declared += info.size
+                if declared > self.max_total_size:
+                    raise ArchiveError(f"Archive would decompress to more than {self.max_total_size} bytes")
+                if capture is not None:
+                    name = safe_member_name(info.name)
+                    # A streamed member can only be read before the next header
+                    if name and info.size <= limit and capture(name):
+                        captured[name] = archive.extractfile(info).read(limit + 1)
+                yield info.name, info.size, None
+
+    def scan(self,
+             capture: Callable[[str], bool],
+             max_member_size: int = MAX_MEMBER_SIZE) -> Tuple[List[str], Dict[str, bytes]]:
+        # Listing and capturing share one decompression of the stream
+        if self._members is not None:
+            return super().scan(capture, max_member_size)
+        captured: Dict[str, bytes] = {}
+        self._members = self._collect(self._list(capture, max_member_size, captured))
+        return self.names(), captured
+
+    def _read(self, members: List[Tuple[str, object]], limit: int) -> Iterator[Tuple[str, bytes]]:
+        if not members:
+            return
+        wanted = {name for name, _ in members}
+
+        def read_stream() -> Iterator[Tuple[str, bytes]]:
+            remaining = len(members)
+            with self._tar() as archive:
+                for info in archive:
+                    if not info.isreg() or safe_member_name(info.name) not in wanted:
+                        continue
+                    yield safe_member_name(info.name), archive.extractfile(info).read(limit + 1)
+                    remaining -= 1
+                    if remaining == 0:
+                        return
+
+        yield from _prefetch(read_stream(), self.workers * ARCHIVE_READ_AHEAD)
+
+
+@register_format
+class TarReader(TarStreamReader):
+    """Tar archives, plain or compressed with gzip, bzip2 or xz"""
+
+    name = "tar"
+    extensions = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tbz", ".tar.xz", ".txz")
+    magic = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+
+    @classmethod
+    def detect(cls, head: bytes) -> bool:
+        # Uncompressed tars carry their signature at offset 257
+        return super().detect(head) or head[257:262] == b"ustar"
+
+    @contextmanager
+    def _stream(self):
+        with open(self.path, "rb") as f:
+            yield f
+
+
+@register_format
+class ZstdTarReader(TarStreamReader):
+    """Tar archives compressed with Zstandard, through the zstandard package or the zstd command"""
+
+    name = "tar.zst"
+    extensions = (".tar.zst", ".tzst", ".tar.zstd")
+    magic = (b"\x28\xb5\x2f\xfd",)
+
+    @classmethod
+    def available(cls) -> bool:
+        return zstandard is not None or shutil.which("zstd") is not None
+
+    @contextmanager
+    def _stream(self):
+        if zstandard is not None:
+            with open(self.path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as stream:
+                yield stream
+        else:
+            with _command_output([shutil.which("zstd"), "-d", "-c", "-q", "--", self.path]) as stream:
+                yield stream
+
+
+@register_format
+class BsdtarRarReader(TarStreamReader):
+    """RAR archives, rewritten as a tar stream by bsdtar"""
+
+    name = "rar"
+    extensions = (".rar",)
+    magic = (b"Rar!\x1a\x07",)
+
+    @classmethod
+    def available(cls) -> bool:
+        return shutil.which("bsdtar") is not None
+
+    @contextmanager
+    def _stream(self):
+        with _command_output([shutil.which("bsdtar"), "-c", "-f", "-", "@" + self.path]) as stream:
+            yield stream
+
+
+@register_format
+class UnrarReader(ArchiveReader):
+    """
+    RAR archives read with unrar, when bsdtar is not installed
+
+    Each member is printed by its own unrar process, so members are
+    decompressed in parallel.
+    """
+
+    name = "rar"
+    extensions = (".rar",)
+    magic = (b"Rar!\x1a\x07",)
+
+    @classmethod
+    def available(cls) -> bool:
+        return shutil.which("unrar") is not None
+
+    def _list(self) -> Iterator[Tuple[str, int, object]]:
+        result = subprocess.run([shutil.which("unrar"), "lt", "-p-", "--", self.path], capture_output=True)
+        if result.returncode != 0:
+            raise ArchiveError(f"Invalid rar archive: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        entry: Dict[str, str] = {}
+        for line in result.stdout.decode("utf-8", errors="replace").splitlines() + [""]:
+            key, _, value = line.strip().partition(": ")
+            if key in ("Name", "Type", "Size"):
+                entry[key] = value
+            elif not line.strip() and entry:
+                if entry.get("Type") == "File" and "Name" in entry:
+                    yield entry["Name"], int(entry.get("Size") or 0), entry["Name"]
+                entry = {}
+
+    def _read(self, members: List[Tuple[str, object]], limit: int) -> Iterator[Tuple[str, bytes]]:
+        def read_member(member: Tuple[str, object]) -> Tuple[str, bytes]:
+            name, stored_name = member
+            with _command_output([shutil.which("unrar"), "p", "-inul", "-p-", "--", self.path, stored_name]) as stream:
+                return name, stream.read(limit + 1)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for window in _windows(members, self.workers * ARCHIVE_READ_AHEAD):
+                yield from pool.map(read_member, window)
+
+
+def supported_extensions() -> List[str]:
+    """Return the file name suffixes of the archive formats readable on this host"""
+    extensions = []
+    for reader_class in _FORMATS:
+        if reader_class.available():
+            extensions.extend(ext for ext in reader_class.extensions if ext not in extensions)
+    return extensions
+
+
+def open_archive(path: str, filename: Optional[str] = None, **limits) -> ArchiveReader:
+    """
+    Open an archive with the first available reader that recognizes it
+
+    The format is recognized from the magic bytes at the start of the file
+    and, failing that, from the file name.
+
+    Args:
+        path: Path to the archive
+        filename: Original file name, defaults to the base name of path
+        **limits: Limits passed on to the reader
+
+    Returns:
+        ArchiveReader
+
+    Raises:
+        ArchiveError: If the format is unknown or the tool it needs is not installed
+    """
+    filename = (filename or os.path.basename(path)).lower()
+    with open(path, "rb") as f:
+        head = f.read(512)
+
+    by_magic = [reader_class for reader_class in _FORMATS if reader_class.detect(head)]
+    by_name = [reader_class for reader_class in _FORMATS if filename.endswith(reader_class.extensions)]
+    candidates = [reader_class for reader_class in by_magic if reader_class in by_name] or by_magic or by_name
+    if not candidates:
+        raise ArchiveError(f"Unsupported archive format: {filename}")
+    for reader_class in candidates:
+        if reader_class.available():
+            return reader_class(path, **limits)
+    raise ArchiveError(f"No tool installed to read {candidates[0].name} archives")
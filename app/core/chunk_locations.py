@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Tuple
+
+from app.core.vector_store import COLLECTIONS_DIR
+
+
+class ChunkLocations:
+    """
+    Per-collection record of where each stored chunk occurs
+
+    Identical chunks are stored and embedded once, so one chunk ID can
+    stand for many (file, line range) locations. A stored chunk is only
+    deleted once no file refers to it any more. The content digest of
+    every stored chunk is kept so later ingests reuse it instead of
+    embedding the same text again.
+    """
+
+    def __init__(self, collection_name: str, root: str = COLLECTIONS_DIR):
+        path = os.path.join(root, collection_name)
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, "locations.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS digests (digest TEXT PRIMARY KEY, chunk_id TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS locations ("
+            "chunk_id TEXT NOT NULL, file_path TEXT NOT NULL, "
+            "start_line INTEGER NOT NULL, end_line INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS digests_chunk ON digests (chunk_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS locations_chunk ON locations (chunk_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS locations_file ON locations (file_path)")
+        self._conn.commit()
+
+    def _select(self, query: str, values: List[str]) -> List[Tuple[Any, ...]]:
+        rows = []
+        for i in range(0, len(values), 500):
+            batch = values[i:i + 500]
+            rows.extend(self._conn.execute(query.format(",".join("?" * len(batch))), batch).fetchall())
+        return rows
+
+    def resolve(self, digests: List[str]) -> Dict[str, str]:
+        """
+        Find chunks already stored with the given content
+
+        Args:
+            digests: Content digests from chunk_digest
+
+        Returns:
+            Mapping of digest to stored chunk ID, for the digests that are stored
+        """
+        with self._lock:
+            return dict(self._select("SELECT digest, chunk_id FROM digests WHERE digest IN ({})", digests))
+
+    def register(self, stored: Dict[str, str]) -> None:
+        """
+        Record chunks that reached the vector store
+
+        Args:
+            stored: Mapping of content digest to chunk ID
+        """
+        if not stored:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO digests VALUES (?, ?)", list(stored.items()))
+            self._conn.commit()
+
+    def _delete_locked(self, file_paths: List[str]) -> None:
+        self._conn.executemany("DELETE FROM locations WHERE file_path = ?", [(p,) for p in file_paths])
+
+    def replace_files(self, locations_by_file: Dict[str, List[Tuple[str, int, int]]]) -> None:
+        """
+        Store the chunk locations of a batch of files, replacing what was there
+
+        Args:
+            locations_by_file: Mapping of file path to (chunk_id, start_line, end_line) tuples
+        """
+        if not locations_by_file:
+            return
+        with self._lock:
+            self._delete_locked(list(locations_by_file))
+            self._conn.executemany(
+                "INSERT INTO locations VALUES (?, ?, ?, ?)",
+                [
+                    (chunk_id, file_path, start, end)
+                    for file_path, locations in locations_by_file.items()
+                    for chunk_id, start, end in locations
+                ]
+            )
+            self._conn.commit()
+
+    def delete_files(self, file_paths: List[str]) -> None:
+        """Forget every location in the given files"""
+        if not file_paths:
+            return
+        with self._lock:
+            self._delete_locked(file_paths)
+            self._conn.commit()
+
+    def orphaned(self, chunk_ids: List[str]) -> List[str]:
+        """
+        Pick the chunks no file refers to any more and forget their content
+
+        Args:
+            chunk_ids: Candidate chunk IDs, e.g. the old chunks of changed files
+
+        Returns:
+            Chunk IDs that can be deleted from the vector store
+        """
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        with self._lock:
+            referenced = {
+                row[0] for row in self._select("SELECT DISTINCT chunk_id FROM locations WHERE chunk_id IN ({})", chunk_ids)
+            }
+            orphans = [chunk_id for chunk_id in chunk_ids if chunk_id not in referenced]
+            self._conn.executemany("DELETE FROM digests WHERE chunk_id = ?", [(c,) for c in orphans])
+            self._conn.commit()
+        return orphans
+
+    def locations(self, chunk_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        List where chunks occur
+
+        Args:
+            chunk_ids: Chunk IDs
+
+        Returns:
+            Mapping of chunk ID to its locations, ordered by file path and line
+        """
+        with self._lock:
+            rows = self._select(
+                "SELECT chunk_id, file_path, start_line, end_line FROM locations "
+                "WHERE chunk_id IN ({}) ORDER BY file_path, start_line",
+                list(dict.fromkeys(chunk_ids))
+            )
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk_id, file_path, start, end in rows:
+            found.setdefault(chunk_id, []).append({"file_path": file_path, "start_line": start, "end_line": end})
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of stored chunks and of locations they cover"""
+        with self._lock:
+            chunks, locations = self._conn.execute(
+                "SELECT COUNT(DISTINCT chunk_id), COUNT(*) FROM locations"
+            ).fetchone()
+        return {"chunks": chunks, "locations": locations}
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
@@ -0,0 +1,257 @@
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.lexical_index import term_frequencies
+from app.core.symbol_index import attach_chunk_ids, extract_symbols
+
+# Size of each chunk in lines and the overlap between consecutive chunks
+CHUNK_LINES = int(os.getenv("CHUNK_LINES", 60))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 10))
+
+# "syntax" cuts chunks at definition boundaries, "lines" uses fixed line windows
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "syntax")
+
+# Lines above a definition that belong to it: comments, decorators and annotations
+_LEADING = ("#", "//", "/*", "*", "@")
+
+# Lines that only close a block are not worth a chunk of their own
+_CLOSING = ("", "}", "};", "})", "});", ")", "]", "end")
+
+
+def chunk_id(file_path: str, index: int) -> str:
+    """
+    Build a stable chunk ID from a file path and the chunk position
+
+    Args:
+        file_path: Path of the file the chunk belongs to
+        index: Position of the chunk within the file
+
+    Returns:
+        Chunk ID
+    """
+    path_hash = hashlib.sha1(file_path.encode("utf-8")).hexdigest()[:16]
+    return f"{path_hash}-{index}"
+
+
+def chunk_digest(text: str) -> str:
+    """Hash chunk text, ignoring trailing whitespace, to find identical chunks"""
+    normalized = "\n".join(line.rstrip() for line in text.strip("\n").splitlines())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def content_chunk_id(file_path: str, digest: str) -> str:
+    """
+    Build a chunk ID from the file that first stored the chunk and its content
+
+    The path part keeps shard routing by ID working; the content part means
+    unchanged chunks keep their ID when the rest of the file changes.
+
+    Args:
+        file_path: Path of the file the chunk was first stored for
+        digest: Output of chunk_digest
+
+    Returns:
+        Chunk ID
+    """
+    path_hash = hashlib.sha1(file_path.encode("utf-8")).hexdigest()[:16]
+    return f"{path_hash}-{digest[:16]}"
+
+
+def _make_chunk(file_path: str, lines: List[str], span: Tuple[int, int, List[str], Optional[str]]) -> Dict[str, Any]:
+    # Spans are (start, end, context, symbol) with 1-based inclusive lines; context precedes the body
+    start, end, context, symbol = span
+    text = "\n".join(context + lines[start - 1:end])
+    digest = chunk_digest(text)
+    metadata = {"file_path": file_path, "start_line": start, "end_line": end}
+    if symbol:
+        metadata["symbol"] = symbol
+    return {"id": content_chunk_id(file_path, digest), "text": text, "digest": digest, "metadata": metadata}
+
+
+def chunk_text(file_path: str, content: str,
+               chunk_lines: int = CHUNK_LINES,
+               overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """
+    Split file content into overlapping line windows
+
+    Args:
+        file_path: Path of the file, stored in the chunk metadata
+        content: File content
+        chunk_lines: Number of lines per chunk
+        overlap: Number of lines shared by consecutive chunks
+
+    Returns:
+        List of chunk dictionaries with id, text, digest and metadata
+    """
+    lines = content.splitlines()
+    if not lines:
+        return []
+    return [_make_chunk(file_path, lines, span) for span in _windows(1, len(lines), [], chunk_lines, overlap)]
+
+
+def _windows(first: int, last: int, context: List[str], chunk_lines: int, overlap: int,
+             symbol: Optional[str] = None) -> List[Tuple[int, int, List[str], Optional[str]]]:
+    step = max(chunk_lines - overlap, 1)
+    spans = []
+    for start in range(first, last + 1, step):
+        end = min(start + chunk_lines - 1, last)
+        spans.append((start, end, context, symbol))
+        if end >= last:
+            break
+    return spans
+
+
+def _outermost(definitions: List[Dict[str, Any]], first: int, last: int) -> List[Dict[str, Any]]:
+    """Definitions starting inside [first, last] that no other one of them contains"""
+    selected = []
+    end = first - 1
+    for definition in sorted(definitions, key=lambda d: (d["start_line"], -d["end_line"])):
+        if definition["start_line"] > end and first <= definition["start_line"] <= last:
+            selected.append(definition)
+            end = min(definition["end_line"], last)
+    return selected
+
+
+def _leading_start(lines: List[str], start: int, floor: int) -> int:
+    """Move a definition's first line up over the comments and decorators directly above it"""
+    while start - 1 > floor and lines[start - 2].strip().startswith(_LEADING):
+        start -= 1
+    return start
+
+
+def _syntax_spans(lines: List[str], definitions: List[Dict[str, Any]], first: int, last: int,
+                  context: List[str], chunk_lines: int, overlap: int,
+                  owner: Optional[str] = None) -> List[Tuple[int, int, List[str], Optional[str]]]:
+    """
+    Cut [first, last] at the outermost definitions it contains
+
+    Definitions that fit in a chunk become one span each. Larger ones are
+    cut at their own nested definitions with their signature line as
+    context, or split into line windows when they have none. Code between
+    definitions becomes spans of its own, attributed to the owner, the
+    definition being cut, if any.
+    """
+    spans = []
+
+    def between(start: int, end: int, symbol: Optional[str] = owner) -> None:
+        if all(line.strip() in _CLOSING for line in lines[start - 1:end]):
+            return
+        spans.extend(_windows(start, end, context, chunk_lines, overlap, symbol))
+
+    position = first
+    for definition in _outermost(definitions, first, last):
+        start = _leading_start(lines, definition["start_line"], position - 1)
+        end = min(max(definition["end_line"], definition["start_line"]), last)
+        between(position, start - 1)
+        position = end + 1
+        symbol = definition["qualified_name"]
+
+        if end - start + 1 <= chunk_lines:
+            spans.append((start, end, context, symbol))
+            continue
+
+        signature = lines[definition["start_line"] - 1]
+        nested = _outermost(
+            [d for d in definitions if d is not definition], definition["start_line"] + 1, end
+        )
+        if nested:
+            # The opening of the definition, such as a class line and its fields
+            header_end = _leading_start(lines, nested[0]["start_line"], definition["start_line"]) - 1
+            between(start, header_end, symbol)
+            spans.extend(_syntax_spans(
+                lines, [d for d in definitions if d is not definition],
+                header_end + 1, end, context + [signature], chunk_lines, overlap, symbol
+            ))
+        else:
+            # Windows after the first of a long function carry its signature
+            spans.append((start, start + chunk_lines - 1, context, symbol))
+            spans.extend(_windows(
+                start + chunk_lines - overlap, end, context + [signature], chunk_lines, overlap, symbol
+            ))
+    between(position, last)
+    return spans
+
+
+def _pack(spans: List[Tuple[int, int, List[str], Optional[str]]],
+          chunk_lines: int) -> List[Tuple[int, int, List[str], Optional[str]]]:
+    """Merge runs of adjacent spans with the same context while they fit in chunk_lines"""
+    packed = []
+    run: List[Tuple[int, int, List[str], Optional[str]]] = []
+
+    def flush() -> None:
+        if len(run) == 1:
+            packed.append(run[0])
+        elif run:
+            packed.append((run[0][0], run[-1][1], run[0][2], None))
+        run.clear()
+
+    for span in spans:
+        start, end, context, _ = span
+        if run and (context != run[0][2] or start <= run[-1][1] or end - run[0][0] + 1 > chunk_lines):
+            flush()
+        run.append(span)
+    flush()
+    return packed
+
+
+def chunk_code(file_path: str, content: str, definitions: List[Dict[str, Any]],
+               chunk_lines: int = CHUNK_LINES,
+               overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """
+    Split source code at function, class and method boundaries
+
+    Chunks only start and end at definition boundaries. Adjacent
+    definitions, and the code between them, are packed into one chunk
+    while they fit in chunk_lines, so copied files produce the same chunks
+    wherever they appear. Larger classes are cut at their methods, which
+    carry the class signature line as context; larger functions are split
+    into line windows. Files without definitions fall back to line windows.
+
+    Args:
+        file_path: Path of the file, stored in the chunk metadata
+        content: File content
+        definitions: Definitions found by extract_symbols
+        chunk_lines: Maximum number of lines per chunk, not counting context
+        overlap: Number of lines shared by consecutive windows of long definitions
+
+    Returns:
+        List of chunk dictionaries with id, text, digest and metadata
+    """
+    lines = content.splitlines()
+    if not definitions or not lines:
+        return chunk_text(file_path, content, chunk_lines, overlap)
+    spans = _syntax_spans(lines, definitions, 1, len(lines), [], chunk_lines, overlap)
+    return [_make_chunk(file_path, lines, span) for span in _pack(spans, chunk_lines)]
+
+
+def chunk_documents(documents: List[Tuple[str, str]]) -> List[Tuple[str, List[Dict[str, Any]], str, Dict[str, Any]]]:
+    """
+    Chunk a batch of documents
+
+    Runs inside pool workers, so failures are returned per document
+    instead of aborting the whole batch. Term frequencies for the lexical
+    index and the symbols of each file are extracted here as well to keep
+    that work off the main process.
+
+    Args:
+        documents: List of (file_path, content) tuples
+
+    Returns:
+        List of (file_path, chunks, error, symbols) tuples, error is empty on success
+    """
+    results = []
+    for file_path, content in documents:
+        try:
+            symbols = extract_symbols(file_path, content)
+            if CHUNK_STRATEGY == "syntax":
+                chunks = chunk_code(file_path, content, symbols["definitions"])
+            else:
+                chunks = chunk_text(file_path, content)
+            for chunk in chunks:
+                chunk["terms"] = term_frequencies(chunk["text"])
+            attach_chunk_ids(symbols, chunks)
+            results.append((file_path, chunks, "", symbols))
+        except Exception as e:
+            results.append((file_path, [], str(e), {}))
+    return results
@@ -0,0 +1,183 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Registry shared by every worker process
+COLLECTION_REGISTRY_PATH = os.getenv(
+    "COLLECTION_REGISTRY_PATH",
+    os.path.join(os.getcwd(), "data", "registry.db")
+)
+
+# Collection names become directory names under temp/, data/collections/ and repos/
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def validate_collection_name(name: str) -> str:
+    """
+    Check that a collection name is safe to use as a single path component
+
+    Args:
+        name: Collection name
+
+    Returns:
+        The name, unchanged
+
+    Raises:
+        ValueError: If the name has characters outside letters, digits, "_", "." and "-", or is "." or ".."
+    """
+    if not COLLECTION_NAME_PATTERN.match(name) or name in (".", ".."):
+        raise ValueError(
+            f"Invalid collection name {name!r}: use letters, digits, '_', '.' and '-' only"
+        )
+    return name
+
+
+class CollectionRegistry:
+    """
+    Persistent record of every ingested collection
+
+    Stores the source root, the indexed files with their sizes and hashes,
+    and creation/index timestamps, so finding a collection's sources is a
+    primary-key lookup instead of a filesystem crawl.
+    """
+
+    def __init__(self, path: str = COLLECTION_REGISTRY_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS collections ("
+            "name TEXT PRIMARY KEY, source_root TEXT, "
+            "file_count INTEGER NOT NULL, total_bytes INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, indexed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "collection TEXT NOT NULL, path TEXT NOT NULL, "
+            "size INTEGER, hash TEXT NOT NULL, "
+            "PRIMARY KEY (collection, path))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def register(self,
+                 collection_name: str,
+                 source_root: Optional[str],
+                 files: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Record or refresh a collection after an ingest finishes
+
+        Args:
+            collection_name: Name of the collection
+            source_root: Directory holding the sources, None if they are not kept
+            files: Mapping of relative path to a dict with size and hash
+        """
+        now = time.time()
+        total_bytes = sum(entry.get("size") or 0 for entry in files.values())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collections "
+                "(name, source_root, file_count, total_bytes, created_at, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "source_root = excluded.source_root, file_count = excluded.file_count, "
+                "total_bytes = excluded.total_bytes, indexed_at = excluded.indexed_at",
+                (collection_name, source_root, len(files), total_bytes, now, now)
+            )
+            self._conn.execute("DELETE FROM files WHERE collection = ?", (collection_name,))
+            self._conn.executemany(
+                "INSERT INTO files (collection, path, size, hash) VALUES (?, ?, ?, ?)",
+                [
+                    (collection_name, path, entry.get("size"), entry["hash"])
+                    for path, entry in files.items()
+                ]
+            )
+            self._conn.commit()
+
+    def get(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a collection
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            Collection record, or None if it was never registered
+        """
+        row = self._conn.execute(
+            "SELECT name, source_root, file_count, total_bytes, created_at, indexed_at "
+            "FROM collections WHERE name = ?",
+            (collection_name,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ["name", "source_root", "file_count", "total_bytes", "created_at", "indexed_at"]
+        return dict(zip(keys, row))
+
+    def list_files(self, collection_name: str) -> List[Dict[str, Any]]:
+        """
+        List the files recorded for a collection
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            List of dicts with path, size and hash
+        """
+        return [
+            {"path": path, "size": size, "hash": file_hash}
+            for path, size, file_hash in self._conn.execute(
+                "SELECT path, size, hash FROM files WHERE collection = ? ORDER BY path",
+                (collection_name,)
+            )
+        ]
+
+    def bump_version(self, collection_name: str) -> int:
+        """
+        Mark a collection as changed
+
+        Anything cached against the previous version becomes unreachable.
+
+        Args:
+            collection_name: Name of the collection
+
+        Returns:
+            The new version
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                (collection_name,)
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT version FROM versions WHERE name = ?", (collection_name,)
+            ).fetchone()[0]
+
+    def version(self, collection_name: str) -> int:
+        """Return the current version of a collection, 0 if it never changed"""
+        row = self._conn.execute(
+            "SELECT version FROM versions WHERE name = ?", (collection_name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+_registry: Optional[CollectionRegistry] = None
+_registry_pid: Optional[int] = None
+
+
+def get_collection_registry() -> CollectionRegistry:
+    """Return the process-wide collection registry"""
+    global _registry, _registry_pid
+    # SQLite connections must not cross a fork into scheduler workers
+    if _registry is None or _registry_pid != os.getpid():
+        _registry = CollectionRegistry()
+        _registry_pid = os.getpid()
+    return _registry
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+import time
+import zlib
+from typing import List
+
+import numpy as np
+
+# Embedding backend: "default" uses CodeIndexer, "stub" a deterministic hashing embedder
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "default")
+
+# Dimension of stub embeddings
+STUB_EMBEDDING_DIMENSION = int(os.getenv("STUB_EMBEDDING_DIMENSION", 384))
+
+# Seconds the stub embedder sleeps per text, to simulate model cost
+STUB_EMBEDDING_DELAY = float(os.getenv("STUB_EMBEDDING_DELAY", 0))
+
+EMBEDDING_BACKENDS = ("default", "stub")
+
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+
+
+class StubEmbedder:
+    """
+    Deterministic embedder for tests and benchmarks
+
+    Tokens are hashed into signed buckets and the counts normalized, so
+    texts sharing identifiers get similar vectors and runs are repeatable
+    without loading a model.
+    """
+
+    def __init__(self, dimension: int = STUB_EMBEDDING_DIMENSION, delay: float = STUB_EMBEDDING_DELAY):
+        self.dimension = dimension
+        self.delay = delay
+        self.model_name = f"stub-hash-{dimension}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One unit-length vector per text
+        """
+        if self.delay:
+            time.sleep(self.delay * len(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                bucket = zlib.crc32(token.encode("utf-8"))
+                vectors[row, bucket % self.dimension] += 1.0 if bucket & 0x80000000 else -1.0
+            if not vectors[row].any():
+                # Texts without tokens still get a distinct direction
+                digest = hashlib.sha256(text.encode("utf-8")).digest()
+                vectors[row, digest[0] % self.dimension] = 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / norms).tolist()
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embed_documents([query])[0]
+
+
+def create_code_indexer():
+    """
+    Create the embedder selected by EMBEDDING_BACKEND
+
+    Returns:
+        CodeIndexer or StubEmbedder
+    """
+    if EMBEDDING_BACKEND == "stub":
+        return StubEmbedder()
+    if EMBEDDING_BACKEND != "default":
+        raise ValueError(f"Unknown embedding backend: {EMBEDDING_BACKEND}")
+    # Imported lazily so the stub backend never loads the model
+    from app.core.code_indexer import CodeIndexer
+    return CodeIndexer()
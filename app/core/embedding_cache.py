@@ -0,0 +1,244 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Location and size limit of the cache shared by all collections
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.getcwd(), "data", "embedding_cache.db")
+)
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+# Last access times closer than this to the current time are not rewritten on a hit
+_ACCESS_RESOLUTION = 60.0
+
+# Hit and miss counts are written at least this often while lookups continue
+_STATS_FLUSH_INTERVAL = 5.0
+
+
+def normalize_chunk(text: str) -> str:
+    """
+    Normalize chunk text so trivially different copies share a cache entry
+
+    Line endings and trailing whitespace are ignored.
+    """
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by (model ID, normalized chunk hash)
+
+    Entries are evicted least-recently-used first once the stored vectors
+    exceed the size limit. SQLite in WAL mode lets every worker process
+    share the same cache file. Hit, miss and eviction counters and the
+    running entry count and size live in a stats row of the same file, so
+    the web process reports what the workers did without scanning the
+    entries.
+
+    Lookups only write when an entry's last access time is out of date by
+    more than _ACCESS_RESOLUTION seconds; hit and miss counts are kept in
+    memory until the next write, or at most _STATS_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._flushed = time.monotonic()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_stats ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), hits INTEGER NOT NULL, "
+            "misses INTEGER NOT NULL, evictions INTEGER NOT NULL, "
+            "entries INTEGER NOT NULL DEFAULT 0, size INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("INSERT OR IGNORE INTO cache_stats (id, hits, misses, evictions) VALUES (0, 0, 0, 0)")
+        self._conn.commit()
+
+        # Caches written before the running totals existed are counted once
+        self._conn.execute("BEGIN IMMEDIATE")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(cache_stats)")]
+        if "size" not in columns:
+            self._conn.execute("ALTER TABLE cache_stats ADD COLUMN entries INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE cache_stats ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "UPDATE cache_stats SET entries = (SELECT COUNT(*) FROM embeddings), "
+                "size = (SELECT COALESCE(SUM(size), 0) FROM embeddings) WHERE id = 0"
+            )
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_id: str, text: str) -> str:
+        """Build the cache key for a chunk"""
+        digest = hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()
+        return f"{model_id}:{digest}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of key to embedding for the keys that were found
+        """
+        found: Dict[str, List[float]] = {}
+        stale: List[str] = []
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, vector, last_access in self._conn.execute(
+                    f"SELECT key, vector, last_access FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+                    if now - last_access > _ACCESS_RESOLUTION:
+                        stale.append(key)
+
+            hits = sum(1 for key in keys if key in found)
+            self._hits += hits
+            self._misses += len(keys) - hits
+
+            if stale or time.monotonic() - self._flushed >= _STATS_FLUSH_INTERVAL:
+                if stale:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in stale]
+                    )
+                self._flush_stats()
+                self._conn.commit()
+        return found
+
+    def _flush_stats(self) -> None:
+        """Write the pending hit and miss counts, caller must hold the lock and commit"""
+        if self._hits or self._misses:
+            self._conn.execute(
+                "UPDATE cache_stats SET hits = hits + ?, misses = misses + ? WHERE id = 0",
+                (self._hits, self._misses)
+            )
+            self._hits = self._misses = 0
+        self._flushed = time.monotonic()
+
+    def put_many(self, entries: Dict[str, List[float]]) -> None:
+        """
+        Store embeddings and evict old entries if over the size limit
+
+        Args:
+            entries: Mapping of cache key to embedding
+        """
+        if not entries:
+            return
+
+        now = time.time()
+        rows = []
+        for key, embedding in entries.items():
+            vector = np.asarray(embedding, dtype=np.float32).tobytes()
+            rows.append((key, vector, len(vector), now))
+        keys = list(entries)
+
+        with self._lock:
+            # Taking the write lock first keeps the running totals exact across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                replaced_entries = replaced_size = 0
+                for i in range(0, len(keys), 500):
+                    batch = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    count, size = self._conn.execute(
+                        f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})",
+                        batch
+                    ).fetchone()
+                    replaced_entries += count
+                    replaced_size += size
+
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute(
+                    "UPDATE cache_stats SET entries = entries + ?, size = size + ? WHERE id = 0",
+                    (len(rows) - replaced_entries, sum(row[2] for row in rows) - replaced_size)
+                )
+                self._flush_stats()
+                self._evict()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def _evict(self) -> None:
+        """Evict the least recently used entries, caller must hold the write transaction"""
+        total = self._conn.execute("SELECT size FROM cache_stats WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the limit so we do not evict on every insert
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access"):
+            if total - freed <= target:
+                break
+            evicted.append((key,))
+            freed += size
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._conn.execute(
+            "UPDATE cache_stats SET evictions = evictions + ?, entries = entries - ?, size = size - ? WHERE id = 0",
+            (len(evicted), len(evicted), freed)
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current size of the cache"""
+        with self._lock:
+            if self._hits or self._misses:
+                self._flush_stats()
+                self._conn.commit()
+            hits, misses, evictions, entries, total = self._conn.execute(
+                "SELECT hits, misses, evictions, entries, size FROM cache_stats WHERE id = 0"
+            ).fetchone()
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+            "entries": entries,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_pid: Optional[int] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache"""
+    global _cache, _cache_pid
+    # SQLite connections must not cross a fork into scheduler workers
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = EmbeddingCache()
+        _cache_pid = os.getpid()
+    return _cache
@@ -0,0 +1,387 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Turn the pre-filter off to index every file as before
+INGEST_FILTER_ENABLED = os.getenv("INGEST_FILTER_ENABLED", "true").lower() == "true"
+
+# Files larger than this are not indexed
+INGEST_MAX_FILE_SIZE = int(os.getenv("INGEST_MAX_FILE_SIZE", 1024 * 1024))
+
+# Bytes inspected to tell text from binary content
+INGEST_SNIFF_BYTES = int(os.getenv("INGEST_SNIFF_BYTES", 8192))
+
+# Text with longer lines on average is treated as minified
+INGEST_MAX_AVERAGE_LINE = int(os.getenv("INGEST_MAX_AVERAGE_LINE", 300))
+
+# Skipped files listed one by one in the job details, the rest are only counted
+INGEST_SKIP_REPORT_LIMIT = int(os.getenv("INGEST_SKIP_REPORT_LIMIT", 200))
+
+# Directories holding dependencies, build output or tool state
+SKIP_DIRS = frozenset(
+    name.strip() for name in os.getenv(
+        "INGEST_SKIP_DIRS",
+        ".git,.hg,.svn,node_modules,bower_components,jspm_packages,vendor,third_party,"
+        "__pycache__,.venv,venv,.tox,.nox,.mypy_cache,.pytest_cache,.ruff_cache,site-packages,"
+        "dist,build,target,.next,.nuxt,.svelte-kit,.gradle,.terraform,Pods,coverage,.idea,.vscode"
+    ).split(",") if name.strip()
+)
+
+LOCKFILES = frozenset({
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "pdm.lock", "Cargo.lock", "composer.lock",
+    "Gemfile.lock", "go.sum", "mix.lock", "pubspec.lock", "packages.lock.json", "flake.lock",
+    "Podfile.lock", "gradle.lockfile"
+})
+
+BINARY_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".icns", ".webp", ".tif", ".tiff", ".psd",
+    ".mp3", ".mp4", ".m4a", ".wav", ".ogg", ".flac", ".avi", ".mov", ".mkv", ".webm",
+    ".zip", ".tar", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".jar", ".war", ".whl", ".egg",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt",
+    ".ttf", ".otf", ".woff", ".woff2", ".eot",
+    ".exe", ".dll", ".so", ".dylib", ".a", ".o", ".obj", ".lib", ".bin", ".dat", ".class",
+    ".pyc", ".pyo", ".pyd", ".wasm", ".db", ".sqlite", ".sqlite3", ".pkl", ".pickle",
+    ".npy", ".npz", ".parquet", ".h5", ".hdf5", ".onnx", ".pt", ".pth", ".ckpt", ".safetensors"
+})
+
+_MINIFIED_NAME = re.compile(r"[.-]min\.(?:js|css|mjs)$|\.(?:bundle|chunk)\.(?:js|css)$|\.map$", re.IGNORECASE)
+_GENERATED_NAME = re.compile(
+    r"(?:_pb2(?:_grpc)?\.pyi?|\.pb\.(?:go|cc|h)|\.pb\.gw\.go|_grpc\.pb\.go|\.g\.dart|\.freezed\.dart"
+    r"|\.designer\.cs|\.generated\.\w+|_generated\.\w+)$",
+    re.IGNORECASE
+)
+_GENERATED_MARKER = re.compile(
+    rb"@generated|do not edit|code generated by|auto-generated|autogenerated|automatically generated",
+    re.IGNORECASE
+)
+
+# File signatures of common binary formats, formats whose signature could
+# start a text file are left to the content sniffing
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "png"), (b"\xff\xd8\xff", "jpeg"), (b"GIF87a", "gif"), (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"), (b"PK\x03\x04", "zip"), (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"), (b"\x28\xb5\x2f\xfd", "zstd"), (b"7z\xbc\xaf\x27\x1c", "7z"),
+    (b"Rar!\x1a\x07", "rar"), (b"\x7fELF", "elf"), (b"\xca\xfe\xba\xbe", "java class"),
+    (b"\xcf\xfa\xed\xfe", "mach-o"), (b"\xfe\xed\xfa\xcf", "mach-o"), (b"\x00asm", "wasm"),
+    (b"SQLite format 3\x00", "sqlite"), (b"\x80\x04\x95", "pickle")
+)
+
+_LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript",
+    ".cjs": "javascript", ".ts": "typescript", ".tsx": "typescript", ".java": "java", ".kt": "kotlin",
+    ".go": "go", ".rs": "rust", ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp",
+    ".cs": "csharp", ".rb": "ruby", ".php": "php", ".swift": "swift", ".scala": "scala",
+    ".sh": "shell", ".bash": "shell", ".sql": "sql", ".html": "html", ".css": "css", ".scss": "css",
+    ".vue": "vue", ".svelte": "svelte", ".json": "json", ".yaml": "yaml", ".yml": "yaml",
+    ".toml": "toml", ".xml": "xml", ".md": "markdown", ".rst": "text", ".txt": "text"
+}
+_SHEBANG = re.compile(rb"^#!\s*\S*?(?:/env\s+)?(python|node|bash|sh|ruby|perl|php)\w*")
+_SHEBANG_LANGUAGES = {
+    b"python": "python", b"node": "javascript", b"bash": "shell", b"sh": "shell",
+    b"ruby": "ruby", b"perl": "perl", b"php": "php"
+}
+_TEXT_CONTROL = set(b"\t\n\r\f\b\x1b")
+
+
+def detect_language(file_path: str, head: bytes = b"") -> Optional[str]:
+    """
+    Detect the language of a file from its extension, shebang or signature
+
+    Args:
+        file_path: Path of the file
+        head: First bytes of the file
+
+    Returns:
+        Language name, "binary:<format>" for known binary formats, or None if unknown
+    """
+    for signature, kind in _MAGIC:
+        if head.startswith(signature):
+            return f"binary:{kind}"
+    language = _LANGUAGES.get(os.path.splitext(file_path)[1].lower())
+    if language:
+        return language
+    match = _SHEBANG.match(head)
+    if match:
+        return _SHEBANG_LANGUAGES[match.group(1)]
+    return None
+
+
+def looks_binary(head: bytes) -> bool:
+    """Tell binary content from text by NUL bytes and the share of control characters"""
+    if not head:
+        return False
+    if b"\x00" in head:
+        return True
+    control = sum(1 for byte in head if byte < 32 and byte not in _TEXT_CONTROL)
+    return control / len(head) > 0.1
+
+
+def _glob_to_regex(pattern: str) -> str:
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex.append("\\[")
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return "".join(regex)
+
+
+class GitIgnore:
+    """
+    Matcher for the .gitignore files of a tree
+
+    Supports the common subset of the format: globs with *, ** and ?,
+    character classes, anchoring with a leading or inner slash, directory
+    patterns with a trailing slash and negation. As in git, nothing inside
+    an ignored directory can be re-included.
+    """
+
+    def __init__(self):
+        self._rules: List[Tuple[str, re.Pattern, bool, bool]] = []
+        self._directories: Dict[str, bool] = {}
+
+    def add(self, base: str, text: str) -> None:
+        """
+        Add the rules of one .gitignore file
+
+        Args:
+            base: Directory of the .gitignore file, relative to the tree root, "" for the root
+            text: File content
+        """
+        base = base.strip("/")
+        for line in text.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash other than a trailing one anchors the pattern to the .gitignore directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            regex = _glob_to_regex(line) if anchored else "(?:.*/)?" + _glob_to_regex(line)
+            self._rules.append((base, re.compile(regex + "$"), negate, directory_only))
+        self._directories.clear()
+
+    def _match(self, path: str, is_dir: bool) -> bool:
+        ignored = False
+        for base, regex, negate, directory_only in self._rules:
+            if directory_only and not is_dir:
+                continue
+            if base:
+                if not path.startswith(base + "/"):
+                    continue
+                relative = path[len(base) + 1:]
+            else:
+                relative = path
+            if regex.match(relative):
+                ignored = not negate
+        return ignored
+
+    def ignored(self, path: str) -> bool:
+        """
+        Check a file path against the rules
+
+        Args:
+            path: File path relative to the tree root, with forward slashes
+
+        Returns:
+            True if the file or one of its directories is ignored
+        """
+        if not self._rules:
+            return False
+        parts = path.strip("/").split("/")
+        for depth in range(1, len(parts)):
+            directory = "/".join(parts[:depth])
+            if directory not in self._directories:
+                self._directories[directory] = self._match(directory, True)
+            if self._directories[directory]:
+                return True
+        return self._match("/".join(parts), False)
+
+
+class IngestFilter:
+    """
+    Decides which files of an upload or repository are worth indexing
+
+    Path rules (ignored, vendored, lockfile, binary or minified names) are
+    checked without touching the file. The size cap is checked against the
+    file size, and the content rules (binary signature or bytes, minified
+    or generated content) look at the bytes the read stage loads anyway.
+    Every check returns None for files to index or a short skip reason.
+    """
+
+    def __init__(self,
+                 max_file_size: int = INGEST_MAX_FILE_SIZE,
+                 skip_dirs: Iterable[str] = SKIP_DIRS,
+                 gitignore: Optional[GitIgnore] = None):
+        self.max_file_size = max_file_size
+        self.skip_dirs = frozenset(skip_dirs)
+        self.gitignore = gitignore or GitIgnore()
+
+    @classmethod
+    def for_paths(cls, relative_paths: Iterable[str], read_text) -> "IngestFilter":
+        """
+        Build a filter that honours the .gitignore files among a list of paths
+
+        Args:
+            relative_paths: File paths relative to the tree root
+            read_text: Callable returning the content of one of those paths
+
+        Returns:
+            IngestFilter
+        """
+        gitignore = GitIgnore()
+        for path in sorted(relative_paths, key=lambda p: p.count("/")):
+            normalized = path.replace("\\", "/")
+            if os.path.basename(normalized) != ".gitignore":
+                continue
+            try:
+                gitignore.add(os.path.dirname(normalized), read_text(path))
+            except (OSError, UnicodeDecodeError):
+                continue
+        return cls(gitignore=gitignore)
+
+    @classmethod
+    def for_tree(cls, root: str, file_paths: Iterable[str]) -> "IngestFilter":
+        """
+        Build a filter for files on disk under root
+
+        Args:
+            root: Directory the paths are relative to
+            file_paths: Absolute or root-relative file paths
+
+        Returns:
+            IngestFilter
+        """
+        def read_text(path: str) -> str:
+            with open(os.path.join(root, path), "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+
+        return cls.for_paths((os.path.relpath(path, root) for path in file_paths), read_text)
+
+    def check_path(self, path: str) -> Optional[str]:
+        """
+        Check a file by its path alone
+
+        Args:
+            path: File path relative to the tree or archive root
+
+        Returns:
+            Skip reason, or None to keep the file
+        """
+        normalized = path.replace("\\", "/").strip("/")
+        parts = normalized.split("/")
+        name = parts[-1]
+        for directory in parts[:-1]:
+            if directory in self.skip_dirs:
+                return f"vendored ({directory})"
+        if self.gitignore.ignored(normalized):
+            return "ignored (.gitignore)"
+        if name in LOCKFILES:
+            return "lockfile"
+        extension = os.path.splitext(name)[1].lower()
+        if extension in BINARY_EXTENSIONS:
+            return f"binary ({extension[1:]})"
+        if _MINIFIED_NAME.search(name):
+            return "minified"
+        if _GENERATED_NAME.search(name):
+            return "generated"
+        return None
+
+    def check_size(self, size: int) -> Optional[str]:
+        """Skip files above the size cap"""
+        if size > self.max_file_size:
+            return f"too large ({size} bytes)"
+        return None
+
+    def check_content(self, path: str, data: bytes) -> Optional[str]:
+        """
+        Check a file by its content
+
+        Args:
+            path: File path, used for language detection
+            data: File content
+
+        Returns:
+            Skip reason, or None to keep the file
+        """
+        reason = self.check_size(len(data))
+        if reason:
+            return reason
+        head = data[:INGEST_SNIFF_BYTES]
+        language = detect_language(path, head)
+        if language and language.startswith("binary:"):
+            return f"binary ({language[7:]})"
+        if looks_binary(head):
+            return "binary (content)"
+        if _GENERATED_MARKER.search(data[:1024]):
+            return "generated"
+        if len(data) > 4096:
+            lines = data.count(b"\n") + 1
+            if len(data) / lines > INGEST_MAX_AVERAGE_LINE:
+                return "minified"
+        return None
+
+
+class SkippedFiles:
+    """
+    Collects the files the pre-filter skipped, for the job details
+
+    All skips are counted by reason; the first few are listed by name.
+    """
+
+    def __init__(self, limit: int = INGEST_SKIP_REPORT_LIMIT):
+        self.limit = limit
+        self.reasons: Counter = Counter()
+        self.files: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, path: str, reason: str) -> None:
+        """Record a skipped file"""
+        with self._lock:
+            self.reasons[reason.split(" (")[0]] += 1
+            if len(self.files) < self.limit:
+                self.files.append({"path": path, "reason": reason})
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the total, counts by reason and the listed files"""
+        with self._lock:
+            return {
+                "total": sum(self.reasons.values()),
+                "by_reason": dict(self.reasons.most_common()),
+                "files": list(self.files)
+            }
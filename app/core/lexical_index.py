@@ -0,0 +1,190 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from app.core.vector_store import COLLECTIONS_DIR
+
+# BM25 parameters
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split code into search terms
+
+    Identifiers are kept whole and also split on snake_case and camelCase,
+    so "parseHttpRequest" matches "parse_http_request", "http" and
+    "parsehttprequest".
+
+    Args:
+        text: Code or query text
+
+    Returns:
+        List of lowercase terms
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        terms.append(lowered)
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def term_frequencies(text: str) -> Dict[str, int]:
+    """Count the terms of a chunk, cheap enough to run in chunking workers"""
+    return dict(Counter(tokenize(text)))
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index for a single collection
+
+    Postings are kept in a WITHOUT ROWID table clustered by term, so a query
+    reads only the postings of its own terms. The document count and total
+    length BM25 needs are kept in a stats row updated with every write.
+    """
+
+    def __init__(self, collection_name: str, root: str = COLLECTIONS_DIR):
+        path = os.path.join(root, collection_name)
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, "lexical.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "doc INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE NOT NULL, length INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, doc)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stats ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), docs INTEGER NOT NULL, total_length INTEGER NOT NULL)"
+        )
+        # Indexes written before the stats row existed are counted once here
+        self._conn.execute(
+            "INSERT OR IGNORE INTO stats (id, docs, total_length) "
+            "SELECT 0, COUNT(*), COALESCE(SUM(length), 0) FROM docs"
+        )
+        self._conn.commit()
+
+    def _delete_locked(self, chunk_ids: List[str]) -> None:
+        for i in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT doc, length FROM docs WHERE chunk_id IN ({placeholders})", batch
+            ).fetchall()
+            if rows:
+                docs = [doc for doc, _ in rows]
+                doc_placeholders = ",".join("?" * len(docs))
+                self._conn.execute(f"DELETE FROM postings WHERE doc IN ({doc_placeholders})", docs)
+                self._conn.execute(f"DELETE FROM docs WHERE doc IN ({doc_placeholders})", docs)
+                self._conn.execute(
+                    "UPDATE stats SET docs = docs - ?, total_length = total_length - ? WHERE id = 0",
+                    (len(rows), sum(length for _, length in rows))
+                )
+
+    def add(self, chunk_ids: List[str], frequencies: List[Dict[str, int]]) -> None:
+        """
+        Index a batch of chunks, replacing chunks with the same IDs
+
+        Args:
+            chunk_ids: Chunk IDs
+            frequencies: Term frequencies of each chunk, see term_frequencies
+        """
+        if not chunk_ids:
+            return
+        with self._lock:
+            self._delete_locked(chunk_ids)
+            postings = []
+            added_length = 0
+            for chunk_id, terms in zip(chunk_ids, frequencies):
+                length = sum(terms.values())
+                cursor = self._conn.execute(
+                    "INSERT INTO docs (chunk_id, length) VALUES (?, ?)",
+                    (chunk_id, length)
+                )
+                added_length += length
+                postings.extend((term, cursor.lastrowid, tf) for term, tf in terms.items())
+            self._conn.executemany("INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)", postings)
+            self._conn.execute(
+                "UPDATE stats SET docs = docs + ?, total_length = total_length + ? WHERE id = 0",
+                (len(chunk_ids), added_length)
+            )
+            self._conn.commit()
+
+    def delete(self, chunk_ids: List[str]) -> None:
+        """
+        Remove chunks from the index
+
+        Args:
+            chunk_ids: Chunk IDs
+        """
+        if not chunk_ids:
+            return
+        with self._lock:
+            self._delete_locked(chunk_ids)
+            self._conn.commit()
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query with BM25
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            List of (chunk_id, score), best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            total_docs, total_length = self._conn.execute(
+                "SELECT docs, total_length FROM stats WHERE id = 0"
+            ).fetchone()
+            if not total_docs:
+                return []
+            average_length = total_length / total_docs
+
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._conn.execute(
+                    "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.doc = p.doc "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf, length in postings:
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not top:
+                return []
+            placeholders = ",".join("?" * len(top))
+            chunk_ids = dict(self._conn.execute(
+                f"SELECT doc, chunk_id FROM docs WHERE doc IN ({placeholders})", [doc for doc, _ in top]
+            ))
+        return [(chunk_ids[doc], score) for doc, score in top]
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
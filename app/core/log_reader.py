@@ -0,0 +1,79 @@
+import mmap
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+# Lines longer than this are truncated before template mining
+MAX_LINE_LENGTH = int(os.getenv("LOG_MAX_LINE_LENGTH", 4096))
+
+# Pages behind the read position are released after this many bytes
+RELEASE_WINDOW = 64 * 1024 * 1024
+
+_TIMESTAMP_PATTERNS = [
+    # 2024-05-01 12:00:00,123 / 2024-05-01T12:00:00.123Z / [2024-05-01 12:00:00]
+    re.compile(r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?\s*"),
+    # May  1 12:00:00 (syslog)
+    re.compile(r"^([A-Z][a-z]{2}\s+\d{1,2} \d{2}:\d{2}:\d{2})\s*"),
+    # 01/May/2024:12:00:00 +0000 (access logs)
+    re.compile(r"^\[?(\d{2}/[A-Z][a-z]{2}/\d{4}:\d{2}:\d{2}:\d{2}(?: [+-]\d{4})?)\]?\s*"),
+]
+
+
+def split_timestamp(line: str) -> Tuple[Optional[str], str]:
+    """
+    Split a leading timestamp off a log line
+
+    Args:
+        line: Log line
+
+    Returns:
+        Tuple of (timestamp or None, rest of the line)
+    """
+    for pattern in _TIMESTAMP_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return match.group(1), line[match.end():]
+    return None, line
+
+
+def iter_log_lines(file_path: str, max_line_length: int = MAX_LINE_LENGTH) -> Iterator[Tuple[int, str]]:
+    """
+    Stream the lines of a log file through a memory map
+
+    Only a window of the file is resident at a time, so memory use does not
+    grow with the file size. Blank lines are skipped.
+
+    Args:
+        file_path: Path to the log file
+        max_line_length: Longer lines are truncated
+
+    Returns:
+        Iterator of (end offset in bytes, line)
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            can_release = hasattr(mapped, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+
+            position = 0
+            released = 0
+            while position < size:
+                end = mapped.find(b"\n", position)
+                if end == -1:
+                    end = size
+                raw = mapped[position:min(end, position + max_line_length)]
+                position = end + 1
+
+                line = raw.decode("utf-8", errors="replace").rstrip("\r")
+                if line.strip():
+                    yield min(position, size), line
+
+                if can_release and position - released >= RELEASE_WINDOW:
+                    release_to = (position // mmap.PAGESIZE) * mmap.PAGESIZE
+                    mapped.madvise(mmap.MADV_DONTNEED, released, release_to - released)
+                    released = release_to
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from app.core.vector_store import COLLECTIONS_DIR
+
+# Manifest locks held by the current thread
+_held = threading.local()
+
+
+def content_fingerprint(content: str) -> Tuple[str, int]:
+    """
+    Hash file content the same way for ingest and reindex
+
+    Args:
+        content: Decoded file content
+
+    Returns:
+        Tuple of (hex digest, size in bytes)
+    """
+    data = content.encode("utf-8", errors="replace")
+    return hashlib.sha256(data).hexdigest(), len(data)
+
+
+def content_hash(content: str) -> str:
+    """Return only the hex digest of content_fingerprint"""
+    return content_fingerprint(content)[0]
+
+
+@contextmanager
+def manifest_lock(collection_name: str, root: str = COLLECTIONS_DIR) -> Iterator[None]:
+    """
+    Serialize manifest load and save cycles of jobs on the same collection
+
+    Jobs run in different processes, so the lock is a flock on manifest.lock.
+    It is re-entrant within a thread, so a reindex holding it can run the
+    pipeline that records the files it indexed.
+
+    Args:
+        collection_name: Name of the collection
+        root: Directory holding the collections
+    """
+    path = os.path.join(root, collection_name)
+    held = _held.__dict__.setdefault("paths", set())
+    if path in held:
+        yield
+        return
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "manifest.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+
+
+class CollectionManifest:
+    """
+    Per-collection record of file path -> content hash -> chunk IDs
+
+    Used to work out which files changed since the last ingest so a reindex
+    only touches those. Load, update and save it under manifest_lock so
+    concurrent jobs do not overwrite each other's entries.
+    """
+
+    def __init__(self, collection_name: str, root: str = COLLECTIONS_DIR):
+        self.collection_name = collection_name
+        self.path = os.path.join(root, collection_name, "manifest.json")
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for a file, or None if it is not recorded"""
+        return self.files.get(file_path)
+
+    def record(self, file_path: str, file_hash: str, chunk_ids: List[str], **extra: Any) -> None:
+        """
+        Record the indexed state of a file
+
+        Args:
+            file_path: Path of the file as stored in the collection
+            file_hash: Content hash
+            chunk_ids: IDs of the chunks written for this file
+            extra: Additional fields such as size and mtime_ns
+        """
+        self.files[file_path] = {"hash": file_hash, "chunk_ids": chunk_ids, **extra}
+
+    def remove(self, file_path: str) -> List[str]:
+        """
+        Forget a file
+
+        Returns:
+            The chunk IDs that were recorded for it
+        """
+        entry = self.files.pop(file_path, None)
+        return entry["chunk_ids"] if entry else []
+
+    def save(self) -> None:
+        """Write the manifest atomically"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,483 @@
+import atexit
+import bisect
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Set to "false" to turn all instrumentation into no-ops
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Every process writes its metric values here so any process can export all of them
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.getcwd(), "data", "metrics"))
+
+# Seconds between writes of a process's values to METRICS_DIR
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1.0))
+
+# Buckets for whole stages and jobs, up to half an hour
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+# Buckets for requests, batches and single operations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Child:
+    """A metric bound to one set of label values"""
+
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: "_Metric", key: Tuple[str, ...]):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, -amount)
+
+    def set(self, value: float) -> None:
+        self._metric._set(self._key, value)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._children: Dict[Tuple[Any, ...], _Child] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any) -> _Child:
+        """
+        Bind label values, children are cached so hot paths can keep calling this
+
+        Args:
+            values: One value per label name
+
+        Returns:
+            Metric child for these label values
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = _Child(self, tuple(str(value) for value in values))
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._inc((), -amount)
+
+    def set(self, value: float) -> None:
+        self._set((), value)
+
+    def observe(self, value: float) -> None:
+        self._observe((), value)
+
+    def _inc(self, key: Tuple[str, ...], amount: float) -> None:
+        raise TypeError(f"{self.kind} {self.name} cannot be incremented")
+
+    def _set(self, key: Tuple[str, ...], value: float) -> None:
+        raise TypeError(f"{self.kind} {self.name} cannot be set")
+
+    def _observe(self, key: Tuple[str, ...], value: float) -> None:
+        raise TypeError(f"{self.kind} {self.name} cannot observe values")
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values = {}
+
+
+class Counter(_Metric):
+    """Monotonic total, summed over all processes"""
+
+    kind = "counter"
+
+    def _inc(self, key: Tuple[str, ...], amount: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self.registry.touch()
+
+
+class Gauge(_Metric):
+    """Current value, summed over the processes that are still alive"""
+
+    kind = "gauge"
+
+    def _inc(self, key: Tuple[str, ...], amount: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self.registry.touch()
+
+    def _set(self, key: Tuple[str, ...], value: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[key] = float(value)
+        self.registry.touch()
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in fixed buckets
+
+    Each label set keeps one count per bucket plus the sum; cumulative
+    bucket counts are only computed when the metrics are rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _observe(self, key: Tuple[str, ...], value: float) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket, one for +Inf, then the sum
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+        self.registry.touch()
+
+    def time(self, *labelvalues: Any) -> "_Timer":
+        """Return a context manager observing the duration of its block"""
+        return _Timer(self.labels(*labelvalues) if labelvalues else self)
+
+
+class _Timer:
+    __slots__ = ("_target", "_started")
+
+    def __init__(self, target: Any):
+        self._target = target
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._target.observe(time.perf_counter() - self._started)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Metrics of all processes of the service
+
+    Updates only touch in-memory values under a per-metric lock, so they
+    are cheap enough for hot loops. A background thread writes the values
+    of each process to its own file in METRICS_DIR, and the exporting
+    process merges those files with its live values: counters and
+    histograms are summed over all processes, gauges over the processes
+    that are still alive. Ingest jobs run in worker processes, so this is
+    how their metrics reach /metrics.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics: Dict[str, _Metric] = {}
+        self._dirty = False
+        self._flusher: Optional[threading.Thread] = None
+        self._flush_lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        self.last_flush: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    @property
+    def file_name(self) -> str:
+        return f"{os.getpid()}-{self._token}.json"
+
+    def touch(self) -> None:
+        """Mark values as changed, starting the flush thread of this process on first use"""
+        self._dirty = True
+        if self._flusher is None:
+            self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        with self._flush_lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def _after_fork(self) -> None:
+        # A forked worker starts from zero, its parent keeps reporting the inherited values
+        for metric in self.metrics.values():
+            metric._lock = threading.Lock()
+            metric.reset()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._dirty = False
+        self._token = uuid.uuid4().hex[:8]
+
+    def snapshot(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """Return the values of this process"""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self) -> None:
+        """Write the values of this process to its file in METRICS_DIR"""
+        if not METRICS_ENABLED:
+            return
+        with self._flush_lock:
+            self._dirty = False
+            data = {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in self.snapshot().items() if values
+            }
+            path = os.path.join(self.directory, self.file_name)
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = path + ".tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(temp_path, path)
+                self.last_flush = time.time()
+            except OSError as e:
+                self._dirty = True
+                self._error(f"Cannot write metrics to {self.directory}: {e}")
+
+    def _error(self, message: str) -> None:
+        self.last_error = message
+        self.last_error_at = time.time()
+
+    def _process_files(self) -> Iterator[Tuple[int, str]]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith(".json") or name == self.file_name:
+                continue
+            try:
+                yield int(name.split("-", 1)[0]), os.path.join(self.directory, name)
+            except ValueError:
+                continue
+
+    def collect(self) -> Tuple[Dict[str, Dict[Tuple[str, ...], Any]], int, List[str]]:
+        """
+        Merge the values of this process with those written by other processes
+
+        Returns:
+            Tuple of (values by metric name, number of processes, errors)
+        """
+        merged = self.snapshot()
+        processes = 1
+        errors = []
+        for pid, path in self._process_files():
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                errors.append(f"Cannot read {os.path.basename(path)}: {e}")
+                continue
+            alive = _pid_alive(pid)
+            processes += 1
+            for name, entries in data.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                values = merged[name]
+                for key, value in entries:
+                    key = tuple(key)
+                    if isinstance(value, list):
+                        current = values.get(key)
+                        if current is None:
+                            values[key] = value
+                        elif len(current) == len(value):
+                            # Bucket counts and sum add up element-wise
+                            values[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        values[key] = values.get(key, 0.0) + value
+        return merged, processes, errors
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format"""
+        merged, _, errors = self.collect()
+        if errors:
+            self._error(errors[-1])
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged[name].items()):
+                labels = [f'{label}="{_escape(part)}"' for label, part in zip(metric.labelnames, key)]
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{{{','.join(labels)}}} {_format_value(value)}" if labels
+                                 else f"{name} {_format_value(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(metric.buckets + (math.inf,), value[:-1]):
+                    cumulative += count
+                    bucket_labels = ",".join(labels + [f'le="{_format_value(bound)}"'])
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {_format_value(cumulative)}")
+                suffix = f"{{{','.join(labels)}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{suffix} {_format_value(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Report whether metrics are being recorded and exported
+
+        Returns:
+            Dictionary with status (ok, degraded or disabled), processes, series and the last error
+        """
+        if not METRICS_ENABLED:
+            return {"status": "disabled"}
+        merged, processes, errors = self.collect()
+        if errors:
+            self._error(errors[-1])
+        # A failed write or read within the last minutes means other processes may be missing
+        recent = self.last_error_at is not None and time.time() - self.last_error_at < max(60.0, 10 * self.flush_interval)
+        return {
+            "status": "degraded" if recent else "ok",
+            "processes": processes,
+            "series": sum(len(values) for values in merged.values()),
+            "last_flush_age_seconds": round(time.time() - self.last_flush, 1) if self.last_flush else None,
+            "last_error": self.last_error if recent else None
+        }
+
+    def remove_dead_files(self) -> int:
+        """
+        Remove the files of processes that have exited, so counters restart with the service
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        for pid, path in list(self._process_files()):
+            if not _pid_alive(pid):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+registry = MetricsRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry._after_fork)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    if registry._dirty:
+        registry.flush()
+
+
+# HTTP
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Time until the response starts, by route",
+    ("method", "route", "status")
+)
+
+# Ingest jobs
+JOB_STAGE_DURATION = registry.histogram(
+    "ingest_stage_duration_seconds", "Duration of each stage of an ingest job",
+    ("job_type", "stage"), buckets=DURATION_BUCKETS
+)
+JOB_DURATION = registry.histogram(
+    "ingest_job_duration_seconds", "Duration of ingest jobs on the scheduler",
+    ("job_type",), buckets=DURATION_BUCKETS
+)
+JOBS_FINISHED = registry.counter("ingest_jobs_total", "Finished ingest jobs", ("job_type", "status"))
+JOBS_REJECTED = registry.counter("ingest_jobs_rejected_total", "Ingest jobs rejected by a full queue", ("job_type",))
+JOBS_RUNNING = registry.gauge("ingest_jobs_running", "Ingest jobs running on the scheduler", ("job_type",))
+JOBS_QUEUED = registry.gauge("ingest_jobs_queued", "Ingest jobs waiting for a free worker", ("job_type",))
+
+# Indexing pipeline
+FILES_INDEXED = registry.counter("indexing_files_total", "Files read into the indexing pipeline")
+BYTES_INDEXED = registry.counter("indexing_bytes_total", "Bytes of file content read into the indexing pipeline")
+FILE_ERRORS = registry.counter("indexing_file_errors_total", "Files that failed to index")
+LOG_LINES = registry.counter("indexing_log_lines_total", "Log lines mined into templates")
+PIPELINE_STAGE_DURATION = registry.histogram(
+    "indexing_stage_duration_seconds", "Duration of each unit of work in a pipeline stage, e.g. one embedding batch",
+    ("stage",)
+)
+CHUNKS_EMBEDDED = registry.counter(
+    "embedding_chunks_total", "Chunks embedded by the model or served from the embedding cache", ("source",)
+)
+CHUNKS_INDEXED = registry.counter(
+    "indexing_chunks_total", "Chunks produced by ingest, stored or folded into an identical stored chunk", ("kind",)
+)
+
+# Vector store
+VECTOR_WRITE_DURATION = registry.histogram("vector_store_write_seconds", "Duration of vector store writes")
+VECTOR_ROWS_WRITTEN = registry.counter("vector_store_rows_written_total", "Chunks written to vector stores")
+VECTOR_SEARCH_DURATION = registry.histogram("vector_store_search_seconds", "Duration of vector store searches")
@@ -0,0 +1,95 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# Rows of codes decoded per block while scoring
+SCORE_BLOCK_ROWS = 65536
+
+# Vectors sampled to fit the quantizer range
+QUANT_TRAIN_SAMPLE = int(os.getenv("QUANT_TRAIN_SAMPLE", 100000))
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 scalar quantizer
+
+    Each dimension is mapped linearly from its observed [min, max] range to
+    the 256 values of a uint8 code, which stores a vector in a quarter of
+    the float32 size. Inner products are computed directly on the codes:
+    q . x ~= q . min + (q * scale) . code, so scoring never materializes the
+    decoded vectors.
+    """
+
+    def __init__(self, mins: np.ndarray, scales: np.ndarray):
+        self.mins = np.asarray(mins, dtype=np.float32)
+        self.scales = np.asarray(scales, dtype=np.float32)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, sample: int = QUANT_TRAIN_SAMPLE, seed: int = 0) -> "ScalarQuantizer":
+        """
+        Fit the quantizer range to a set of vectors
+
+        Args:
+            vectors: Vectors to fit, may be memory-mapped
+            sample: Maximum number of vectors used
+            seed: Random seed for the sample
+
+        Returns:
+            Trained quantizer
+        """
+        if len(vectors) > sample:
+            rows = np.sort(np.random.default_rng(seed).choice(len(vectors), size=sample, replace=False))
+            vectors = vectors[rows]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        mins = vectors.min(axis=0)
+        scales = (vectors.max(axis=0) - mins) / 255.0
+        scales[scales == 0] = 1.0
+        return cls(mins, scales)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ScalarQuantizer"]:
+        """Load a quantizer saved with save, or None if there is none"""
+        if not os.path.exists(path):
+            return None
+        params = np.fromfile(path, dtype=np.float32)
+        mins, scales = np.split(params, 2)
+        return cls(mins, scales)
+
+    def save(self, path: str) -> None:
+        temp_path = path + ".tmp"
+        np.concatenate([self.mins, self.scales]).tofile(temp_path)
+        os.replace(temp_path, path)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Encode vectors as uint8 codes, values outside the fitted range are clipped
+
+        Args:
+            vectors: Matrix of vectors
+
+        Returns:
+            Matrix of codes
+        """
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.mins) / self.scales)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def scores(self, codes: np.ndarray, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        Approximate inner products between queries and encoded rows
+
+        Args:
+            codes: Matrix of all codes, may be memory-mapped
+            rows: Rows to score
+            queries: Query matrix
+
+        Returns:
+            Score matrix of shape (queries, rows)
+        """
+        weights = (queries * self.scales).T
+        offsets = queries @ self.mins
+        result = np.empty((len(queries), len(rows)), dtype=np.float32)
+        for start in range(0, len(rows), SCORE_BLOCK_ROWS):
+            block = codes[rows[start:start + SCORE_BLOCK_ROWS]].astype(np.float32)
+            result[:, start:start + len(block)] = (block @ weights).T
+        return result + offsets[:, None]
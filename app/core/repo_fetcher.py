@@ -0,0 +1,169 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Bare mirrors of previously submitted repositories
+MIRROR_CACHE_DIR = os.getenv("MIRROR_CACHE_DIR", os.path.join(os.getcwd(), "data", "mirrors"))
+
+# Working checkouts, one per collection
+CHECKOUT_DIR = os.getenv("CHECKOUT_DIR", os.path.join(os.getcwd(), "repos"))
+
+GIT_TIMEOUT = int(os.getenv("GIT_TIMEOUT", 600))
+
+# Only these file types are checked out
+INDEXABLE_EXTENSIONS = [
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".java", ".go", ".rb", ".php",
+    ".c", ".h", ".cpp", ".hpp", ".cc", ".cs", ".rs", ".kt", ".scala", ".swift",
+    ".html", ".css", ".scss", ".sql", ".sh", ".md", ".rst", ".txt",
+    ".json", ".yaml", ".yml", ".toml", ".ini", ".cfg", ".xml"
+]
+
+
+def _git(*args: str, cwd: str = None) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        timeout=GIT_TIMEOUT,
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Serialize fetches of the same mirror across jobs and processes"""
+    with open(f"{path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def mirror_path_for(repo_url: str, mirror_dir: str = MIRROR_CACHE_DIR) -> str:
+    """Return the mirror location used for a repository URL"""
+    digest = hashlib.sha1(repo_url.rstrip("/").encode("utf-8")).hexdigest()[:16]
+    return os.path.join(mirror_dir, f"{digest}.git")
+
+
+def _update_mirror(repo_url: str, mirror_path: str) -> bool:
+    """
+    Create or refresh the bare mirror of a repository
+
+    Returns:
+        True if an existing mirror was reused
+    """
+    if os.path.isdir(mirror_path):
+        _git("fetch", "--depth", "1", "--filter=blob:none", "--prune", "origin", cwd=mirror_path)
+        return True
+
+    partial_path = f"{mirror_path}.partial"
+    shutil.rmtree(partial_path, ignore_errors=True)
+    _git(
+        "clone", "--bare", "--single-branch", "--depth", "1", "--filter=blob:none",
+        repo_url, partial_path
+    )
+
+    # Bare clones have no fetch refspec, add one for the default branch
+    branch = _git("symbolic-ref", "HEAD", cwd=partial_path)
+    _git("config", "remote.origin.fetch", f"+{branch}:{branch}", cwd=partial_path)
+    os.replace(partial_path, mirror_path)
+    return False
+
+
+def _remove_checkout(mirror_path: str, target_dir: str) -> None:
+    if os.path.exists(target_dir):
+        shutil.rmtree(target_dir)
+    _git("worktree", "prune", cwd=mirror_path)
+
+
+def _inside(path: str, directory: str) -> bool:
+    """Return True if path resolves to a location strictly below directory"""
+    path = os.path.realpath(path)
+    directory = os.path.realpath(directory)
+    return path != directory and os.path.commonpath([path, directory]) == directory
+
+
+def fetch_repository(repo_url: str,
+                     target_dir: str,
+                     extensions: List[str] = INDEXABLE_EXTENSIONS,
+                     mirror_dir: str = MIRROR_CACHE_DIR,
+                     checkout_dir: str = CHECKOUT_DIR) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Check out the latest commit of a repository through the mirror cache
+
+    The mirror is a shallow, single-branch, blobless bare clone, so the first
+    fetch downloads only the tree of the latest commit and later fetches are
+    incremental. The checkout is a sparse worktree of the mirror limited to
+    indexable file types; git downloads just the blobs of those files.
+
+    Works with any URL git understands, including file:// repositories.
+
+    Args:
+        repo_url: URL of the repository
+        target_dir: Directory for the working checkout, replaced if present
+        extensions: File extensions to check out
+        mirror_dir: Directory holding the bare mirrors
+        checkout_dir: Directory target_dir must resolve under, since it is deleted first
+
+    Returns:
+        Tuple of (file_list, stats) where stats has clone_seconds,
+        bytes_transferred, mirror_hit and commit
+
+    Raises:
+        ValueError: If target_dir is not below checkout_dir
+    """
+    if not _inside(target_dir, checkout_dir):
+        raise ValueError(f"Checkout directory {target_dir} is outside {checkout_dir}")
+    os.makedirs(mirror_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+    mirror_path = mirror_path_for(repo_url, mirror_dir)
+
+    started = time.monotonic()
+    with _locked(mirror_path):
+        size_before = _directory_size(mirror_path) if os.path.isdir(mirror_path) else 0
+        mirror_hit = _update_mirror(repo_url, mirror_path)
+
+        _remove_checkout(mirror_path, target_dir)
+        commit = _git("rev-parse", "HEAD", cwd=mirror_path)
+        _git("worktree", "add", "--detach", "--no-checkout", os.path.abspath(target_dir), commit, cwd=mirror_path)
+        _git("sparse-checkout", "set", "--no-cone", *[f"*{ext}" for ext in extensions], cwd=target_dir)
+        _git("checkout", "--detach", commit, cwd=target_dir)
+
+        # Lazily fetched blobs land in the mirror too
+        bytes_transferred = _directory_size(mirror_path) - size_before
+
+    file_list = []
+    for root, dirs, files in os.walk(target_dir):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for file in files:
+            if file != ".git":
+                file_list.append(os.path.join(root, file))
+
+    stats = {
+        "clone_seconds": round(time.monotonic() - started, 3),
+        "bytes_transferred": max(bytes_transferred, 0),
+        "mirror_hit": mirror_hit,
+        "commit": commit
+    }
+    return file_list, stats
@@ -0,0 +1,318 @@
+import hashlib
+import heapq
+import json
+import os
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.vector_store import COLLECTIONS_DIR, VectorStore, measure_recall
+
+# Shards of new collections, 1 keeps a single vector store
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 1))
+
+# How files are assigned to shards: "hash" of the path or top-level "directory"
+SHARD_STRATEGY = os.getenv("SHARD_STRATEGY", "hash")
+
+# Processes searching shards in parallel, "thread" runs them on threads instead
+SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", os.cpu_count() or 1))
+SHARD_SEARCH_POOL = os.getenv("SHARD_SEARCH_POOL", "process")
+
+SHARD_STRATEGIES = ("hash", "directory")
+
+
+class ShardLayout:
+    """
+    Assignment of files and chunks to the shards of a collection
+    """
+
+    def __init__(self, shards: int, strategy: str = "hash"):
+        if shards < 1:
+            raise ValueError("A collection needs at least one shard")
+        if strategy not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy: {strategy}")
+        self.shards = shards
+        self.strategy = strategy
+
+    def shard_of_path(self, file_path: str) -> int:
+        """
+        Return the shard holding a file
+
+        Args:
+            file_path: File path as stored in the chunk metadata
+
+        Returns:
+            Shard number
+        """
+        if self.strategy == "directory":
+            top = file_path.replace("\\", "/").lstrip("/").split("/", 1)[0]
+            return zlib.crc32(top.encode("utf-8")) % self.shards
+        # Same prefix as the chunk IDs, so IDs route without a lookup
+        return int(hashlib.sha1(file_path.encode("utf-8")).hexdigest()[:16], 16) % self.shards
+
+    def shard_of_id(self, chunk_id: str) -> Optional[int]:
+        """
+        Return the shard holding a chunk, or None if only a search of all shards can tell
+
+        Args:
+            chunk_id: Chunk ID
+
+        Returns:
+            Shard number or None
+        """
+        if self.strategy != "hash":
+            return None
+        prefix = chunk_id.split("-", 1)[0]
+        try:
+            return int(prefix, 16) % self.shards
+        except ValueError:
+            return None
+
+
+def shard_layout(collection_name: str, root: str = COLLECTIONS_DIR) -> Optional[ShardLayout]:
+    """
+    Return the shard layout of a collection
+
+    New collections are laid out with SHARD_COUNT shards; collections that
+    already hold an unsharded vector store stay unsharded.
+
+    Args:
+        collection_name: Name of the collection
+        root: Directory holding the collections
+
+    Returns:
+        Shard layout, or None for an unsharded collection
+    """
+    path = os.path.join(root, collection_name)
+    layout_path = os.path.join(path, "shards.json")
+    if os.path.exists(layout_path):
+        with open(layout_path, "r") as f:
+            layout = json.load(f)
+        return ShardLayout(layout["shards"], layout["strategy"])
+
+    if SHARD_COUNT <= 1 or os.path.exists(os.path.join(path, "chunks.db")):
+        return None
+    return create_shards(collection_name, SHARD_COUNT, SHARD_STRATEGY, root)
+
+
+def create_shards(collection_name: str, shards: int, strategy: str = "hash",
+                  root: str = COLLECTIONS_DIR) -> ShardLayout:
+    """
+    Lay out an empty collection as shards
+
+    Args:
+        collection_name: Name of the collection
+        shards: Number of shards
+        strategy: "hash" or "directory"
+        root: Directory holding the collections
+
+    Returns:
+        Shard layout
+    """
+    path = os.path.join(root, collection_name)
+    if os.path.exists(os.path.join(path, "chunks.db")):
+        raise ValueError(f"Collection {collection_name} already has an unsharded vector store")
+
+    layout = ShardLayout(shards, strategy)
+    os.makedirs(path, exist_ok=True)
+    temp_path = os.path.join(path, "shards.json.tmp")
+    with open(temp_path, "w") as f:
+        json.dump({"shards": shards, "strategy": strategy}, f)
+    os.replace(temp_path, os.path.join(path, "shards.json"))
+    return layout
+
+
+def open_vector_store(collection_name: str, root: str = COLLECTIONS_DIR):
+    """
+    Open the vector store of a collection, sharded or not
+
+    Args:
+        collection_name: Name of the collection
+        root: Directory holding the collections
+
+    Returns:
+        VectorStore or ShardedVectorStore
+    """
+    layout = shard_layout(collection_name, root)
+    if layout is None:
+        return VectorStore(collection_name, root)
+    return ShardedVectorStore(collection_name, layout, root)
+
+
+def _search_shard(shard_root: str, shard_name: str, query_embeddings: List[List[float]],
+                  k: int, exact: bool, nprobe: Optional[int]) -> List[List[Dict[str, Any]]]:
+    store = VectorStore(shard_name, shard_root)
+    try:
+        return store.search_many(query_embeddings, k, exact=exact, nprobe=nprobe)
+    finally:
+        store.close()
+
+
+_search_pool: Optional[Executor] = None
+_search_pool_pid: Optional[int] = None
+
+
+def _get_search_pool() -> Executor:
+    global _search_pool, _search_pool_pid
+    if _search_pool is None or _search_pool_pid != os.getpid():
+        if SHARD_SEARCH_POOL == "thread":
+            _search_pool = ThreadPoolExecutor(max_workers=SHARD_SEARCH_WORKERS)
+        else:
+            _search_pool = ProcessPoolExecutor(max_workers=SHARD_SEARCH_WORKERS)
+        _search_pool_pid = os.getpid()
+    return _search_pool
+
+
+class ShardedVectorStore:
+    """
+    Vector store of a collection split into independent shards
+
+    Each shard is a complete VectorStore with its own vector file and
+    index. Writes are routed to the shard of the chunk's file and applied
+    to all shards in parallel; searches fan out over a process pool and
+    the per-shard top-k lists are merged by score.
+    """
+
+    def __init__(self, collection_name: str, layout: ShardLayout, root: str = COLLECTIONS_DIR):
+        self.collection_name = collection_name
+        self.layout = layout
+        self.shard_root = os.path.join(root, collection_name, "shards")
+        self.shard_names = [f"{shard:03d}" for shard in range(layout.shards)]
+        self.shards = [VectorStore(name, self.shard_root) for name in self.shard_names]
+
+    def _parallel(self, fn, shards: List[int]) -> List[Any]:
+        if len(shards) <= 1:
+            return [fn(shard) for shard in shards]
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            return list(executor.map(fn, shards))
+
+    def add(self,
+            ids: List[str],
+            documents: List[str],
+            embeddings: List[List[float]],
+            metadatas: List[Dict[str, Any]]) -> None:
+        """Add a batch of chunks, writing each shard's part in parallel"""
+        groups: Dict[int, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            shard = self.layout.shard_of_path(metadata.get("file_path", ids[i]))
+            groups.setdefault(shard, []).append(i)
+
+        def write(shard: int) -> None:
+            positions = groups[shard]
+            self.shards[shard].add(
+                [ids[i] for i in positions],
+                [documents[i] for i in positions],
+                [embeddings[i] for i in positions],
+                [metadatas[i] for i in positions]
+            )
+
+        self._parallel(write, list(groups))
+
+    def _route(self, ids: List[str]) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        for chunk_id in ids:
+            shard = self.layout.shard_of_id(chunk_id)
+            for target in ([shard] if shard is not None else range(self.layout.shards)):
+                groups.setdefault(target, []).append(chunk_id)
+        return groups
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete chunks by ID"""
+        groups = self._route(ids)
+        self._parallel(lambda shard: self.shards[shard].delete(groups[shard]), list(groups))
+
+    def get(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch chunks by ID, in the order of the IDs that exist"""
+        groups = self._route(ids)
+        found = {}
+        for chunks in self._parallel(lambda shard: self.shards[shard].get(groups[shard]), list(groups)):
+            found.update((chunk["id"], chunk) for chunk in chunks)
+        return [found[chunk_id] for chunk_id in ids if chunk_id in found]
+
+    def count(self) -> int:
+        """Return the number of live chunks"""
+        return sum(shard.count() for shard in self.shards)
+
+    def search(self, query_embedding: List[float], k: int = 5) -> List[Dict[str, Any]]:
+        """Inner-product search over the live chunks of all shards"""
+        return self.search_many([query_embedding], k)[0]
+
+    def search_many(self,
+                    query_embeddings: List[List[float]],
+                    k: int = 5,
+                    exact: bool = False,
+                    nprobe: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search all shards in parallel and merge their top-k lists
+
+        Args:
+            query_embeddings: Query vectors
+            k: Number of results per query
+            exact: Scan all rows even if the shards have an IVF index
+            nprobe: Lists scanned per query and shard
+
+        Returns:
+            One list of chunk dictionaries with a score per query, best first
+        """
+        if not query_embeddings:
+            return []
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32).tolist()
+        pool = _get_search_pool()
+        futures = [
+            pool.submit(_search_shard, self.shard_root, name, query_embeddings, k, exact, nprobe)
+            for name in self.shard_names
+        ]
+        per_shard = [future.result() for future in futures]
+        return [
+            heapq.nlargest(k, (hit for shard_hits in per_shard for hit in shard_hits[query]),
+                           key=lambda hit: hit["score"])
+            for query in range(len(query_embeddings))
+        ]
+
+    def configure_index(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Apply vector index and storage settings to every shard"""
+        self._parallel(lambda shard: self.shards[shard].configure_index(*args, **kwargs),
+                       list(range(self.layout.shards)))
+        return self.index_stats()
+
+    def compact(self, *args: Any, **kwargs: Any) -> bool:
+        """Compact the vector files of shards with many dead rows"""
+        return any(self._parallel(lambda shard: self.shards[shard].compact(*args, **kwargs),
+                                  list(range(self.layout.shards))))
+
+    def refresh_index(self) -> bool:
+        """Rebuild the IVF index of shards with many rows added since their build"""
+        return any(self._parallel(lambda shard: self.shards[shard].refresh_index(),
+                                  list(range(self.layout.shards))))
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Return the index settings with rows and bytes summed over the shards"""
+        per_shard = [shard.index_stats() for shard in self.shards]
+        stats = dict(per_shard[0])
+        for key in ("nlist", "live_rows", "indexed_rows", "unindexed_rows",
+                    "vector_bytes", "code_bytes", "index_bytes", "search_bytes"):
+            stats[key] = sum(shard_stats[key] for shard_stats in per_shard)
+        stats["shards"] = self.layout.shards
+        stats["shard_strategy"] = self.layout.strategy
+        stats["shard_rows"] = [shard_stats["live_rows"] for shard_stats in per_shard]
+        return stats
+
+    def measure_recall(self, k: int = 10, queries: int = 100, seed: int = 0) -> Dict[str, Any]:
+        """Compare the configured sharded search with an exact scan of all shards"""
+        return measure_recall(self, k, queries, seed)
+
+    def sample_vectors(self, count: int, seed: int = 0) -> np.ndarray:
+        """Return stored vectors of randomly chosen live chunks"""
+        per_shard = max(1, count // self.layout.shards + 1)
+        samples = [shard.sample_vectors(per_shard, seed) for shard in self.shards]
+        samples = [sample for sample in samples if len(sample)]
+        if not samples:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(samples)[:count]
+
+    def close(self) -> None:
+        """Close the shard databases"""
+        for shard in self.shards:
+            shard.close()
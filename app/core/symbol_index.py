@@ -0,0 +1,330 @@
+import ast
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.vector_store import COLLECTIONS_DIR
+
+_BRACE_LANGUAGES = {
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java",
+    ".go": "go"
+}
+
+_DEFINITION_PATTERNS = {
+    "javascript": [
+        (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), "function"),
+        (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?class\s+([A-Za-z_$][\w$]*)"), "class"),
+        (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"), "function"),
+        (re.compile(r"^\s+(?:static\s+)?(?:async\s+)?([A-Za-z_$][\w$]*)\s*\([^)]*\)\s*\{"), "method")
+    ],
+    "java": [
+        (re.compile(r"^\s*(?:[\w@]+\s+)*(?:class|interface|enum|record)\s+([A-Za-z_]\w*)"), "class"),
+        (re.compile(r"^\s*(?:(?:public|private|protected|static|final|abstract|synchronized|native)\s+)*[\w<>\[\],.? ]+\s+([A-Za-z_]\w*)\s*\([^;]*$"), "method")
+    ],
+    "go": [
+        (re.compile(r"^func\s+\([^)]*\)\s*([A-Za-z_]\w*)"), "method"),
+        (re.compile(r"^func\s+([A-Za-z_]\w*)"), "function"),
+        (re.compile(r"^type\s+([A-Za-z_]\w*)\s+(?:struct|interface)"), "class")
+    ]
+}
+_DEFINITION_PATTERNS["typescript"] = _DEFINITION_PATTERNS["javascript"] + [
+    (re.compile(r"^\s*(?:export\s+)?(?:interface|type|enum)\s+([A-Za-z_$][\w$]*)"), "class")
+]
+
+_IMPORT_PATTERNS = [
+    re.compile(r"^\s*import\s+.*?from\s+['\"]([^'\"]+)['\"]"),
+    re.compile(r"^\s*import\s+['\"]([^'\"]+)['\"]"),
+    re.compile(r"require\(\s*['\"]([^'\"]+)['\"]\s*\)"),
+    re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+\*?)\s*;"),
+    re.compile(r"^\s*(?:import\s+)?(?:[A-Za-z_]\w*\s+)?\"([\w./-]+)\"\s*$")
+]
+
+_CALL = re.compile(r"([A-Za-z_$][\w$]*)\s*\(")
+_KEYWORDS = {
+    "if", "for", "while", "switch", "catch", "return", "function", "new", "typeof",
+    "super", "this", "func", "else", "try", "do", "case", "throw", "await", "yield",
+    "sizeof", "synchronized", "import", "require", "defer", "go", "select", "make",
+    "async", "catch", "constructor"
+}
+_GO_RECEIVER = re.compile(r"^func\s+\(\s*(?:\w+\s+)?\*?\s*([A-Za-z_]\w*)")
+
+
+def _python_symbols(content: str) -> Dict[str, List[Dict[str, Any]]]:
+    tree = ast.parse(content)
+    definitions, references = [], []
+
+    def visit(node: ast.AST, scope: Optional[str]) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                if isinstance(child, ast.ClassDef):
+                    kind = "class"
+                else:
+                    kind = "method" if scope and scope[0] == "class" else "function"
+                qualified = f"{scope[1]}.{child.name}" if scope else child.name
+                definitions.append({
+                    "name": child.name,
+                    "qualified_name": qualified,
+                    "kind": kind,
+                    "start_line": child.lineno,
+                    "end_line": getattr(child, "end_lineno", child.lineno)
+                })
+                visit(child, ("class" if kind == "class" else "function", qualified))
+                continue
+
+            if isinstance(child, ast.Import):
+                for alias in child.names:
+                    references.append({"name": alias.name, "kind": "import", "line": child.lineno})
+            elif isinstance(child, ast.ImportFrom):
+                for alias in child.names:
+                    module = f"{child.module}." if child.module else ""
+                    references.append({"name": f"{module}{alias.name}", "kind": "import", "line": child.lineno})
+            elif isinstance(child, ast.Call):
+                func = child.func
+                name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+                if name:
+                    references.append({"name": name, "kind": "call", "line": child.lineno})
+            visit(child, scope)
+
+    visit(tree, None)
+    return {"definitions": definitions, "references": references}
+
+
+def _block_end(lines: List[str], start: int) -> int:
+    """Find the line closing the brace block opened at or after start"""
+    depth = 0
+    opened = False
+    for index in range(start, len(lines)):
+        for char in lines[index]:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+        if opened and depth <= 0:
+            return index + 1
+        if not opened and index > start and lines[index].strip().endswith(";"):
+            return index + 1
+    return len(lines)
+
+
+def _brace_symbols(content: str, language: str) -> Dict[str, List[Dict[str, Any]]]:
+    lines = content.splitlines()
+    definitions, references = [], []
+    classes: List[Tuple[str, int]] = []
+
+    for index, line in enumerate(lines):
+        line_number = index + 1
+        stripped = line.strip()
+        if stripped.startswith(("//", "*", "/*")):
+            continue
+
+        classes = [(name, end) for name, end in classes if end >= line_number]
+        defined = None
+        for pattern, kind in _DEFINITION_PATTERNS[language]:
+            match = pattern.search(line)
+            if match and match.group(1) not in _KEYWORDS:
+                end_line = _block_end(lines, index)
+                enclosing = classes[-1][0] if classes else None
+                if kind == "function" and enclosing:
+                    kind = "method"
+                if language == "go" and kind == "method":
+                    receiver = _GO_RECEIVER.search(line)
+                    enclosing = receiver.group(1) if receiver else None
+                qualified = f"{enclosing}.{match.group(1)}" if enclosing and kind == "method" else match.group(1)
+                definitions.append({
+                    "name": match.group(1),
+                    "qualified_name": qualified,
+                    "kind": kind,
+                    "start_line": line_number,
+                    "end_line": end_line
+                })
+                if kind == "class":
+                    classes.append((match.group(1), end_line))
+                defined = match.group(1)
+                break
+
+        for pattern in _IMPORT_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                references.append({"name": match.group(1), "kind": "import", "line": line_number})
+                break
+
+        for match in _CALL.finditer(line):
+            name = match.group(1)
+            if name not in _KEYWORDS and name != defined:
+                references.append({"name": name, "kind": "call", "line": line_number})
+
+    return {"definitions": definitions, "references": references}
+
+
+def extract_symbols(file_path: str, content: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Extract definitions, imports and call sites from a source file
+
+    Python is parsed with ast; JavaScript, TypeScript, Java and Go go
+    through a lightweight line tokenizer. Other files yield no symbols.
+
+    Args:
+        file_path: Path of the file, used to pick the language
+        content: File content
+
+    Returns:
+        Dict with "definitions" and "references" lists
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    try:
+        if extension == ".py":
+            return _python_symbols(content)
+        if extension in _BRACE_LANGUAGES:
+            return _brace_symbols(content, _BRACE_LANGUAGES[extension])
+    except (SyntaxError, ValueError, RecursionError):
+        pass
+    return {"definitions": [], "references": []}
+
+
+def attach_chunk_ids(symbols: Dict[str, List[Dict[str, Any]]], chunks: List[Dict[str, Any]]) -> None:
+    """
+    Record which chunks cover each definition and reference
+
+    Args:
+        symbols: Output of extract_symbols, updated in place
+        chunks: Chunks of the same file
+    """
+    spans = [(c["metadata"]["start_line"], c["metadata"]["end_line"], c["id"]) for c in chunks]
+    for definition in symbols["definitions"]:
+        definition["chunk_ids"] = [
+            chunk_id for start, end, chunk_id in spans
+            if start <= definition["end_line"] and end >= definition["start_line"]
+        ]
+    for reference in symbols["references"]:
+        reference["chunk_ids"] = [
+            chunk_id for start, end, chunk_id in spans if start <= reference["line"] <= end
+        ][:1]
+
+
+class SymbolIndex:
+    """
+    Per-collection symbol table for definition and reference lookups
+    """
+
+    def __init__(self, collection_name: str, root: str = COLLECTIONS_DIR):
+        path = os.path.join(root, collection_name)
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, "symbols.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS definitions ("
+            "name TEXT NOT NULL, qualified_name TEXT NOT NULL, kind TEXT NOT NULL, "
+            "file_path TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL, "
+            "chunk_ids TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs ("
+            "name TEXT NOT NULL, kind TEXT NOT NULL, file_path TEXT NOT NULL, "
+            "line INTEGER NOT NULL, chunk_id TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS definitions_name ON definitions (name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS definitions_qualified ON definitions (qualified_name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS definitions_file ON definitions (file_path)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_name ON refs (name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_file ON refs (file_path)")
+        self._conn.commit()
+
+    def _delete_locked(self, file_paths: List[str]) -> None:
+        self._conn.executemany("DELETE FROM definitions WHERE file_path = ?", [(p,) for p in file_paths])
+        self._conn.executemany("DELETE FROM refs WHERE file_path = ?", [(p,) for p in file_paths])
+
+    def replace_files(self, symbols_by_file: Dict[str, Dict[str, List[Dict[str, Any]]]]) -> None:
+        """
+        Store the symbols of a batch of files, replacing what was there
+
+        Args:
+            symbols_by_file: Mapping of file path to extract_symbols output with chunk IDs
+        """
+        if not symbols_by_file:
+            return
+        with self._lock:
+            self._delete_locked(list(symbols_by_file))
+            self._conn.executemany(
+                "INSERT INTO definitions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (d["name"], d["qualified_name"], d["kind"], file_path,
+                     d["start_line"], d["end_line"], ",".join(d.get("chunk_ids", [])))
+                    for file_path, symbols in symbols_by_file.items()
+                    for d in symbols["definitions"]
+                ]
+            )
+            self._conn.executemany(
+                "INSERT INTO refs VALUES (?, ?, ?, ?, ?)",
+                [
+                    (r["name"], r["kind"], file_path, r["line"], (r.get("chunk_ids") or [None])[0])
+                    for file_path, symbols in symbols_by_file.items()
+                    for r in symbols["references"]
+                ]
+            )
+            self._conn.commit()
+
+    def delete_files(self, file_paths: List[str]) -> None:
+        """Forget every symbol of the given files"""
+        if not file_paths:
+            return
+        with self._lock:
+            self._delete_locked(file_paths)
+            self._conn.commit()
+
+    def definitions(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Find where a symbol is defined
+
+        Args:
+            name: Plain or qualified name, e.g. "index_files" or "CodeService.index_files"
+
+        Returns:
+            List of definition records
+        """
+        column = "qualified_name" if "." in name else "name"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT name, qualified_name, kind, file_path, start_line, end_line, chunk_ids "
+                f"FROM definitions WHERE {column} = ? LIMIT ?",
+                (name, limit)
+            ).fetchall()
+        return [
+            {"name": n, "qualified_name": q, "kind": k, "file_path": f,
+             "start_line": s, "end_line": e, "chunk_ids": c.split(",") if c else []}
+            for n, q, k, f, s, e, c in rows
+        ]
+
+    def references(self, name: str, kind: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Find call sites and imports of a symbol
+
+        Args:
+            name: Symbol name, the last dotted part is used for calls
+            kind: Optional filter, "call" or "import"
+
+        Returns:
+            List of reference records
+        """
+        query = "SELECT name, kind, file_path, line, chunk_id FROM refs WHERE name = ?"
+        params: List[Any] = [name.rsplit(".", 1)[-1] if kind != "import" else name]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY file_path, line LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {"name": n, "kind": k, "file_path": f, "line": l, "chunk_id": c}
+            for n, k, f, l, c in rows
+        ]
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
@@ -0,0 +1,218 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Depth of the parse tree, the first DEPTH - 2 tokens route a line to its leaf
+TEMPLATE_DEPTH = int(os.getenv("LOG_TEMPLATE_DEPTH", 4))
+
+# Fraction of equal tokens needed to join an existing template
+SIMILARITY_THRESHOLD = float(os.getenv("LOG_TEMPLATE_SIMILARITY", 0.4))
+
+# Children per inner node before further tokens share a wildcard branch
+MAX_CHILDREN = int(os.getenv("LOG_TEMPLATE_MAX_CHILDREN", 100))
+
+# Templates kept in memory, the least recently matched are evicted first
+MAX_TEMPLATES = int(os.getenv("LOG_MAX_TEMPLATES", 50000))
+
+WILDCARD = "<*>"
+
+# Earlier alternatives win
+_MASK = re.compile("|".join([
+    r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b",
+    r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b",
+    r"\b0x[0-9a-fA-F]+\b",
+    r"\b[0-9a-fA-F]{16,}\b",
+    r"(?<![A-Za-z_])[-+]?\d+(?:\.\d+)?(?:ms|s|kb|mb|gb|b|%)?(?![A-Za-z_])",
+]))
+
+_LEVEL = re.compile(r"\b(TRACE|DEBUG|INFO|NOTICE|WARN|WARNING|ERROR|SEVERE|FATAL|CRITICAL)\b")
+
+ERROR_LEVELS = {"ERROR", "SEVERE", "FATAL", "CRITICAL"}
+
+
+_DIGIT = re.compile(r"\d")
+
+
+def mask_tokens(content: str) -> List[str]:
+    """
+    Split a message into tokens, replacing IDs, addresses and numbers with wildcards
+
+    Args:
+        content: Log message without its timestamp
+
+    Returns:
+        Masked tokens
+    """
+    # Every masked pattern contains a digit, so most tokens skip the regex
+    return [
+        _MASK.sub(WILDCARD, token) if _DIGIT.search(token) else token
+        for token in content.split()
+    ]
+
+
+class LogTemplate:
+    """
+    A group of log lines sharing one template
+    """
+
+    __slots__ = ("id", "tokens", "count", "first_seen", "last_seen", "first_line", "sample", "level")
+
+    def __init__(self, template_id: int, tokens: List[str], line_number: int, sample: str,
+                 timestamp: Optional[str], level: Optional[str]):
+        self.id = template_id
+        self.tokens = tokens
+        self.count = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.first_line = line_number
+        self.sample = sample
+        self.level = level
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "template": self.template,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "first_line": self.first_line,
+            "sample": self.sample,
+            "level": self.level
+        }
+
+    def document(self) -> str:
+        """Return the text indexed for this template"""
+        lines = [self.template, f"Occurrences: {self.count}"]
+        if self.first_seen:
+            lines.append(f"Seen from {self.first_seen} to {self.last_seen}")
+        if self.level:
+            lines.append(f"Level: {self.level}")
+        lines.append(f"Example: {self.sample}")
+        return "\n".join(lines)
+
+
+class TemplateMiner:
+    """
+    Drain-style online log template miner
+
+    Lines are routed through a fixed-depth tree by token count and leading
+    tokens, then matched against the few templates in that leaf. A line that
+    matches a template closely enough widens it by turning differing tokens
+    into wildcards; otherwise it starts a new template. Memory is bounded by
+    the number of templates, not the number of lines.
+    """
+
+    def __init__(self,
+                 depth: int = TEMPLATE_DEPTH,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD,
+                 max_children: int = MAX_CHILDREN,
+                 max_templates: int = MAX_TEMPLATES):
+        self.depth = max(depth, 3)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_templates = max_templates
+
+        self.lines = 0
+        self.evicted = 0
+        self._root: Dict[Any, Any] = {}
+        self._templates: "OrderedDict[int, LogTemplate]" = OrderedDict()
+        self._leaves: Dict[int, List[LogTemplate]] = {}
+        self._exact: Dict[Tuple[str, ...], LogTemplate] = {}
+        self._next_id = 0
+
+    @property
+    def templates(self) -> List[LogTemplate]:
+        return list(self._templates.values())
+
+    def add(self, line: str, timestamp: Optional[str] = None, content: Optional[str] = None) -> LogTemplate:
+        """
+        Add a log line
+
+        Args:
+            line: Full log line, kept as the sample of a new template
+            timestamp: Timestamp of the line, if known
+            content: Message to mine, defaults to the line
+
+        Returns:
+            The template the line was assigned to
+        """
+        self.lines += 1
+        tokens = mask_tokens(content if content is not None else line)
+        key = tuple(tokens)
+
+        # Repeated messages skip the tree walk, templates only ever widen
+        template = self._exact.get(key)
+        if template is not None and template.id in self._templates:
+            self._templates.move_to_end(template.id)
+        else:
+            template = self._assign(line, tokens, timestamp)
+            if len(self._exact) >= self.max_templates * 4:
+                self._exact.clear()
+            self._exact[key] = template
+
+        template.count += 1
+        if timestamp:
+            template.first_seen = template.first_seen or timestamp
+            template.last_seen = timestamp
+        return template
+
+    def _assign(self, line: str, tokens: List[str], timestamp: Optional[str]) -> LogTemplate:
+        leaf = self._leaf(tokens)
+        template = self._match(leaf, tokens)
+        if template is None:
+            level = _LEVEL.search(line)
+            template = LogTemplate(self._next_id, tokens, self.lines, line, timestamp,
+                                   level.group(1) if level else None)
+            self._next_id += 1
+            leaf.append(template)
+            self._leaves[template.id] = leaf
+            self._templates[template.id] = template
+            if len(self._templates) > self.max_templates:
+                self._evict()
+        else:
+            template.tokens = [
+                token if token == other else WILDCARD
+                for token, other in zip(template.tokens, tokens)
+            ]
+            self._templates.move_to_end(template.id)
+        return template
+
+    def _leaf(self, tokens: List[str]) -> List[LogTemplate]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if _DIGIT.search(token):
+                token = WILDCARD
+            if token not in node:
+                if len(node) >= self.max_children:
+                    token = WILDCARD
+                node = node.setdefault(token, {})
+            else:
+                node = node[token]
+        return node.setdefault(None, [])
+
+    def _match(self, leaf: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        if not tokens:
+            return leaf[0] if leaf else None
+
+        best, best_score, best_wildcards = None, -1.0, -1
+        for template in leaf:
+            same = wildcards = 0
+            for token, other in zip(template.tokens, tokens):
+                if token == WILDCARD:
+                    wildcards += 1
+                elif token == other:
+                    same += 1
+            score = same / len(tokens)
+            if score > best_score or (score == best_score and wildcards > best_wildcards):
+                best, best_score, best_wildcards = template, score, wildcards
+        return best if best_score >= self.similarity_threshold else None
+
+    def _evict(self) -> None:
+        _, template = self._templates.popitem(last=False)
+        self._leaves.pop(template.id).remove(template)
+        self.evicted += 1
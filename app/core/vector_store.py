@@ -0,0 +1,680 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import numpy as np
+
+from app.core.ann_index import IVF_NLIST, IVF_NPROBE, IVFIndex, top_rows
+from app.core.metrics import VECTOR_ROWS_WRITTEN, VECTOR_SEARCH_DURATION, VECTOR_WRITE_DURATION
+from app.core.quantization import SCORE_BLOCK_ROWS, ScalarQuantizer
+
+# Root directory holding one sub-directory per collection
+COLLECTIONS_DIR = os.getenv("COLLECTIONS_DIR", os.path.join(os.getcwd(), "data", "collections"))
+
+# Index used by new collections: "flat" (exact scan) or "ivf"
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "flat")
+
+# An IVF index is rebuilt once rows added since its build exceed this fraction
+IVF_REBUILD_FRACTION = float(os.getenv("IVF_REBUILD_FRACTION", 0.2))
+
+# Vector storage used by new collections: "float32" or "int8" codes with exact re-ranking
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "float32")
+
+# With int8 storage, this many candidates per result are re-ranked at full precision
+QUANT_RERANK_FACTOR = int(os.getenv("QUANT_RERANK_FACTOR", 4))
+
+# Reindexing compacts the vector file once dead rows exceed this fraction of all rows
+VECTOR_COMPACT_FRACTION = float(os.getenv("VECTOR_COMPACT_FRACTION", 0.2))
+
+# Rows copied per block while compacting
+COMPACT_BLOCK_ROWS = 65536
+
+INDEX_KINDS = ("flat", "ivf")
+STORAGE_KINDS = ("float32", "int8")
+
+
+class VectorStore:
+    """
+    Local vector store for a single collection
+
+    Chunk rows live in SQLite while the embeddings are appended to a flat
+    float32 file, so bulk writes are a single append and searches can
+    memory-map the vectors instead of deserializing them. With int8 storage
+    a parallel file of uint8 codes is scanned instead, and only the best
+    candidates are re-ranked against the float32 vectors on disk.
+
+    Jobs writing to the same collection run in different processes, so
+    writers hold an exclusive lock on write.lock. Compaction renumbers the
+    rows and holds read.lock exclusively while it swaps the files, which
+    searches hold shared. Writers append to the vector file before they
+    commit the chunk rows, so a search only considers rows below the row
+    count it mapped; rows committed after that are left to the next search.
+    """
+
+    def __init__(self, collection_name: str, root: str = COLLECTIONS_DIR):
+        self.collection_name = collection_name
+        self.path = os.path.join(root, collection_name)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.codes_path = os.path.join(self.path, "vectors.u8")
+        self.quantizer_path = os.path.join(self.path, "quantizer.f32")
+        self.write_lock_path = os.path.join(self.path, "write.lock")
+        self.read_lock_path = os.path.join(self.path, "read.lock")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.path, "chunks.db"),
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL, "
+            "document TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_row ON chunks (row)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self.ivf = IVFIndex(self.path)
+
+    @contextmanager
+    def _file_lock(self, path: str, exclusive: bool):
+        """Hold a lock shared with every process using the collection, released when the file closes"""
+        with open(path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """Serialize writers in this process and in other processes"""
+        with self._lock, self._file_lock(self.write_lock_path, exclusive=True):
+            yield
+
+    @property
+    def dimension(self) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dimension'").fetchone()
+        return int(row[0]) if row else None
+
+    @property
+    def index_config(self) -> Dict[str, Any]:
+        """Return the vector index settings of the collection"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'index'").fetchone()
+        config = {
+            "kind": VECTOR_INDEX,
+            "nlist": IVF_NLIST,
+            "nprobe": IVF_NPROBE,
+            "storage": VECTOR_STORAGE,
+            "rerank": QUANT_RERANK_FACTOR
+        }
+        if row:
+            config.update(json.loads(row[0]))
+        return config
+
+    def _row_count(self) -> int:
+        dimension = self.dimension
+        if not dimension or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * dimension)
+
+    def _live_rows(self, total_rows: int) -> List[tuple]:
+        """Return (row, id) of the live chunks whose vectors lie within the first total_rows rows"""
+        return self._conn.execute("SELECT row, id FROM chunks WHERE row < ?", (total_rows,)).fetchall()
+
+    def add(self,
+            ids: List[str],
+            documents: List[str],
+            embeddings: List[List[float]],
+            metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Add a batch of chunks in one write
+
+        Args:
+            ids: Chunk IDs, existing IDs are replaced
+            documents: Chunk texts
+            embeddings: Chunk embeddings
+            metadatas: Chunk metadata dictionaries
+        """
+        if not ids:
+            return
+
+        started = time.perf_counter()
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        # Row numbers come from the file size, so the append and the row insert must not interleave
+        with self._writing():
+            if self.dimension is None:
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('dimension', ?)",
+                    (str(vectors.shape[1]),)
+                )
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"collection dimension {self.dimension}"
+                )
+
+            first_row = self._row_count()
+            with open(self.vectors_path, "ab") as vector_file:
+                vector_file.write(vectors.tobytes())
+
+            if self.index_config["storage"] == "int8":
+                quantizer = ScalarQuantizer.load(self.quantizer_path)
+                if quantizer is None:
+                    quantizer = ScalarQuantizer.train(vectors)
+                    quantizer.save(self.quantizer_path)
+                self._append_codes(quantizer, first_row, vectors)
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, row, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (chunk_id, first_row + i, document, json.dumps(metadata))
+                    for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+            )
+            self._conn.commit()
+        VECTOR_WRITE_DURATION.observe(time.perf_counter() - started)
+        VECTOR_ROWS_WRITTEN.inc(len(ids))
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Delete chunks by ID
+
+        Args:
+            ids: Chunk IDs to delete
+        """
+        if not ids:
+            return
+        with self._writing():
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def get(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch chunks by ID
+
+        Args:
+            ids: Chunk IDs
+
+        Returns:
+            List of chunk dictionaries in the order of the IDs that exist
+        """
+        rows = {}
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for chunk_id, document, metadata in self._conn.execute(
+                f"SELECT id, document, metadata FROM chunks WHERE id IN ({placeholders})", batch
+            ):
+                rows[chunk_id] = {"id": chunk_id, "document": document, "metadata": json.loads(metadata)}
+        return [rows[i] for i in ids if i in rows]
+
+    def count(self) -> int:
+        """Return the number of live chunks"""
+        return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def search(self, query_embedding: List[float], k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Inner-product search over the live chunks
+
+        Args:
+            query_embedding: Query vector
+            k: Number of results
+
+        Returns:
+            List of chunk dictionaries with a score, best first
+        """
+        return self.search_many([query_embedding], k)[0]
+
+    def search_many(self,
+                    query_embeddings: List[List[float]],
+                    k: int = 5,
+                    exact: bool = False,
+                    nprobe: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Inner-product search for several queries at once
+
+        Collections using an IVF index scan only the nprobe closest lists
+        plus rows added since the index was built. Flat collections, and any
+        search with exact set, score every live row in one matrix product.
+
+        Args:
+            query_embeddings: Query vectors
+            k: Number of results per query
+            exact: Scan all rows even if the collection has an IVF index
+            nprobe: Lists scanned per query, defaults to the collection setting
+
+        Returns:
+            One list of chunk dictionaries with a score per query, best first
+        """
+        empty: List[List[Dict[str, Any]]] = [[] for _ in query_embeddings]
+        dimension = self.dimension
+        total_rows = self._row_count()
+        if not dimension or not total_rows or not query_embeddings:
+            return empty
+
+        with VECTOR_SEARCH_DURATION.time(), self._file_lock(self.read_lock_path, exclusive=False):
+            total_rows = self._row_count()
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(total_rows, dimension))
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+
+            config = self.index_config
+            codes = quantizer = None
+            if config["storage"] == "int8" and not exact:
+                quantizer, codes = self._load_codes(vectors)
+            rerank = max(1, config["rerank"])
+
+            if config["kind"] == "ivf" and not exact:
+                index = self._load_ivf()
+                if index is not None:
+                    return self._search_ivf(index, vectors, queries, total_rows, k,
+                                            nprobe or config["nprobe"], quantizer, codes, rerank)
+            return self._search_flat(vectors, queries, k, quantizer, codes, rerank)
+
+    def _top(self, vectors: np.ndarray, rows: np.ndarray, queries: np.ndarray, k: int,
+             quantizer: Optional[ScalarQuantizer], codes: Optional[np.ndarray],
+             rerank: int) -> List[tuple]:
+        """Return (rows, scores) of the best k rows per query, best first"""
+        if quantizer is None:
+            scores = queries @ vectors[rows].T
+            limit = min(k, len(rows))
+        else:
+            # Shortlist on the codes, then re-rank the shortlist at full precision
+            scores = quantizer.scores(codes, rows, queries)
+            limit = min(k * rerank, len(rows))
+
+        top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        results = []
+        for query, query_top, query_scores in zip(queries, top, scores):
+            if quantizer is None:
+                query_top = query_top[np.argsort(-query_scores[query_top])]
+                results.append((rows[query_top], query_scores[query_top]))
+            else:
+                results.append(top_rows(vectors, rows[query_top], query, k))
+        return results
+
+    def _search_flat(self, vectors: np.ndarray, queries: np.ndarray, k: int,
+                     quantizer: Optional[ScalarQuantizer], codes: Optional[np.ndarray],
+                     rerank: int) -> List[List[Dict[str, Any]]]:
+        live = self._live_rows(len(vectors))
+        if not live:
+            return [[] for _ in queries]
+        rows = np.fromiter((row for row, _ in live), dtype=np.int64, count=len(live))
+        ids = dict(live)
+
+        if quantizer is None:
+            live_mask = np.zeros(len(vectors), dtype=bool)
+            live_mask[rows] = True
+            ranked = self._scan(vectors, live_mask, queries, k)
+        else:
+            ranked = self._top(vectors, rows, queries, k, quantizer, codes, rerank)
+        return self._hits([
+            [(ids[row], float(score)) for row, score in zip(top.tolist(), scores)]
+            for top, scores in ranked
+        ])
+
+    def _scan(self, vectors: np.ndarray, live_mask: np.ndarray, queries: np.ndarray, k: int) -> List[tuple]:
+        """
+        Return (rows, scores) of the best k live rows per query, best first
+
+        The memory-mapped vectors are scored block by block so live rows are
+        never copied out of the map; dead rows are masked out of each block.
+        """
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            block_live = live_mask[start:start + SCORE_BLOCK_ROWS]
+            if not block_live.any():
+                continue
+            scores = queries @ vectors[start:start + SCORE_BLOCK_ROWS].T
+            scores[:, ~block_live] = -np.inf
+            block_rows = np.broadcast_to(np.arange(start, start + len(block_live)), scores.shape)
+
+            candidate_scores = np.concatenate([best_scores, scores], axis=1)
+            candidate_rows = np.concatenate([best_rows, block_rows], axis=1)
+            limit = min(k, candidate_scores.shape[1])
+            top = np.argpartition(-candidate_scores, limit - 1, axis=1)[:, :limit]
+            best_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            best_rows = np.take_along_axis(candidate_rows, top, axis=1)
+
+        results = []
+        for query_rows, query_scores in zip(best_rows, best_scores):
+            order = np.argsort(-query_scores)
+            order = order[np.isfinite(query_scores[order])]
+            results.append((query_rows[order], query_scores[order]))
+        return results
+
+    def _search_ivf(self, index: Dict[str, Any], vectors: np.ndarray, queries: np.ndarray,
+                    total_rows: int, k: int, nprobe: int,
+                    quantizer: Optional[ScalarQuantizer], codes: Optional[np.ndarray],
+                    rerank: int) -> List[List[Dict[str, Any]]]:
+        ranked = []
+        for query, candidate_rows in zip(queries, IVFIndex.candidates(index, queries, total_rows, nprobe)):
+            if not len(candidate_rows):
+                ranked.append([])
+                continue
+            # Deleted and replaced rows stay in the lists until the next build, oversample to skip them
+            limit = 2 * k
+            while True:
+                rows, scores = self._top(vectors, np.sort(candidate_rows), query[None, :], limit,
+                                         quantizer, codes, rerank)[0]
+                ids = self._ids_for_rows(rows.tolist(), total_rows)
+                hits = [(ids[row], float(score)) for row, score in zip(rows.tolist(), scores) if row in ids]
+                if len(hits) >= k or limit >= len(candidate_rows):
+                    break
+                limit = len(candidate_rows)
+            ranked.append(hits[:k])
+        return self._hits(ranked)
+
+    def _hits(self, ranked: List[List[tuple]]) -> List[List[Dict[str, Any]]]:
+        chunks = {chunk["id"]: chunk for chunk in self.get(list({chunk_id for hits in ranked for chunk_id, _ in hits}))}
+        return [
+            [{**chunks[chunk_id], "score": score} for chunk_id, score in hits if chunk_id in chunks]
+            for hits in ranked
+        ]
+
+    def _ids_for_rows(self, rows: List[int], total_rows: int) -> Dict[int, str]:
+        ids = {}
+        for i in range(0, len(rows), 500):
+            batch = rows[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            ids.update(self._conn.execute(
+                f"SELECT row, id FROM chunks WHERE row IN ({placeholders}) AND row < ?", batch + [total_rows]
+            ).fetchall())
+        return ids
+
+    def _load_ivf(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.ivf.load()
+        except FileNotFoundError:
+            # A concurrent rebuild replaced the generation that was just read
+            return self.ivf.load()
+
+    def configure_index(self,
+                        kind: Optional[str] = None,
+                        nlist: Optional[int] = None,
+                        nprobe: Optional[int] = None,
+                        storage: Optional[str] = None,
+                        rerank: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Select the vector index and storage of the collection
+
+        Switching to IVF builds the index immediately and switching to flat
+        removes it. Switching to int8 storage fits the quantizer and encodes
+        all rows; switching back to float32 removes the codes.
+
+        Args:
+            kind: "flat" or "ivf", unchanged if None
+            nlist: Number of IVF lists, 0 picks a size from the number of rows
+            nprobe: Lists scanned per query
+            storage: "float32" or "int8", unchanged if None
+            rerank: With int8 storage, candidates per result re-ranked at full precision
+
+        Returns:
+            Index statistics
+        """
+        if kind is not None and kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown vector index: {kind}")
+        if storage is not None and storage not in STORAGE_KINDS:
+            raise ValueError(f"Unknown vector storage: {storage}")
+
+        config = self.index_config
+        for key, value in (("kind", kind), ("nlist", nlist), ("nprobe", nprobe),
+                           ("storage", storage), ("rerank", rerank)):
+            if value is not None:
+                config[key] = value
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('index', ?)", (json.dumps(config),)
+            )
+            self._conn.commit()
+
+        if config["storage"] == "int8":
+            self.encode_vectors()
+        else:
+            for path in (self.codes_path, self.quantizer_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        if config["kind"] == "ivf":
+            self.build_index()
+        else:
+            self.ivf.drop()
+        return self.index_stats()
+
+    def encode_vectors(self) -> None:
+        """Fit the int8 quantizer to the stored vectors and rewrite all codes"""
+        with self._writing():
+            dimension = self.dimension
+            total_rows = self._row_count()
+            if not dimension or not total_rows:
+                return
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(total_rows, dimension))
+            quantizer = ScalarQuantizer.train(vectors)
+
+            temp_path = self.codes_path + ".tmp"
+            with open(temp_path, "wb") as codes_file:
+                for start in range(0, total_rows, COMPACT_BLOCK_ROWS):
+                    codes_file.write(quantizer.encode(vectors[start:start + COMPACT_BLOCK_ROWS]).tobytes())
+            quantizer.save(self.quantizer_path)
+            os.replace(temp_path, self.codes_path)
+
+    def _append_codes(self, quantizer: ScalarQuantizer, first_row: int, vectors: np.ndarray) -> None:
+        # Rows written before int8 storage was enabled are encoded first
+        encoded = self._code_rows()
+        if encoded < first_row:
+            stored = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                               shape=(first_row, vectors.shape[1]))
+            vectors = np.concatenate([stored[encoded:first_row], vectors])
+        elif encoded > first_row:
+            return
+        with open(self.codes_path, "ab") as codes_file:
+            codes_file.write(quantizer.encode(vectors).tobytes())
+
+    def _code_rows(self) -> int:
+        dimension = self.dimension
+        if not dimension or not os.path.exists(self.codes_path):
+            return 0
+        return os.path.getsize(self.codes_path) // dimension
+
+    def _load_codes(self, vectors: np.ndarray) -> tuple:
+        quantizer = ScalarQuantizer.load(self.quantizer_path)
+        # Codes trail the vectors only while a writer is appending, scan exactly meanwhile
+        if quantizer is None or self._code_rows() < len(vectors):
+            return None, None
+        codes = np.memmap(self.codes_path, dtype=np.uint8, mode="r", shape=(len(vectors), vectors.shape[1]))
+        return quantizer, codes
+
+    def build_index(self) -> Optional[Dict[str, Any]]:
+        """
+        Build the IVF index from the live rows
+
+        Returns:
+            Meta dictionary of the index, or None if the collection is empty
+        """
+        with self._writing():
+            return self._build_index()
+
+    def _build_index(self) -> Optional[Dict[str, Any]]:
+        dimension = self.dimension
+        total_rows = self._row_count()
+        if not dimension or not total_rows:
+            return None
+        rows = np.fromiter(
+            (row for row, in self._conn.execute("SELECT row FROM chunks")), dtype=np.int64
+        )
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(total_rows, dimension))
+        return self.ivf.build(vectors, rows, total_rows, self.index_config["nlist"])
+
+    def compact(self, min_dead_fraction: float = VECTOR_COMPACT_FRACTION) -> bool:
+        """
+        Rewrite the vector files without the rows of deleted and replaced chunks
+
+        Live rows keep their order and are renumbered from 0. An IVF index
+        refers to the old rows, so it is dropped with the swap and rebuilt.
+
+        Args:
+            min_dead_fraction: Only compact if dead rows exceed this fraction of all rows
+
+        Returns:
+            True if the store was compacted
+        """
+        with self._writing():
+            dimension = self.dimension
+            total_rows = self._row_count()
+            live = self._conn.execute("SELECT id, row FROM chunks ORDER BY row").fetchall()
+            if not dimension or total_rows - len(live) <= min_dead_fraction * total_rows:
+                return False
+
+            rows = np.fromiter((row for _, row in live), dtype=np.int64, count=len(live))
+            copies = [(self.vectors_path, np.float32)]
+            # Codes that trail the vectors are dropped and re-encoded by the next add
+            stale_codes = os.path.exists(self.codes_path) and self._code_rows() < total_rows
+            if os.path.exists(self.codes_path) and not stale_codes:
+                copies.append((self.codes_path, np.uint8))
+            for path, dtype in copies:
+                source = np.memmap(path, dtype=dtype, mode="r", shape=(total_rows, dimension))
+                with open(path + ".tmp", "wb") as target:
+                    for start in range(0, len(rows), COMPACT_BLOCK_ROWS):
+                        target.write(np.asarray(source[rows[start:start + COMPACT_BLOCK_ROWS]]).tobytes())
+                del source
+
+            with self._file_lock(self.read_lock_path, exclusive=True):
+                self.ivf.drop()
+                for path, _ in copies:
+                    os.replace(path + ".tmp", path)
+                if stale_codes:
+                    os.remove(self.codes_path)
+                self._conn.executemany(
+                    "UPDATE chunks SET row = ? WHERE id = ?",
+                    [(new_row, chunk_id) for new_row, (chunk_id, _) in enumerate(live)]
+                )
+                self._conn.commit()
+
+            if self.index_config["kind"] == "ivf":
+                self._build_index()
+        return True
+
+    def refresh_index(self) -> bool:
+        """
+        Rebuild the IVF index if many rows were added or replaced since its build
+
+        Returns:
+            True if the index was rebuilt
+        """
+        if self.index_config["kind"] != "ivf":
+            return False
+        index = self._load_ivf()
+        if index is not None:
+            meta = index["meta"]
+            if self._row_count() - meta["built_rows"] <= IVF_REBUILD_FRACTION * max(meta["indexed"], 1):
+                return False
+        return self.build_index() is not None
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Return the index settings, indexed and pending rows and the bytes held per structure"""
+        config = self.index_config
+        index = self._load_ivf() if config["kind"] == "ivf" else None
+        total_rows = self._row_count()
+
+        def size(path: str) -> int:
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+        vector_bytes = size(self.vectors_path)
+        code_bytes = size(self.codes_path) + size(self.quantizer_path)
+        index_bytes = sum(
+            size(os.path.join(self.path, name))
+            for name in os.listdir(self.path) if name.startswith("ivf")
+        )
+        return {
+            **config,
+            "nlist": index["meta"]["nlist"] if index else config["nlist"],
+            "live_rows": self.count(),
+            "indexed_rows": index["meta"]["indexed"] if index else 0,
+            "unindexed_rows": total_rows - index["meta"]["built_rows"] if index else 0,
+            "vector_bytes": vector_bytes,
+            "code_bytes": code_bytes,
+            "index_bytes": index_bytes,
+            # Bytes a search pages in: the codes replace the vectors when quantized
+            "search_bytes": (code_bytes if config["storage"] == "int8" else vector_bytes) + index_bytes
+        }
+
+    def measure_recall(self, k: int = 10, queries: int = 100, seed: int = 0) -> Dict[str, Any]:
+        """Compare the configured search with an exact float32 scan, see measure_recall"""
+        return measure_recall(self, k, queries, seed)
+
+    def sample_vectors(self, count: int, seed: int = 0) -> np.ndarray:
+        """
+        Return stored vectors of randomly chosen live chunks
+
+        Args:
+            count: Maximum number of vectors
+            seed: Random seed for the sample
+
+        Returns:
+            Matrix of vectors
+        """
+        with self._file_lock(self.read_lock_path, exclusive=False):
+            dimension = self.dimension
+            total_rows = self._row_count()
+            live_rows = [row for row, _ in self._live_rows(total_rows)]
+            if not dimension or not live_rows:
+                return np.zeros((0, dimension or 0), dtype=np.float32)
+
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live_rows, size=min(count, len(live_rows)), replace=False))
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(total_rows, dimension))
+            return np.asarray(vectors[sample])
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        self._conn.close()
+
+
+def measure_recall(store, k: int = 10, queries: int = 100, seed: int = 0) -> Dict[str, Any]:
+    """
+    Compare the configured search of a store with an exact float32 scan
+
+    Stored vectors of randomly chosen chunks are used as queries.
+
+    Args:
+        store: VectorStore or ShardedVectorStore
+        k: Number of results per query
+        queries: Number of sampled queries
+        seed: Random seed for the sample
+
+    Returns:
+        Dictionary with k, queries, recall and the latency of both searches in milliseconds
+    """
+    query_embeddings = store.sample_vectors(queries, seed).tolist()
+    if not query_embeddings:
+        return {"k": k, "queries": 0, "recall": 0.0, "search_ms": 0.0, "exact_ms": 0.0}
+
+    started = time.perf_counter()
+    exact = store.search_many(query_embeddings, k, exact=True)
+    exact_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    found = store.search_many(query_embeddings, k)
+    search_ms = (time.perf_counter() - started) * 1000
+
+    recalls = [
+        len({hit["id"] for hit in approximate} & {hit["id"] for hit in truth}) / max(len(truth), 1)
+        for approximate, truth in zip(found, exact)
+    ]
+    return {
+        "k": k,
+        "queries": len(query_embeddings),
+        "recall": float(np.mean(recalls)),
+        "search_ms": search_ms / len(query_embeddings),
+        "exact_ms": exact_ms / len(query_embeddings)
+    }
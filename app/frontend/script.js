@@ -2,8 +2,7 @@
 const API_BASE_URL = '/api';
 const API_ENDPOINTS = {
     // Code API endpoints
-    CODE_UPLOAD_ZIP: `${API_BASE_URL}/code/upload/zip`,
-    CODE_UPLOAD_RAR: `${API_BASE_URL}/code/upload/rar`,
+    CODE_UPLOAD_ARCHIVE: `${API_BASE_URL}/code/upload/archive`,
     CODE_GITHUB: `${API_BASE_URL}/code/github`,
     CODE_STATUS: `${API_BASE_URL}/code/status`,
     
@@ -165,14 +164,10 @@ async function handleAddProject() {
                 formData.append('file', archiveFile);
                 formData.append('project_name', projectName);
                 
-                const endpoint = archiveFile.name.toLowerCase().endsWith('.zip') 
-                    ? API_ENDPOINTS.CODE_UPLOAD_ZIP 
-                    : API_ENDPOINTS.CODE_UPLOAD_RAR;
-                
                 document.querySelector('.progress-bar').style.width = '25%';
                 document.getElementById('progressStatus').textContent = 'Uploading file...';
                 
-                response = await fetch(endpoint, {
+                response = await fetch(API_ENDPOINTS.CODE_UPLOAD_ARCHIVE, {
                     method: 'POST',
                     body: formData
                 });
@@ -262,7 +257,52 @@ async function handleAddProject() {
     }
 }
 
+function streamProcessingStatus(jobId) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_ENDPOINTS.CODE_STATUS}/${jobId}/events`);
+        
+        source.addEventListener('progress', (event) => {
+            const data = JSON.parse(event.data);
+            const percentage = (data.details && data.details.progress_percentage) || 0;
+            
+            // Update progress
+            document.querySelector('.progress-bar').style.width = `${Math.min(50 + percentage / 2, 95)}%`;
+            document.getElementById('progressStatus').textContent = data.message;
+        });
+        
+        source.addEventListener('result', (event) => {
+            const data = JSON.parse(event.data);
+            source.close();
+            
+            if (data.status === 'completed') {
+                document.querySelector('.progress-bar').style.width = '100%';
+                document.getElementById('progressStatus').textContent = 'Processing completed!';
+                resolve(data.collection_name);
+            } else {
+                reject(new Error(`Processing failed: ${data.message}`));
+            }
+        });
+        
+        source.onerror = () => {
+            source.close();
+            const error = new Error('Status stream unavailable');
+            error.streamUnavailable = true;
+            reject(error);
+        };
+    });
+}
+
 async function pollProcessingStatus(jobId, type) {
+    // Prefer pushed updates, polling stays as the fallback
+    if (window.EventSource) {
+        try {
+            return await streamProcessingStatus(jobId);
+        } catch (error) {
+            if (!error.streamUnavailable) throw error;
+            console.warn('Falling back to status polling:', error);
+        }
+    }
+    
     const endpoint = type === 'log' 
         ? `${API_ENDPOINTS.LOGS_STATUS}/${jobId}`
         : `${API_ENDPOINTS.CODE_STATUS}/${jobId}`;
@@ -362,6 +402,12 @@ async function handleSendMessage() {
             };
         }
         
+        // Render the answer as it is generated when the endpoint can stream
+        if (await streamAnswer(`${endpoint}/stream`, requestBody, loadingId)) {
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+            return;
+        }
+        
         // Make the API call
         const response = await fetch(endpoint, {
             method: 'POST',
@@ -401,6 +447,73 @@ async function handleSendMessage() {
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
 
+// Stream an answer over Server-Sent Events, returns false if the endpoint does not stream
+async function streamAnswer(endpoint, requestBody, messageId) {
+    const response = await fetch(endpoint, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(requestBody)
+    });
+    
+    if (response.status === 404 || response.status === 405) {
+        return false;
+    }
+    if (!response.ok) {
+        throw new Error(`Error: ${await response.text()}`);
+    }
+    
+    const messageElement = document.getElementById(messageId);
+    const chatMessages = document.getElementById('chatMessages');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    let sourcesHtml = '';
+    
+    const render = () => {
+        messageElement.innerHTML = `<strong>Assistant:</strong> ${formatMessage(answer)}${sourcesHtml}`;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    };
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) continue;
+            const payload = JSON.parse(data);
+            
+            if (eventName === 'sources') {
+                if (payload.sources && payload.sources.length > 0 && !payload.is_conversation) {
+                    sourcesHtml = '<div class="mt-2"><strong>Sources:</strong><ul>' +
+                        payload.sources.map(source => `<li>${source}</li>`).join('') +
+                        '</ul></div>';
+                }
+            } else if (eventName === 'token') {
+                answer += payload.text;
+            } else if (eventName === 'done') {
+                answer = payload.answer;
+            } else if (eventName === 'error') {
+                throw new Error(payload.message);
+            }
+            render();
+        }
+    }
+    return true;
+}
+
 // Code Analysis
 async function handleAnalyzeCode() {
     if (!state.currentProject || state.currentProject.type !== 'code') {
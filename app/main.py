@@ -1,8 +1,13 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 from app.frontend.server import static_router
+from app.api.router import api_router
+from app.services.job_scheduler import get_scheduler
+from app.api.middleware import RequestMetricsMiddleware
+from app.core.metrics import registry as metrics_registry
 
 # Load environment variables
 load_dotenv()
@@ -27,17 +32,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes the other middleware
+app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
+app.include_router(api_router, prefix="/api")
 app.include_router(static_router, tags=["frontend"])
 
 @app.get("/", include_in_schema=False)
 async def redirect_to_frontend():
     return {"message": "Welcome to RAG Code Assistant API - Visit /docs for API documentation or /app for the frontend"}
 
+@app.on_event("startup")
+async def reset_metrics():
+    """Drop metrics left by processes of an earlier run"""
+    metrics_registry.remove_dead_files()
+
+@app.on_event("startup")
+async def fail_orphaned_jobs():
+    """Fail jobs that a crashed or restarted worker left processing"""
+    get_scheduler().fail_orphaned_jobs()
+
+@app.on_event("shutdown")
+async def shutdown_scheduler():
+    """Let running ingest jobs finish before the worker exits"""
+    get_scheduler().shutdown()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "message": "Service is running"}
+    metrics = metrics_registry.health()
+    return {
+        "status": "degraded" if metrics["status"] == "degraded" else "ok",
+        "message": "Service is running",
+        "metrics": metrics
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics of all processes in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 if __name__ == "__main__":
     import uvicorn
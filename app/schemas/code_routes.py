@@ -1,9 +1,17 @@
-from typing import Optional
-from pydantic import BaseModel, HttpUrl
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, HttpUrl, field_validator
+
+from app.core.collection_registry import validate_collection_name
 
 class GithubRepo(BaseModel):
     url: HttpUrl
     name: Optional[str] = None
+    profile: bool = False
+    
+    @field_validator("name")
+    @classmethod
+    def check_name(cls, value: Optional[str]) -> Optional[str]:
+        return validate_collection_name(value) if value else value
 
 class ProcessingResponse(BaseModel):
     job_id: str
@@ -15,6 +23,7 @@ class ProcessingStatusResponse(BaseModel):
     status: str
     message: str
     collection_name: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
 
 class JobResponse(BaseModel):
     job_id: str
@@ -24,4 +33,137 @@ class JobResponse(BaseModel):
 
 class ReIndexRequest(BaseModel):
     """Schema for reindexing request"""
-    collection_name: str
\ No newline at end of file
+    collection_name: str
+    shard: Optional[int] = None
+    profile: bool = False
+    
+    @field_validator("collection_name")
+    @classmethod
+    def check_collection_name(cls, value: str) -> str:
+        return validate_collection_name(value)
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    """Schema for embedding cache statistics"""
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+class CollectionFile(BaseModel):
+    path: str
+    size: Optional[int] = None
+    hash: str
+
+class CollectionInfoResponse(BaseModel):
+    """Schema for a collection registry record"""
+    name: str
+    source_root: Optional[str] = None
+    file_count: int
+    total_bytes: int
+    created_at: float
+    indexed_at: float
+    files: Optional[List[CollectionFile]] = None
+
+class VectorIndexRequest(BaseModel):
+    """Schema for selecting the vector index and storage of a collection"""
+    kind: Optional[str] = None
+    nlist: Optional[int] = None
+    nprobe: Optional[int] = None
+    storage: Optional[str] = None
+    rerank: Optional[int] = None
+
+class VectorIndexResponse(BaseModel):
+    """Schema for the vector index and storage of a collection"""
+    kind: str
+    nlist: int
+    nprobe: int
+    storage: str
+    rerank: int
+    live_rows: int
+    indexed_rows: int
+    unindexed_rows: int
+    vector_bytes: int
+    code_bytes: int
+    index_bytes: int
+    search_bytes: int
+    shards: int = 1
+    shard_strategy: Optional[str] = None
+    shard_rows: Optional[List[int]] = None
+
+class RecallResponse(BaseModel):
+    """Schema for a recall@k measurement against exact search"""
+    k: int
+    queries: int
+    recall: float
+    search_ms: float
+    exact_ms: float
+
+class JobSummary(BaseModel):
+    job_id: str
+    job_type: str
+    status: str
+    message: str
+    collection_name: Optional[str] = None
+    created_at: float
+    updated_at: float
+    details: Dict[str, Any] = {}
+
+class JobListResponse(BaseModel):
+    """Schema for listing jobs"""
+    jobs: List[JobSummary]
+
+class SchedulerStatsResponse(BaseModel):
+    """Schema for ingest scheduler statistics"""
+    max_concurrent: int
+    max_queued: int
+    type_limits: Dict[str, int]
+    running: Dict[str, int]
+    queued: Dict[str, int]
+
+class SearchRequest(BaseModel):
+    """Schema for searching a collection"""
+    collection_name: str
+    query: str
+    k: int = 5
+    mode: str = "hybrid"
+    exact: bool = False
+    nprobe: Optional[int] = None
+    
+    @field_validator("collection_name")
+    @classmethod
+    def check_collection_name(cls, value: str) -> str:
+        return validate_collection_name(value)
+
+class SearchResult(BaseModel):
+    id: str
+    score: float
+    document: str
+    metadata: Dict[str, Any]
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+
+class SymbolDefinition(BaseModel):
+    name: str
+    qualified_name: str
+    kind: str
+    file_path: str
+    start_line: int
+    end_line: int
+    chunk_ids: List[str]
+
+class SymbolReference(BaseModel):
+    name: str
+    kind: str
+    file_path: str
+    line: int
+    chunk_id: Optional[str] = None
+
+class SymbolDefinitionsResponse(BaseModel):
+    definitions: List[SymbolDefinition]
+
+class SymbolReferencesResponse(BaseModel):
+    references: List[SymbolReference]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+class LogAnalysis(BaseModel):
+    summary: str
+    errors: List[str] = []
+    patterns: str = ""
+
+class LogStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    message: str
+    collection_name: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+    analysis: Optional[LogAnalysis] = None
\ No newline at end of file
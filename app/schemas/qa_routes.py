@@ -0,0 +1,38 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, field_validator
+
+from app.core.collection_registry import validate_collection_name
+
+class QuestionRequest(BaseModel):
+    """Schema for a question about a collection"""
+    collection_name: str = ""
+    question: str
+    k: Optional[int] = None
+    
+    @field_validator("collection_name")
+    @classmethod
+    def check_collection_name(cls, value: str) -> str:
+        return validate_collection_name(value) if value else value
+
+class BatchQuestionRequest(BaseModel):
+    """Schema for many questions about one collection"""
+    collection_name: str = ""
+    questions: List[str]
+    k: Optional[int] = None
+    concurrency: Optional[int] = None
+    
+    @field_validator("collection_name")
+    @classmethod
+    def check_collection_name(cls, value: str) -> str:
+        return validate_collection_name(value) if value else value
+
+class QuestionResponse(BaseModel):
+    answer: str
+    sources: List[str] = []
+    is_conversation: bool = False
+
+class QueryCacheStatsResponse(BaseModel):
+    """Schema for query cache statistics"""
+    memory_entries: int
+    disk_entries: int
+    kinds: Dict[str, Dict[str, Any]]
\ No newline at end of file
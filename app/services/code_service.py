@@ -1,19 +1,44 @@
 import os
 import tempfile
 import shutil
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
-from app.core.code_processor import CodeProcessor
-from app.core.code_indexer import CodeIndexer
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.embedders import create_code_indexer
+from app.core.archive_stream import MAX_MEMBER_SIZE, ArchiveReader
+from app.core.ingest_filter import IngestFilter
+from app.core.manifest import CollectionManifest, content_hash, manifest_lock
+from app.core.collection_registry import get_collection_registry
+from app.core.repo_fetcher import CHECKOUT_DIR, fetch_repository
+from app.core.sharding import open_vector_store, shard_layout
+from app.core.lexical_index import LexicalIndex
+from app.core.symbol_index import SymbolIndex
+from app.core.chunk_locations import ChunkLocations
+from app.services.indexing_pipeline import IndexingPipeline, PipelineConfig
+
+# Size of each read/write when streaming an upload to disk
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
 
 class CodeService:
     """
     Service for handling code-related operations
     """
     
-    def __init__(self):
-        self.code_processor = CodeProcessor()
-        self.code_indexer = CodeIndexer()
+    def __init__(self, pipeline_config: Optional[PipelineConfig] = None):
+        self._code_processor = None
+        self.code_indexer = create_code_indexer()
+        self.pipeline = IndexingPipeline(self.code_indexer, pipeline_config)
+    
+    @property
+    def code_processor(self):
+        """Extracting processor, only needed by process_zip, process_rar and cleanup"""
+        if self._code_processor is None:
+            # Imported lazily so the streaming ingest paths work without it
+            from app.core.code_processor import CodeProcessor
+            self._code_processor = CodeProcessor()
+        return self._code_processor
     
     def process_zip(self, file_path: str) -> tuple[str, List[str]]:
         """
@@ -43,19 +68,20 @@ class CodeService:
         file_list = self.code_processor.get_file_list(extract_path)
         return extract_path, file_list
     
-    def process_github(self, repo_url: str) -> tuple[str, List[str]]:
+    def process_github(self, repo_url: str, collection_name: str) -> tuple[str, List[str], Dict[str, Any]]:
         """
-        Process a GitHub repository and return the repository path and file list
+        Fetch a GitHub repository through the local mirror cache
         
         Args:
             repo_url: URL of the GitHub repository
+            collection_name: Name of the collection, used for the checkout directory
             
         Returns:
-            Tuple of (repo_path, file_list)
+            Tuple of (repo_path, file_list, fetch_stats)
         """
-        repo_path = self.code_processor.process_github(repo_url)
-        file_list = self.code_processor.get_file_list(repo_path)
-        return repo_path, file_list
+        repo_path = os.path.join(CHECKOUT_DIR, collection_name)
+        file_list, fetch_stats = fetch_repository(repo_url, repo_path)
+        return repo_path, file_list, fetch_stats
     
     def index_files(self, file_list: List[str], collection_name: str) -> str:
         """
@@ -68,33 +94,300 @@ class CodeService:
         Returns:
             Collection name
         """
-        return self.code_indexer.index_files(file_list, collection_name)
+        self.pipeline.index_files(file_list, collection_name)
+        return collection_name
     
-    def find_files_for_collection(self, collection_name: str) -> List[str]:
+    def index_files_tracked(self,
+                            file_list: List[str],
+                            collection_name: str,
+                            root: Optional[str] = None,
+                            on_progress: Optional[Callable[[int], None]] = None,
+                            on_error: Optional[Callable[[str, str], None]] = None,
+                            on_skip: Optional[Callable[[str, str], None]] = None) -> Dict[str, List[str]]:
         """
-        Find source files for a collection
+        Index files into a collection with per-file progress and errors
         
         Args:
+            file_list: List of file paths to index
             collection_name: Name of the collection
+            root: Optional directory that stored paths are made relative to
+            on_progress: Optional callback receiving the running count of indexed files
+            on_error: Optional callback receiving (file_path, error) for failed files
+            on_skip: Optional callback receiving (file_path, reason) for files the pre-filter skipped
             
         Returns:
-            List of file paths
+            Mapping of indexed file path to its chunk IDs
         """
-        file_paths = []
+        return self.pipeline.index_files(
+            file_list,
+            collection_name,
+            root=root,
+            on_progress=on_progress,
+            on_error=on_error,
+            on_skip=on_skip
+        )
+    
+    def reindex_files(self,
+                      file_list: List[str],
+                      collection_name: str,
+                      root: str,
+                      on_progress: Optional[Callable[[int], None]] = None,
+                      on_error: Optional[Callable[[str, str], None]] = None,
+                      shard: Optional[int] = None,
+                      on_skip: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """
+        Incrementally reindex a collection against its manifest
+        
+        Only files that were added or whose content changed are chunked and
+        embedded again. Chunks of removed files are deleted. Files whose size
+        and modification time match the manifest are not even read.
+        
+        Args:
+            file_list: Current list of source file paths
+            collection_name: Name of the collection
+            root: Directory that stored paths are relative to
+            on_progress: Optional callback receiving the running count of indexed files
+            on_error: Optional callback receiving (file_path, error) for failed files
+            shard: Only reindex the files of this shard of a sharded collection
+            on_skip: Optional callback receiving (file_path, reason) for files the pre-filter skipped
+            
+        Returns:
+            Dictionary with added, changed, removed and unchanged file lists
+        """
+        # Held until the final save, so a concurrent job cannot interleave its own manifest updates
+        with manifest_lock(collection_name):
+            manifest = CollectionManifest(collection_name)
+            current = {os.path.relpath(path, root): path for path in file_list}
+            
+            layout = shard_layout(collection_name) if shard is not None else None
+            if shard is not None and (layout is None or not 0 <= shard < layout.shards):
+                raise ValueError(f"Collection {collection_name} has no shard {shard}")
+            
+            def in_shard(relative_path: str) -> bool:
+                return layout is None or layout.shard_of_path(relative_path) == shard
+            
+            current = {path: full_path for path, full_path in current.items() if in_shard(path)}
+            
+            # Files the pre-filter rejects count as removed, so their old chunks go too
+            file_filter = IngestFilter.for_tree(root, list(current.values())) if self.pipeline.config.filter_files else None
+            skipped = {}
+            if file_filter is not None:
+                for relative_path in list(current):
+                    reason = file_filter.check_path(relative_path)
+                    if reason:
+                        skipped[relative_path] = reason
+                        del current[relative_path]
+            
+            def inspect(relative_path: str) -> tuple[str, Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+                stat = os.stat(current[relative_path])
+                file_stats = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                if file_filter is not None:
+                    reason = file_filter.check_size(stat.st_size)
+                    if reason:
+                        return relative_path, file_stats, None, reason
+                entry = manifest.get(relative_path)
+                if entry and all(entry.get(key) == value for key, value in file_stats.items()):
+                    return relative_path, file_stats, entry["hash"], None
+                with open(current[relative_path], "rb") as f:
+                    return relative_path, file_stats, content_hash(f.read().decode("utf-8", errors="replace")), None
+            
+            added, changed, unchanged = [], [], []
+            file_stats = {}
+            with ThreadPoolExecutor(max_workers=self.pipeline.config.read_workers) as readers:
+                for relative_path, stats, file_hash, reason in readers.map(inspect, list(current)):
+                    if reason:
+                        skipped[relative_path] = reason
+                        continue
+                    file_stats[relative_path] = stats
+                    entry = manifest.get(relative_path)
+                    if entry is None:
+                        added.append(relative_path)
+                    elif entry["hash"] != file_hash:
+                        changed.append(relative_path)
+                    else:
+                        # Refresh size and mtime so the next reindex can skip reading it
+                        manifest.record(relative_path, file_hash, entry["chunk_ids"], **stats)
+                        unchanged.append(relative_path)
+            
+            for relative_path, reason in skipped.items():
+                current.pop(relative_path, None)
+                if on_skip:
+                    on_skip(relative_path, reason)
+            
+            removed = [path for path in manifest.files if path not in current and in_shard(path)]
+            previous_ids = {path: manifest.get(path)["chunk_ids"] for path in changed}
+            stale_ids = [chunk_id for path in removed for chunk_id in manifest.remove(path)]
+            manifest.save()
+            
+            indexed = self.pipeline.index_files(
+                [current[path] for path in added + changed],
+                collection_name,
+                root=root,
+                on_progress=on_progress,
+                on_error=on_error,
+                on_skip=on_skip,
+                file_filter=file_filter
+            )
+            
+            # Changed files reuse their chunk IDs, so only surplus old chunks are stale
+            for path, old_ids in previous_ids.items():
+                new_ids = set(indexed.get(path, old_ids))
+                stale_ids.extend(chunk_id for chunk_id in old_ids if chunk_id not in new_ids)
+            
+            store = open_vector_store(collection_name)
+            lexical = LexicalIndex(collection_name)
+            symbol_index = SymbolIndex(collection_name)
+            locations = ChunkLocations(collection_name)
+            try:
+                # Chunks still shared with other files stay
+                locations.delete_files(removed)
+                stale_ids = locations.orphaned(stale_ids)
+                store.delete(stale_ids)
+                lexical.delete(stale_ids)
+                symbol_index.delete_files(removed)
+                # Changed files appended new rows, reclaim the ones they replaced
+                store.compact()
+            finally:
+                store.close()
+                lexical.close()
+                symbol_index.close()
+                locations.close()
+            if stale_ids:
+                get_collection_registry().bump_version(collection_name)
+            
+            manifest = CollectionManifest(collection_name)
+            for path in indexed:
+                entry = manifest.get(path)
+                manifest.record(path, entry["hash"], entry["chunk_ids"], **file_stats[path])
+            manifest.save()
+            
+            return {
+                "added": [path for path in added if path in indexed],
+                "changed": [path for path in changed if path in indexed],
+                "removed": removed,
+                "unchanged": unchanged
+            }
+    
+    def index_archive_streaming(self,
+                                archive: ArchiveReader,
+                                collection_name: str,
+                                on_batch: Optional[Callable[[int], None]] = None,
+                                on_skip: Optional[Callable[[str, str], None]] = None,
+                                on_error: Optional[Callable[[str, str], None]] = None,
+                                source_dir: Optional[str] = None,
+                                on_listed: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Index an archive without extracting it
+        
+        Members are read straight out of the archive and fed to the indexing
+        pipeline as they are decompressed, so peak memory does not depend on
+        the size of the archive. Members rejected by the ingest pre-filter by
+        name are not even decompressed. Only the members that are indexed
+        are written to source_dir, so the collection can be reindexed later.
+        
+        Args:
+            archive: Reader from open_archive
+            collection_name: Name of the collection
+            on_batch: Optional callback receiving the running count of indexed files
+            on_skip: Optional callback receiving (member_name, reason) for skipped members
+            on_error: Optional callback receiving (member_name, error) for failed members, defaults to on_skip
+            source_dir: Optional directory the indexed members are written to, replacing its content
+            on_listed: Optional callback receiving the number of file members before indexing starts
+            
+        Returns:
+            Number of files indexed
+        """
+        file_filter = None
+        max_member_size = MAX_MEMBER_SIZE
+        if self.pipeline.config.filter_files:
+            # One pass lists the members and reads the .gitignore files, tar streams are not decompressed again
+            names, gitignores = archive.scan(lambda name: os.path.basename(name) == ".gitignore")
+            file_filter = IngestFilter.for_paths(
+                names,
+                lambda name: gitignores.get(name, b"").decode("utf-8", errors="replace")
+            )
+            max_member_size = min(max_member_size, file_filter.max_file_size)
+        else:
+            names = archive.names()
+        if on_listed:
+            on_listed(len(names))
+        
+        def documents():
+            members = archive.iter_members(
+                max_member_size=max_member_size,
+                on_skip=on_skip,
+                skip_path=file_filter.check_path if file_filter else None
+            )
+            for member_name, content in members:
+                reason = file_filter.check_content(member_name, content) if file_filter else None
+                if reason:
+                    if on_skip:
+                        on_skip(member_name, reason)
+                    continue
+                if source_dir:
+                    # Member names are normalized by the reader and cannot leave source_dir
+                    target_path = os.path.join(source_dir, member_name)
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    with open(target_path, "wb") as f:
+                        f.write(content)
+                    stat = os.stat(target_path)
+                    file_stats[member_name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                yield member_name, content.decode("utf-8", errors="replace")
+        
+        if source_dir:
+            shutil.rmtree(source_dir, ignore_errors=True)
+            os.makedirs(source_dir, exist_ok=True)
+        
+        file_stats = {}
+        indexed = self.pipeline.index_documents(
+            documents(),
+            collection_name,
+            on_progress=on_batch,
+            on_error=on_error or on_skip,
+            file_stats=file_stats
+        )
+        return len(indexed)
+    
+    def register_collection(self, collection_name: str, source_root: Optional[str]) -> None:
+        """
+        Record a finished ingest in the collection registry
         
-        # First check if we already have the temp directory with original files
-        temp_dir = os.path.join(os.getcwd(), "temp", collection_name)
-        if os.path.exists(temp_dir):
-            # Get all files in the directory
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    file_paths.append(file_path)
+        Args:
+            collection_name: Name of the collection
+            source_root: Directory holding the sources, ignored if it no longer exists
+        """
+        if source_root and not os.path.isdir(source_root):
+            source_root = None
+        manifest = CollectionManifest(collection_name)
+        get_collection_registry().register(
+            collection_name,
+            os.path.abspath(source_root) if source_root else None,
+            manifest.files
+        )
+    
+    def find_source_root(self, collection_name: str) -> Optional[str]:
+        """
+        Find the directory holding the source files of a collection
+        
+        The collection registry is consulted first; the legacy locations are
+        only checked for collections ingested before the registry existed.
+        A registered root that is gone is not replaced by a legacy location,
+        which may hold an older or partial copy whose missing files would be
+        treated as removed.
+        
+        Args:
+            collection_name: Name of the collection
             
-            return file_paths
+        Returns:
+            Directory path, or None if the sources are not available
+        """
+        record = get_collection_registry().get(collection_name)
+        if record and record["source_root"]:
+            return record["source_root"] if os.path.isdir(record["source_root"]) else None
         
-        # Try to find files in other potential locations
         potential_directories = [
+            # Sources kept by a previous reindex
+            os.path.join(os.getcwd(), "temp", collection_name),
             # Check for GitHub repositories
             os.path.join(os.getcwd(), "repos", collection_name),
             # Check temp directory with a different name structure
@@ -104,33 +397,37 @@ class CodeService:
         ]
         
         for dir_path in potential_directories:
-            if os.path.exists(dir_path):
-                # Get all files in the directory
-                for root, _, files in os.walk(dir_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        file_paths.append(file_path)
-                return file_paths
-        
-        # Try to find any files in the project related to this collection
-        for root, dirs, files in os.walk(os.getcwd()):
-            for dir_name in dirs:
-                if collection_name in dir_name:
-                    dir_path = os.path.join(root, dir_name)
-                    for sub_root, _, sub_files in os.walk(dir_path):
-                        for file in sub_files:
-                            # Only include code files
-                            if any(file.endswith(ext) for ext in ['.py', '.js', '.java', '.ts', '.html', '.css', '.php', '.rb', '.go', '.cpp', '.h']):
-                                file_path = os.path.join(sub_root, file)
-                                file_paths.append(file_path)
+            if os.path.isdir(dir_path):
+                return dir_path
+        
+        return None
+    
+    def find_files_for_collection(self, collection_name: str) -> List[str]:
+        """
+        Find source files for a collection
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            List of file paths
+        """
+        source_root = self.find_source_root(collection_name)
+        if source_root is None:
+            return []
         
+        file_paths = []
+        for root, _, files in os.walk(source_root):
+            for file in files:
+                file_paths.append(os.path.join(root, file))
         return file_paths
     
     def cleanup(self) -> None:
         """
         Clean up temporary files
         """
-        self.code_processor.cleanup()
+        if self._code_processor is not None:
+            self._code_processor.cleanup()
     
     def save_file_temporarily(self, file_content, filename: str) -> str:
         """
@@ -146,4 +443,30 @@ class CodeService:
         temp_file = os.path.join(tempfile.gettempdir(), filename)
         with open(temp_file, "wb") as buffer:
             shutil.copyfileobj(file_content, buffer)
-        return temp_file 
\ No newline at end of file
+        return temp_file
+    
+    async def save_upload_streaming(self, upload_file, filename: str,
+                                    chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+        """
+        Save an upload to disk in chunks without blocking the event loop
+        
+        Args:
+            upload_file: FastAPI UploadFile
+            filename: Name of the file
+            chunk_size: Number of bytes read and written per step
+            
+        Returns:
+            Path to the saved file, unique per upload and ending in the original file name
+        """
+        # Concurrent uploads may share a file name, so each one gets its own file
+        fd, temp_file = tempfile.mkstemp(prefix="upload-", suffix="-" + os.path.basename(filename or "upload"))
+        buffer = await run_in_threadpool(os.fdopen, fd, "wb")
+        try:
+            while True:
+                chunk = await upload_file.read(chunk_size)
+                if not chunk:
+                    break
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        return temp_file
\ No newline at end of file
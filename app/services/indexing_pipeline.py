@@ -0,0 +1,458 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.core.chunker import chunk_documents
+from app.core.chunk_locations import ChunkLocations
+from app.core.collection_registry import get_collection_registry
+from app.core.embedding_cache import EmbeddingCache, get_embedding_cache
+from app.core.ingest_filter import INGEST_FILTER_ENABLED, IngestFilter
+from app.core.lexical_index import LexicalIndex
+from app.core.metrics import (
+    BYTES_INDEXED, CHUNKS_EMBEDDED, CHUNKS_INDEXED, FILE_ERRORS, FILES_INDEXED, PIPELINE_STAGE_DURATION
+)
+from app.core.symbol_index import SymbolIndex
+from app.core.manifest import CollectionManifest, content_fingerprint, manifest_lock
+from app.core.sharding import open_vector_store
+
+
+class PipelineConfig:
+    """
+    Worker counts and batch sizes for each stage of the indexing pipeline
+    
+    Defaults come from environment variables so deployments can tune the
+    pipeline without code changes.
+    """
+    
+    def __init__(self,
+                 read_workers: Optional[int] = None,
+                 chunk_workers: Optional[int] = None,
+                 chunk_batch_size: Optional[int] = None,
+                 embed_workers: Optional[int] = None,
+                 embed_batch_size: Optional[int] = None,
+                 write_batch_size: Optional[int] = None,
+                 use_embedding_cache: Optional[bool] = None,
+                 deduplicate: Optional[bool] = None,
+                 filter_files: Optional[bool] = None):
+        self.read_workers = read_workers or int(os.getenv("PIPELINE_READ_WORKERS", 8))
+        self.chunk_workers = chunk_workers or int(os.getenv("PIPELINE_CHUNK_WORKERS", os.cpu_count() or 1))
+        self.chunk_batch_size = chunk_batch_size or int(os.getenv("PIPELINE_CHUNK_BATCH_SIZE", 50))
+        self.embed_workers = embed_workers or int(os.getenv("PIPELINE_EMBED_WORKERS", 2))
+        self.embed_batch_size = embed_batch_size or int(os.getenv("PIPELINE_EMBED_BATCH_SIZE", 256))
+        self.write_batch_size = write_batch_size or int(os.getenv("PIPELINE_WRITE_BATCH_SIZE", 2048))
+        if use_embedding_cache is None:
+            use_embedding_cache = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+        self.use_embedding_cache = use_embedding_cache
+        if deduplicate is None:
+            deduplicate = os.getenv("CHUNK_DEDUP", "true").lower() == "true"
+        self.deduplicate = deduplicate
+        self.filter_files = INGEST_FILTER_ENABLED if filter_files is None else filter_files
+
+
+def _read_file(file_path: str, file_filter: Optional[IngestFilter] = None) -> Tuple[str, Optional[str], str, str, Dict[str, int]]:
+    """
+    Read a file as text, unless the pre-filter rejects its size or content
+    
+    Returns:
+        Tuple of (file_path, content, error, skip_reason, stats), content is None on failure or skip,
+        stats holds the on-disk size and mtime_ns the manifest compares on reindex
+    """
+    try:
+        if file_filter is not None:
+            reason = file_filter.check_size(os.path.getsize(file_path))
+            if reason:
+                return file_path, None, "", reason, {}
+        with open(file_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        if file_filter is not None:
+            reason = file_filter.check_content(file_path, data)
+            if reason:
+                return file_path, None, "", reason, {}
+        stats = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return file_path, data.decode("utf-8", errors="replace"), "", "", stats
+    except Exception as e:
+        return file_path, None, str(e), "", {}
+
+
+def _chunk_timed(documents: List[Tuple[str, str]]) -> Tuple[List[Tuple[str, List[Dict[str, Any]], str, Dict[str, Any]]], float]:
+    """
+    Chunk a batch of documents in a worker process and measure the time taken
+    
+    Returns:
+        Tuple of (chunk_documents result, seconds)
+    """
+    started = time.perf_counter()
+    chunked = chunk_documents(documents)
+    return chunked, time.perf_counter() - started
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class IndexingPipeline:
+    """
+    Staged indexing pipeline: filter, read, chunk, embed and write
+    
+    Files are read on a thread pool, chunked on a process pool, embedded in
+    large batches and written to the collection vector store, lexical
+    index and symbol table in bulk. Errors
+    are tracked per file so one bad file never fails the whole job.
+    
+    Chunks whose content is already stored in the collection, or was
+    queued earlier in the same run, are not embedded or stored again; the
+    file refers to the stored chunk and only its location is recorded.
+    
+    Time spent in each stage is summed over all workers in stage_seconds,
+    which accumulates across runs of the same pipeline, as do the stored
+    and duplicate totals in chunk_counts.
+    """
+    
+    STAGES = ("filter", "read", "chunk", "embed", "write", "index", "manifest")
+    
+    def __init__(self, code_indexer, config: Optional[PipelineConfig] = None):
+        self.code_indexer = code_indexer
+        self.config = config or PipelineConfig()
+        self.model_id = os.getenv("EMBEDDING_MODEL_ID") or getattr(
+            code_indexer, "model_name", type(code_indexer).__name__
+        )
+        self.embedding_cache: Optional[EmbeddingCache] = (
+            get_embedding_cache() if self.config.use_embedding_cache else None
+        )
+        self.stage_seconds: Dict[str, float] = dict.fromkeys(self.STAGES, 0.0)
+        self.chunk_counts: Dict[str, int] = {"stored": 0, "duplicate": 0}
+        self._stage_lock = threading.Lock()
+    
+    def record_stage(self, stage: str, seconds: float) -> None:
+        """Add time spent in a stage"""
+        with self._stage_lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        PIPELINE_STAGE_DURATION.labels(stage).observe(seconds)
+    
+    def timed(self, stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call a function and add its duration to a stage"""
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.record_stage(stage, time.perf_counter() - started)
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of chunk texts, reusing cached embeddings
+        
+        Args:
+            texts: Chunk texts
+            
+        Returns:
+            Embeddings in the same order as the texts
+        """
+        if self.embedding_cache is None:
+            CHUNKS_EMBEDDED.labels("model").inc(len(texts))
+            return self.code_indexer.embed_documents(texts)
+        
+        keys = [EmbeddingCache.key(self.model_id, text) for text in texts]
+        found = self.embedding_cache.get_many(keys)
+        
+        # Embed each missing chunk once even if it repeats within the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            embeddings = self.code_indexer.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), embeddings))
+            self.embedding_cache.put_many(computed)
+            found.update(computed)
+        CHUNKS_EMBEDDED.labels("model").inc(len(missing))
+        CHUNKS_EMBEDDED.labels("cache").inc(len(texts) - len(missing))
+        
+        return [found[key] for key in keys]
+    
+    def index_files(self,
+                    file_paths: List[str],
+                    collection_name: str,
+                    root: Optional[str] = None,
+                    on_progress: Optional[Callable[[int], None]] = None,
+                    on_error: Optional[Callable[[str, str], None]] = None,
+                    on_skip: Optional[Callable[[str, str], None]] = None,
+                    file_filter: Optional[IngestFilter] = None) -> Dict[str, List[str]]:
+        """
+        Index files from disk
+        
+        Files rejected by the ingest pre-filter are reported through on_skip
+        and never read in full: path rules are checked first, then the size
+        cap, then the content as it is read.
+        
+        Args:
+            file_paths: List of file paths to index
+            collection_name: Name of the collection
+            root: Optional directory that stored paths are made relative to
+            on_progress: Optional callback receiving the running count of indexed files
+            on_error: Optional callback receiving (file_path, error) for failed files
+            on_skip: Optional callback receiving (file_path, reason) for filtered files
+            file_filter: Pre-filter to apply, built from the .gitignore files among file_paths by default
+            
+        Returns:
+            Mapping of indexed file path to its chunk IDs
+        """
+        def display_path(file_path: str) -> str:
+            return os.path.relpath(file_path, root) if root else file_path
+        
+        # Path rules only look below the tree root, never at where the tree sits
+        filter_root = root or (os.path.commonpath([os.path.dirname(path) for path in file_paths]) if file_paths else "")
+        if file_filter is None and self.config.filter_files and file_paths:
+            file_filter = self.timed("filter", IngestFilter.for_tree, filter_root, file_paths)
+        if file_filter is not None:
+            started = time.perf_counter()
+            kept = []
+            for file_path in file_paths:
+                reason = file_filter.check_path(os.path.relpath(file_path, filter_root))
+                if reason is None:
+                    kept.append(file_path)
+                elif on_skip:
+                    on_skip(display_path(file_path), reason)
+            file_paths = kept
+            self.record_stage("filter", time.perf_counter() - started)
+        
+        file_stats = {}
+        
+        def documents() -> Iterator[Tuple[str, str]]:
+            with ThreadPoolExecutor(max_workers=self.config.read_workers) as readers:
+                # Bounded windows keep at most one window of file contents in memory
+                for window in _batched(file_paths, self.config.read_workers * self.config.chunk_batch_size):
+                    results = readers.map(lambda path: self.timed("read", _read_file, path, file_filter), window)
+                    for file_path, content, error, skip_reason, stats in results:
+                        if skip_reason:
+                            if on_skip:
+                                on_skip(display_path(file_path), skip_reason)
+                            continue
+                        if content is None:
+                            FILE_ERRORS.inc()
+                            if on_error:
+                                on_error(display_path(file_path), error)
+                            continue
+                        file_stats[display_path(file_path)] = stats
+                        yield display_path(file_path), content
+        
+        return self.index_documents(documents(), collection_name, on_progress=on_progress, on_error=on_error,
+                                    file_stats=file_stats)
+    
+    def index_documents(self,
+                        documents: Iterable[Tuple[str, str]],
+                        collection_name: str,
+                        on_progress: Optional[Callable[[int], None]] = None,
+                        on_error: Optional[Callable[[str, str], None]] = None,
+                        file_stats: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, List[str]]:
+        """
+        Index in-memory documents
+        
+        Args:
+            documents: Iterable of (file_path, content) tuples
+            collection_name: Name of the collection
+            on_progress: Optional callback receiving the running count of indexed files
+            on_error: Optional callback receiving (file_path, error) for failed files
+            file_stats: Optional on-disk size and mtime_ns per file path, filled in as documents are produced,
+                recorded in the manifest so the first reindex can skip unchanged files
+            
+        Returns:
+            Mapping of indexed file path to its chunk IDs
+        """
+        store = open_vector_store(collection_name)
+        lexical = LexicalIndex(collection_name)
+        symbol_index = SymbolIndex(collection_name)
+        locations = ChunkLocations(collection_name)
+        indexed: Dict[str, List[str]] = {}
+        # Chunk ID of every chunk queued for storage in this run, by content digest
+        queued: Dict[str, str] = {}
+        queue_keys: Dict[str, str] = {}
+        # Files of this run that point at each queued chunk not yet written
+        owners: Dict[str, Set[str]] = {}
+        fingerprints: Dict[str, Tuple[str, int]] = {}
+        failed = set()
+        pending_chunks: List[Dict[str, Any]] = []
+        pending_writes: List[Tuple[Dict[str, Any], List[float]]] = []
+        
+        def forget(chunk_ids: Iterable[str]) -> None:
+            # Later duplicates of a forgotten chunk are queued again instead of pointing at it
+            for chunk_id in chunk_ids:
+                key = queue_keys.pop(chunk_id, None)
+                if key is not None and queued.get(key) == chunk_id:
+                    del queued[key]
+                owners.pop(chunk_id, None)
+        
+        def report_error(file_path: str, error: str) -> None:
+            if file_path in failed:
+                return
+            failed.add(file_path)
+            FILE_ERRORS.inc()
+            # Drop chunks of this file that already reached the store, unless other files share them
+            written = indexed.pop(file_path, None)
+            if written:
+                locations.delete_files([file_path])
+                orphans = locations.orphaned(written)
+                store.delete(orphans)
+                lexical.delete(orphans)
+                forget(orphans)
+                symbol_index.delete_files([file_path])
+            if on_error:
+                on_error(file_path, error)
+        
+        def lost(chunks: List[Dict[str, Any]], error: str) -> None:
+            # A chunk that never reached the store fails every file pointing at it
+            for chunk in chunks:
+                files = owners.get(chunk["id"], set())
+                forget([chunk["id"]])
+                for file_path in sorted(files):
+                    report_error(file_path, error)
+        
+        def write(force: bool = False) -> None:
+            nonlocal pending_writes
+            while pending_writes and (force or len(pending_writes) >= self.config.write_batch_size):
+                batch = pending_writes[:self.config.write_batch_size]
+                pending_writes = pending_writes[self.config.write_batch_size:]
+                # Shared chunks are still written while any file pointing at them survives
+                dropped = [c["id"] for c, _ in batch if not owners.get(c["id"], set()) - failed]
+                forget(dropped)
+                batch = [(c, e) for c, e in batch if c["id"] in owners]
+                if not batch:
+                    continue
+                started = time.perf_counter()
+                try:
+                    store.add(
+                        ids=[c["id"] for c, _ in batch],
+                        documents=[c["text"] for c, _ in batch],
+                        embeddings=[e for _, e in batch],
+                        metadatas=[c["metadata"] for c, _ in batch]
+                    )
+                    lexical.add([c["id"] for c, _ in batch], [c["terms"] for c, _ in batch])
+                    if self.config.deduplicate:
+                        locations.register({c["digest"]: c["id"] for c, _ in batch})
+                    for chunk, _ in batch:
+                        owners.pop(chunk["id"], None)
+                    self.record_stage("write", time.perf_counter() - started)
+                except Exception as e:
+                    lost([chunk for chunk, _ in batch], str(e))
+        
+        def embed(embedders: ThreadPoolExecutor, force: bool = False) -> None:
+            nonlocal pending_chunks
+            size = self.config.embed_batch_size
+            batches = []
+            while pending_chunks and (force or len(pending_chunks) >= size):
+                batches.append(pending_chunks[:size])
+                pending_chunks = pending_chunks[size:]
+            
+            futures = [
+                (batch, embedders.submit(self.timed, "embed", self.embed, [c["text"] for c in batch]))
+                for batch in batches
+            ]
+            for batch, future in futures:
+                try:
+                    pending_writes.extend(zip(batch, future.result()))
+                except Exception as e:
+                    lost(batch, str(e))
+            write()
+        
+        def collect(timed_chunks: Tuple[List[Tuple[str, List[Dict[str, Any]], str, Dict[str, Any]]], float],
+                    embedders: ThreadPoolExecutor) -> None:
+            chunked, seconds = timed_chunks
+            self.record_stage("chunk", seconds)
+            for file_path, _, error, _ in chunked:
+                if error:
+                    report_error(file_path, error)
+            chunked = [(file_path, chunks, symbols) for file_path, chunks, error, symbols in chunked if not error]
+            
+            stored: Dict[str, str] = {}
+            if self.config.deduplicate:
+                stored = self.timed("write", locations.resolve, list({
+                    c["digest"] for _, chunks, _ in chunked for c in chunks if c["digest"] not in queued
+                }))
+            
+            symbols_by_file = {}
+            locations_by_file = {}
+            for file_path, chunks, symbols in chunked:
+                renamed = {}
+                for chunk in chunks:
+                    key = chunk["digest"] if self.config.deduplicate else chunk["id"]
+                    existing = queued.get(key) or stored.get(key)
+                    if existing is None:
+                        queued[key] = chunk["id"]
+                        queue_keys[chunk["id"]] = key
+                        pending_chunks.append(chunk)
+                        self.chunk_counts["stored"] += 1
+                        CHUNKS_INDEXED.labels("stored").inc()
+                    else:
+                        self.chunk_counts["duplicate"] += 1
+                        CHUNKS_INDEXED.labels("duplicate").inc()
+                    renamed[chunk["id"]] = existing or chunk["id"]
+                    if existing is None or existing in owners:
+                        owners.setdefault(renamed[chunk["id"]], set()).add(file_path)
+                
+                for record in symbols.get("definitions", []) + symbols.get("references", []):
+                    record["chunk_ids"] = [renamed.get(c, c) for c in record.get("chunk_ids", [])]
+                indexed[file_path] = list(dict.fromkeys(renamed[c["id"]] for c in chunks))
+                symbols_by_file[file_path] = symbols
+                locations_by_file[file_path] = [
+                    (renamed[c["id"]], c["metadata"]["start_line"], c["metadata"]["end_line"]) for c in chunks
+                ]
+            self.timed("write", symbol_index.replace_files, symbols_by_file)
+            self.timed("write", locations.replace_files, locations_by_file)
+            embed(embedders)
+            if on_progress:
+                on_progress(len(indexed))
+        
+        def hashed(documents: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+            for file_path, content in documents:
+                fingerprints[file_path] = content_fingerprint(content)
+                FILES_INDEXED.inc()
+                BYTES_INDEXED.inc(fingerprints[file_path][1])
+                yield file_path, content
+        
+        try:
+            with ProcessPoolExecutor(max_workers=self.config.chunk_workers) as chunkers, \
+                    ThreadPoolExecutor(max_workers=self.config.embed_workers) as embedders:
+                in_flight = []
+                for batch in _batched(hashed(documents), self.config.chunk_batch_size):
+                    in_flight.append(chunkers.submit(_chunk_timed, batch))
+                    # Backpressure: never queue more chunk batches than workers can hold
+                    if len(in_flight) >= self.config.chunk_workers * 2:
+                        collect(in_flight.pop(0).result(), embedders)
+                
+                for future in in_flight:
+                    collect(future.result(), embedders)
+                
+                embed(embedders, force=True)
+                write(force=True)
+            self.timed("index", store.refresh_index)
+        finally:
+            store.close()
+            lexical.close()
+            symbol_index.close()
+            locations.close()
+        
+        # Remember what was written so a later reindex can skip unchanged files
+        started = time.perf_counter()
+        with manifest_lock(collection_name):
+            manifest = CollectionManifest(collection_name)
+            for file_path, chunk_ids in indexed.items():
+                file_hash, size = fingerprints[file_path]
+                stats = (file_stats or {}).get(file_path) or {"size": size}
+                manifest.record(file_path, file_hash, chunk_ids, **stats)
+            manifest.save()
+        self.record_stage("manifest", time.perf_counter() - started)
+        get_collection_registry().bump_version(collection_name)
+        
+        if on_progress:
+            on_progress(len(indexed))
+        return indexed
\ No newline at end of file
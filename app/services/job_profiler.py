@@ -0,0 +1,294 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.processing_service import get_status, update_status
+
+# Fraction of jobs profiled even without the profile flag, 0 disables sampling
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+
+# Directory holding one sub-directory of profile files per job
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.getcwd(), "data", "profiles"))
+
+# Profiles kept on disk, the oldest are removed first
+PROFILE_MAX_JOBS = int(os.getenv("PROFILE_MAX_JOBS", 50))
+
+# Stack frames recorded per allocation, more frames cost more memory and time
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", 1))
+
+# Seconds between stack samples for the collapsed-stack output
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+
+# Entries listed in the summary
+PROFILE_TOP_ENTRIES = int(os.getenv("PROFILE_TOP_ENTRIES", 25))
+
+PROFILE_FORMATS = ("summary", "pstats", "collapsed")
+
+_FILES = {"summary": "summary.json", "pstats": "profile.pstats", "collapsed": "stacks.txt"}
+
+# Housekeeping threads that would only show up as idle waits
+_IGNORED_THREADS = ("metrics-flush", "profile-sampler")
+
+_active = False
+
+
+def should_profile(requested: bool = False) -> bool:
+    """
+    Decide whether a job runs under the profiler
+
+    Args:
+        requested: The job was submitted with the profile flag
+
+    Returns:
+        True if the job should be profiled
+    """
+    return requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def profile_path(job_id: str, profile_format: str) -> Optional[str]:
+    """
+    Return the file of a job's profile in the given format
+
+    Args:
+        job_id: Job ID
+        profile_format: One of summary, pstats or collapsed
+
+    Returns:
+        Path of the file, or None if the job has no profile in that format
+    """
+    if profile_format not in PROFILE_FORMATS:
+        raise ValueError(f"Unknown profile format: {profile_format}")
+    # Job IDs are UUIDs, anything else could escape the profile directory
+    if os.path.basename(job_id) != job_id or job_id in ("", ".", ".."):
+        return None
+    path = os.path.join(PROFILE_DIR, job_id, _FILES[profile_format])
+    return path if os.path.exists(path) else None
+
+
+def load_summary(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return the profile summary of a job, or None if it was not profiled"""
+    path = profile_path(job_id, "summary")
+    if path is None:
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class StackSampler:
+    """
+    Samples the stacks of all threads at a fixed interval
+
+    Counts of identical stacks are written in the collapsed format read by
+    flame graph tools: one line per stack, frames joined by semicolons
+    from the outermost, followed by the sample count.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._unrelated: set = set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            ignored = self._unrelated | {
+                thread.ident for thread in threading.enumerate() if thread.name in _IGNORED_THREADS
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in ignored:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        # Threads that already exist belong to other jobs or the server
+        self._unrelated = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _ThreadProfiles:
+    """
+    Deterministic profile of the job's thread and the threads it starts
+
+    Before Python 3.12 each thread needs its own cProfile profiler, started
+    through threading.setprofile; from 3.12 one profiler sees all threads.
+    """
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._per_thread = sys.version_info < (3, 12)
+
+    def _start_in_thread(self, *args: Any) -> None:
+        if threading.current_thread().name in _IGNORED_THREADS:
+            return
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def start(self) -> None:
+        if self._per_thread:
+            threading.setprofile(self._start_in_thread)
+        self._start_in_thread()
+
+    def stop(self) -> pstats.Stats:
+        if self._per_thread:
+            threading.setprofile(None)
+        self.profiles[0].disable()
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # A profiler whose thread never returned a call has no stats
+                continue
+        return stats
+
+
+def _top_functions(stats: pstats.Stats, limit: int) -> List[Dict[str, Any]]:
+    rows = []
+    for (file_name, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{function} ({file_name}:{line})",
+            "calls": calls,
+            "tottime": round(tottime, 4),
+            "cumtime": round(cumtime, 4)
+        })
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[:limit]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        }
+        for stat in snapshot.filter_traces([
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, tracemalloc.__file__)
+        ]).statistics("lineno")[:limit]
+    ]
+
+
+def _prune_profiles(keep: int) -> None:
+    try:
+        entries = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR)]
+    except FileNotFoundError:
+        return
+    entries = sorted((path for path in entries if os.path.isdir(path)), key=os.path.getmtime, reverse=True)
+    for path in entries[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _stop_in_child() -> None:
+    # Forked chunking workers would otherwise trace every allocation and call
+    if _active:
+        tracemalloc.stop()
+        threading.setprofile(None)
+        sys.setprofile(None)
+
+
+os.register_at_fork(after_in_child=_stop_in_child)
+
+
+def run_profiled(job_id: str, fn: Callable[..., None], *args: Any) -> None:
+    """
+    Run a task function under the CPU profiler and tracemalloc
+
+    Only the scheduler calls this, for jobs chosen by should_profile, so
+    other jobs never pay for profiling. Work done in child processes, such
+    as chunking, shows up in the stage timings but not in the profile.
+
+    Args:
+        job_id: Job ID, the profile is stored under it
+        fn: Module-level task function
+        args: Arguments passed to the task function
+    """
+    sampler = StackSampler()
+    profiles = _ThreadProfiles()
+    started_at = datetime.now().isoformat()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+
+    global _active
+    _active = True
+    tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+    sampler.start()
+    profiles.start()
+    try:
+        fn(*args)
+    finally:
+        stats = profiles.stop()
+        _active = False
+        sampler.stop()
+        wall_seconds = time.perf_counter() - started
+        cpu_seconds = time.process_time() - cpu_started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _save_profile(job_id, stats, sampler, snapshot, {
+            "started_at": started_at,
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "peak_traced_mb": round(peak / (1024 * 1024), 2)
+        })
+
+
+def _save_profile(job_id: str, stats: pstats.Stats, sampler: StackSampler,
+                  snapshot: tracemalloc.Snapshot, timings: Dict[str, Any]) -> None:
+    directory = os.path.join(PROFILE_DIR, job_id)
+    os.makedirs(directory, exist_ok=True)
+    stats.dump_stats(os.path.join(directory, _FILES["pstats"]))
+    sampler.write(os.path.join(directory, _FILES["collapsed"]))
+
+    try:
+        details = get_status(job_id).get("details") or {}
+    except KeyError:
+        details = {}
+    summary = {
+        "job_id": job_id,
+        **timings,
+        "samples": sampler.samples,
+        "stage_durations": details.get("stage_durations", {}),
+        "stage_seconds": details.get("stage_seconds", {}),
+        "top_functions": _top_functions(stats, PROFILE_TOP_ENTRIES),
+        "top_allocations": _top_allocations(snapshot, PROFILE_TOP_ENTRIES)
+    }
+    with open(os.path.join(directory, _FILES["summary"]), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    try:
+        update_status(job_id, extra_details={"profile": {"available": True, **timings}})
+    except KeyError:
+        pass
+    _prune_profiles(PROFILE_MAX_JOBS)
\ No newline at end of file
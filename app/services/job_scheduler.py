@@ -0,0 +1,244 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.metrics import JOB_DURATION, JOBS_QUEUED, JOBS_REJECTED, JOBS_RUNNING
+from app.services.job_store import JOB_STORE_BACKEND, get_job_store
+from app.services.processing_service import update_status, fail_job
+
+# Maximum number of ingest jobs running at once in this process, each uvicorn worker has its own scheduler
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", 4))
+
+# Maximum number of jobs waiting to start before new submissions are rejected
+SCHEDULER_MAX_QUEUED = int(os.getenv("SCHEDULER_MAX_QUEUED", 20))
+
+# Per job type limits, e.g. "archive=2,zip=2,rar=1,github=2,reindex=1,log=1"
+SCHEDULER_TYPE_LIMITS = os.getenv("SCHEDULER_TYPE_LIMITS", "archive=2,zip=2,rar=1,github=2,reindex=1,log=1")
+
+# Lower numbers start first
+DEFAULT_PRIORITIES = {"archive": 5, "zip": 5, "rar": 5, "github": 5, "log": 5, "reindex": 10}
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            job_type, limit = item.split("=", 1)
+            limits[job_type.strip()] = int(limit)
+    return limits
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot accept more work"""
+    
+    def __init__(self, job_type: str, retry_after: int):
+        super().__init__(f"Too many queued {job_type} jobs, retry in {retry_after} seconds")
+        self.job_type = job_type
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """
+    Runs ingest jobs on a dedicated worker pool instead of the web threadpool
+    
+    Jobs wait in a priority queue and are started only while both the global
+    concurrency limit and the limit for their job type have room. Once the
+    queue is full, submissions are rejected so the caller can apply
+    backpressure.
+    
+    The queue and the limits belong to one process: with several uvicorn
+    workers, each enforces them separately, so the service as a whole runs
+    up to WORKERS times SCHEDULER_MAX_CONCURRENT jobs. Queued jobs are not
+    persisted, a restart fails them instead of running them later.
+    """
+    
+    def __init__(self,
+                 max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+                 type_limits: Optional[Dict[str, int]] = None,
+                 max_queued: int = SCHEDULER_MAX_QUEUED):
+        self.max_concurrent = max_concurrent
+        self.type_limits = type_limits if type_limits is not None else _parse_limits(SCHEDULER_TYPE_LIMITS)
+        self.max_queued = max_queued
+        
+        self._executor: Optional[Executor] = None
+        self._queue: List[Tuple[int, int, str, str, Callable[..., None], Tuple[Any, ...]]] = []
+        self._sequence = itertools.count()
+        self._running: Dict[str, int] = {}
+        self._durations: List[float] = []
+        # Re-entrant because a job finishing instantly runs its callback inside _start
+        self._lock = threading.RLock()
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # Worker processes only see job updates through a shared store
+            if JOB_STORE_BACKEND == "sqlite":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_concurrent)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        return self._executor
+    
+    def retry_after(self) -> int:
+        """Estimate how many seconds until a queue slot frees up"""
+        average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        return max(1, int(average * (len(self._queue) + 1) / self.max_concurrent))
+    
+    def check_capacity(self, job_type: str) -> None:
+        """
+        Raise QueueFullError if a job submitted now would be rejected
+        
+        Args:
+            job_type: Type of job (archive, zip, rar, github, reindex)
+        """
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                JOBS_REJECTED.labels(job_type).inc()
+                raise QueueFullError(job_type, self.retry_after())
+    
+    def submit(self,
+               job_type: str,
+               job_id: str,
+               fn: Callable[..., None],
+               *args: Any,
+               priority: Optional[int] = None) -> None:
+        """
+        Queue a job for execution
+        
+        Args:
+            job_type: Type of job (archive, zip, rar, github, reindex)
+            job_id: Job ID, marked failed if the worker dies
+            fn: Module-level task function
+            args: Arguments passed to the task function
+            priority: Lower numbers start first, defaults per job type
+        """
+        if priority is None:
+            priority = DEFAULT_PRIORITIES.get(job_type, 5)
+        
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                JOBS_REJECTED.labels(job_type).inc()
+                raise QueueFullError(job_type, self.retry_after())
+            heapq.heappush(self._queue, (priority, next(self._sequence), job_type, job_id, fn, args))
+            self._dispatch()
+            # Written under the lock so a worker cannot report a later stage first
+            if any(item[3] == job_id for item in self._queue):
+                update_status(job_id, stage="Queued, waiting for a free worker...")
+    
+    def _dispatch(self) -> None:
+        """Start queued jobs while there is capacity, caller must hold the lock"""
+        blocked = []
+        while self._queue and sum(self._running.values()) < self.max_concurrent:
+            item = heapq.heappop(self._queue)
+            job_type = item[2]
+            if self._running.get(job_type, 0) >= self.type_limits.get(job_type, self.max_concurrent):
+                blocked.append(item)
+                continue
+            self._start(item)
+        
+        for item in blocked:
+            heapq.heappush(self._queue, item)
+        self._update_gauges()
+    
+    def _update_gauges(self) -> None:
+        """Publish running and queued counts per job type, caller must hold the lock"""
+        queued: Dict[str, int] = {}
+        for item in self._queue:
+            queued[item[2]] = queued.get(item[2], 0) + 1
+        for job_type in set(self._running) | set(queued) | set(self.type_limits):
+            JOBS_RUNNING.labels(job_type).set(self._running.get(job_type, 0))
+            JOBS_QUEUED.labels(job_type).set(queued.get(job_type, 0))
+    
+    def _start(self, item: Tuple[int, int, str, str, Callable[..., None], Tuple[Any, ...]]) -> None:
+        _, _, job_type, job_id, fn, args = item
+        self._running[job_type] = self._running.get(job_type, 0) + 1
+        started = time.monotonic()
+        future = self._get_executor().submit(fn, *args)
+        future.add_done_callback(
+            lambda f: self._on_done(f, job_type, job_id, started)
+        )
+    
+    def _on_done(self, future: Future, job_type: str, job_id: str, started: float) -> None:
+        # exception() raises CancelledError for futures cancelled at shutdown
+        cancelled = future.cancelled()
+        error = None if cancelled else future.exception()
+        with self._lock:
+            # A dead worker breaks the whole pool, start a fresh one for later jobs
+            if isinstance(error, BrokenProcessPool):
+                self._executor = None
+            self._running[job_type] -= 1
+            duration = time.monotonic() - started
+            self._durations = (self._durations + [duration])[-50:]
+            # Cancellation only happens at shutdown, do not start a fresh pool then
+            if not cancelled:
+                self._dispatch()
+        JOB_DURATION.labels(job_type).observe(duration)
+        
+        # Task functions report their own errors, this only catches crashed workers and cancelled jobs
+        if cancelled or error is not None:
+            message = "Job cancelled before it started" if cancelled else f"Worker crashed: {error}"
+            try:
+                fail_job(job_id=job_id, error_message=message)
+            except KeyError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return running and queued job counts"""
+        with self._lock:
+            queued: Dict[str, int] = {}
+            for item in self._queue:
+                queued[item[2]] = queued.get(item[2], 0) + 1
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+                "type_limits": dict(self.type_limits),
+                "running": {job_type: count for job_type, count in self._running.items() if count},
+                "queued": queued
+            }
+    
+    def fail_orphaned_jobs(self) -> int:
+        """
+        Fail jobs left processing by a process that exited
+        
+        Runs at startup. The task arguments of those jobs were never stored,
+        so they cannot be requeued and are marked failed instead.
+        
+        Returns:
+            Number of jobs marked failed
+        """
+        orphaned = get_job_store().orphaned()
+        for job_id in orphaned:
+            try:
+                fail_job(job_id=job_id, error_message="Server restarted before the job finished")
+            except KeyError:
+                pass
+        return len(orphaned)
+    
+    def shutdown(self) -> None:
+        """Stop accepting jobs, fail queued ones and wait for running ones to finish"""
+        with self._lock:
+            queued, self._queue = self._queue, []
+            self._update_gauges()
+        for item in queued:
+            try:
+                fail_job(job_id=item[3], error_message="Server shut down before the job started")
+            except KeyError:
+                pass
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_scheduler: Optional[JobScheduler] = None
+
+
+def get_scheduler() -> JobScheduler:
+    """Return the scheduler of this process"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler()
+    return _scheduler
\ No newline at end of file
@@ -0,0 +1,301 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Backend used for job state: "sqlite" is shared by all workers, "memory" is per process
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "sqlite")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(os.getcwd(), "data", "jobs.db"))
+
+# Finished jobs are evicted after this many seconds
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 24 * 60 * 60))
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+def current_owner() -> str:
+    """Return the owner recorded for jobs created by this process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Check whether the process that created a job is still running"""
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    # Processes on other hosts cannot be checked, assume they are alive
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class JobStore:
+    """
+    Base class for job state backends
+
+    Every mutation goes through update(), which applies a function to the
+    current status dictionary atomically, so concurrent writers never lose
+    each other's changes.
+    """
+
+    def __init__(self, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._last_eviction = 0.0
+
+    def create(self, job_id: str, job_type: str, collection_name: str, status: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_version(self, job_id: str) -> int:
+        """Return a counter that increases with every update of the job"""
+        raise NotImplementedError
+
+    def update(self, job_id: str, mutate: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def list(self,
+             collection_name: Optional[str] = None,
+             status: Optional[str] = None,
+             limit: int = 100) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def evict_expired(self) -> int:
+        raise NotImplementedError
+
+    def orphaned(self) -> List[str]:
+        """Return the IDs of processing jobs whose owning process has exited"""
+        raise NotImplementedError
+
+    def maybe_evict(self) -> None:
+        """Evict expired jobs at most once a minute"""
+        now = time.time()
+        if now - self._last_eviction >= 60:
+            self._last_eviction = now
+            self.evict_expired()
+
+
+class MemoryJobStore(JobStore):
+    """In-process job store, only suitable for a single worker"""
+
+    def __init__(self, ttl_seconds: int = JOB_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job_type: str, collection_name: str, status: Dict[str, Any]) -> None:
+        self.maybe_evict()
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_type": job_type,
+                "created_at": now,
+                "updated_at": now,
+                "finished_at": None,
+                "version": 0,
+                "status": status
+            }
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(f"Job ID {job_id} not found")
+            return json.loads(json.dumps(self._jobs[job_id]["status"]))
+
+    def get_version(self, job_id: str) -> int:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(f"Job ID {job_id} not found")
+            return self._jobs[job_id]["version"]
+
+    def update(self, job_id: str, mutate: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(f"Job ID {job_id} not found")
+            job = self._jobs[job_id]
+            job["status"] = mutate(job["status"])
+            job["updated_at"] = time.time()
+            job["version"] += 1
+            if job["status"].get("status") in FINISHED_STATUSES:
+                job["finished_at"] = job["finished_at"] or job["updated_at"]
+            return json.loads(json.dumps(job["status"]))
+
+    def list(self,
+             collection_name: Optional[str] = None,
+             status: Optional[str] = None,
+             limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = [
+                {"job_id": job_id, "job_type": job["job_type"], "created_at": job["created_at"],
+                 "updated_at": job["updated_at"], **job["status"]}
+                for job_id, job in self._jobs.items()
+                if (collection_name is None or job["status"].get("collection_name") == collection_name)
+                and (status is None or job["status"].get("status") == status)
+            ]
+        jobs.sort(key=lambda job: job["created_at"], reverse=True)
+        return jobs[:limit]
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def orphaned(self) -> List[str]:
+        # Jobs die with the process that holds them
+        return []
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store shared by all worker processes through SQLite in WAL mode
+
+    Updates run inside BEGIN IMMEDIATE transactions, which take the write
+    lock before reading, so read-modify-write cycles from different
+    processes are serialized. Each job records the process that created it,
+    so jobs left processing by a process that exited can be found.
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH, ttl_seconds: int = JOB_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, job_type TEXT NOT NULL, "
+            "collection_name TEXT, status TEXT NOT NULL, data TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, finished_at REAL, "
+            "version INTEGER NOT NULL DEFAULT 0, owner TEXT)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_collection ON jobs (collection_name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+
+    def create(self, job_id: str, job_type: str, collection_name: str, status: Dict[str, Any]) -> None:
+        self.maybe_evict()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, job_type, collection_name, status, data, created_at, updated_at, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, collection_name, status["status"], json.dumps(status), now, now, current_owner())
+            )
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Job ID {job_id} not found")
+        return json.loads(row[0])
+
+    def get_version(self, job_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Job ID {job_id} not found")
+        return row[0]
+
+    def update(self, job_id: str, mutate: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is None:
+                    raise KeyError(f"Job ID {job_id} not found")
+
+                status = mutate(json.loads(row[0]))
+                now = time.time()
+                finished_at = now if status.get("status") in FINISHED_STATUSES else None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, data = ?, updated_at = ?, version = version + 1, "
+                    "finished_at = COALESCE(finished_at, ?) WHERE job_id = ?",
+                    (status.get("status", "processing"), json.dumps(status), now, finished_at, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def list(self,
+             collection_name: Optional[str] = None,
+             status: Optional[str] = None,
+             limit: int = 100) -> List[Dict[str, Any]]:
+        query = "SELECT job_id, job_type, created_at, updated_at, data FROM jobs WHERE 1 = 1"
+        params: List[Any] = []
+        if collection_name is not None:
+            query += " AND collection_name = ?"
+            params.append(collection_name)
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {"job_id": job_id, "job_type": job_type, "created_at": created_at,
+             "updated_at": updated_at, **json.loads(data)}
+            for job_id, job_type, created_at, updated_at, data in rows
+        ]
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def orphaned(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id, owner FROM jobs WHERE status = 'processing'").fetchall()
+        return [job_id for job_id, owner in rows if not _owner_alive(owner)]
+
+
+_store: Optional[JobStore] = None
+_store_pid: Optional[int] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """
+    Return the configured job store for this process
+    
+    The store is recreated after a fork so SQLite connections are never
+    shared between processes.
+    """
+    global _store, _store_pid
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store_pid = os.getpid()
+            if JOB_STORE_BACKEND == "memory":
+                _store = MemoryJobStore()
+            elif JOB_STORE_BACKEND == "sqlite":
+                _store = SQLiteJobStore()
+            else:
+                raise ValueError(f"Unknown job store backend: {JOB_STORE_BACKEND}")
+        return _store
\ No newline at end of file
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import time
+import urllib.request
+from typing import Any, Dict, Iterator, Optional
+
+# "openai" for any OpenAI-compatible server, "stub" for a deterministic test model
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+# Any OpenAI-compatible chat completions server, e.g. a local Ollama or llama.cpp
+LLM_API_BASE = os.getenv("LLM_API_BASE", "http://localhost:11434/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.2))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", 1024))
+LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", 300))
+
+class OpenAICompatibleLLM:
+    """
+    Client for a chat completions endpoint
+    """
+    
+    def __init__(self,
+                 api_base: str = LLM_API_BASE,
+                 model: str = LLM_MODEL,
+                 temperature: float = LLM_TEMPERATURE,
+                 max_tokens: int = LLM_MAX_TOKENS):
+        self.api_base = api_base.rstrip("/")
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+    
+    def params(self) -> Dict[str, Any]:
+        """Return the parameters that influence generated answers"""
+        return {
+            "backend": "openai",
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+    
+    def _request(self, prompt: str, stream: bool = False):
+        body = json.dumps({
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if LLM_API_KEY:
+            headers["Authorization"] = f"Bearer {LLM_API_KEY}"
+        request = urllib.request.Request(
+            f"{self.api_base}/chat/completions", data=body, headers=headers, method="POST"
+        )
+        return urllib.request.urlopen(request, timeout=LLM_TIMEOUT)
+    
+    def generate(self, prompt: str) -> str:
+        """
+        Generate a complete answer
+        
+        Args:
+            prompt: Prompt text
+            
+        Returns:
+            Generated text
+        """
+        with self._request(prompt) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        return data["choices"][0]["message"]["content"]
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Generate an answer token by token
+        
+        Closing the iterator closes the HTTP connection, which makes the
+        server stop generating.
+        
+        Args:
+            prompt: Prompt text
+            
+        Returns:
+            Iterator of text fragments
+        """
+        with self._request(prompt, stream=True) as response:
+            for line in response:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                token = choices[0].get("delta", {}).get("content")
+                if token:
+                    yield token
+
+class StubLLM:
+    """
+    Deterministic model for tests and benchmarks
+    
+    The answer depends only on the prompt, so repeated runs are comparable
+    and no model server is needed.
+    """
+    
+    def __init__(self, words: int = 40, delay: float = 0.0):
+        self.words = words
+        self.delay = delay
+    
+    def params(self) -> Dict[str, Any]:
+        """Return the parameters that influence generated answers"""
+        return {"backend": "stub", "words": self.words}
+    
+    def generate(self, prompt: str) -> str:
+        """
+        Generate a complete answer
+        
+        Args:
+            prompt: Prompt text
+            
+        Returns:
+            Generated text
+        """
+        return "".join(self.stream(prompt))
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Generate an answer token by token
+        
+        Args:
+            prompt: Prompt text
+            
+        Returns:
+            Iterator of text fragments
+        """
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        for i in range(self.words):
+            if self.delay:
+                time.sleep(self.delay)
+            word = hashlib.sha256(f"{digest}:{i}".encode("utf-8")).hexdigest()[:6]
+            yield word if i == 0 else f" {word}"
+
+_llm: Optional[Any] = None
+
+def get_llm():
+    """Return the configured LLM client"""
+    global _llm
+    if _llm is None:
+        if LLM_BACKEND == "stub":
+            _llm = StubLLM(
+                words=int(os.getenv("STUB_LLM_WORDS", 40)),
+                delay=float(os.getenv("STUB_LLM_DELAY", 0))
+            )
+        elif LLM_BACKEND == "openai":
+            _llm = OpenAICompatibleLLM()
+        else:
+            raise ValueError(f"Unknown LLM backend: {LLM_BACKEND}")
+    return _llm
\ No newline at end of file
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.embedders import create_code_indexer
+from app.core.chunker import chunk_id
+from app.core.collection_registry import get_collection_registry
+from app.core.lexical_index import LexicalIndex, term_frequencies
+from app.core.log_reader import iter_log_lines, split_timestamp
+from app.core.metrics import BYTES_INDEXED, FILES_INDEXED, LOG_LINES
+from app.core.manifest import CollectionManifest, manifest_lock
+from app.core.template_miner import ERROR_LEVELS, LogTemplate, TemplateMiner
+from app.core.sharding import open_vector_store
+from app.services.indexing_pipeline import IndexingPipeline, PipelineConfig
+
+# Report progress after this many lines
+LOG_PROGRESS_LINES = int(os.getenv("LOG_PROGRESS_LINES", 100000))
+
+# Number of templates listed in the error and pattern summaries
+LOG_SUMMARY_TEMPLATES = int(os.getenv("LOG_SUMMARY_TEMPLATES", 20))
+
+class LogService:
+    """
+    Service for ingesting log files
+    
+    Lines are streamed from a memory map into a template miner, and only
+    the resulting templates, with their counts and time ranges, are
+    embedded and indexed.
+    """
+    
+    def __init__(self, pipeline_config: Optional[PipelineConfig] = None):
+        self.pipeline = IndexingPipeline(create_code_indexer(), pipeline_config)
+    
+    def mine_templates(self,
+                       file_path: str,
+                       on_progress: Optional[Callable[[int, float], None]] = None) -> TemplateMiner:
+        """
+        Collapse the lines of a log file into templates
+        
+        Args:
+            file_path: Path to the log file
+            on_progress: Callback receiving lines read and the fraction of bytes read
+            
+        Returns:
+            Template miner holding the templates
+        """
+        miner = TemplateMiner()
+        size = os.path.getsize(file_path) or 1
+        
+        for offset, line in iter_log_lines(file_path):
+            timestamp, content = split_timestamp(line)
+            miner.add(line, timestamp=timestamp, content=content)
+            if on_progress and miner.lines % LOG_PROGRESS_LINES == 0:
+                on_progress(miner.lines, offset / size)
+        
+        return miner
+    
+    def index_log_file(self,
+                       file_path: str,
+                       collection_name: str,
+                       source_name: Optional[str] = None,
+                       on_progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+        """
+        Index a log file into a collection, one entry per template
+        
+        Re-indexing a file with the same source name replaces its entries.
+        
+        Args:
+            file_path: Path to the log file
+            collection_name: Name of the collection
+            source_name: Name recorded for the file, defaults to its base name
+            on_progress: Callback receiving lines read and the fraction of bytes read
+            
+        Returns:
+            Dictionary with lines, templates, evicted_templates and analysis
+        """
+        source_name = source_name or os.path.basename(file_path)
+        miner = self.pipeline.timed("mine", self.mine_templates, file_path, on_progress)
+        FILES_INDEXED.inc()
+        BYTES_INDEXED.inc(os.path.getsize(file_path))
+        LOG_LINES.inc(miner.lines)
+        templates = sorted(miner.templates, key=lambda template: template.count, reverse=True)
+        
+        ids = [chunk_id(source_name, template.id) for template in templates]
+        documents = [template.document() for template in templates]
+        metadatas = [
+            {
+                "file_path": source_name,
+                "template": template.template,
+                "count": template.count,
+                "first_seen": template.first_seen,
+                "last_seen": template.last_seen,
+                "first_line": template.first_line,
+                "level": template.level
+            }
+            for template in templates
+        ]
+        
+        with manifest_lock(collection_name):
+            manifest = CollectionManifest(collection_name)
+            store = open_vector_store(collection_name)
+            lexical = LexicalIndex(collection_name)
+            try:
+                previous = manifest.remove(source_name)
+                if previous:
+                    store.delete(previous)
+                    lexical.delete(previous)
+                
+                batch_size = self.pipeline.config.embed_batch_size
+                for start in range(0, len(documents), batch_size):
+                    end = start + batch_size
+                    batch = documents[start:end]
+                    embeddings = self.pipeline.timed("embed", self.pipeline.embed, batch)
+                    started = time.perf_counter()
+                    store.add(ids[start:end], batch, embeddings, metadatas[start:end])
+                    lexical.add(ids[start:end], [term_frequencies(document) for document in batch])
+                    self.pipeline.record_stage("write", time.perf_counter() - started)
+                self.pipeline.timed("index", store.refresh_index)
+            finally:
+                store.close()
+                lexical.close()
+            
+            digest = hashlib.sha256("\n".join(sorted(documents)).encode("utf-8")).hexdigest()
+            manifest.record(source_name, digest, ids, size=os.path.getsize(file_path), lines=miner.lines)
+            manifest.save()
+        get_collection_registry().bump_version(collection_name)
+        
+        return {
+            "lines": miner.lines,
+            "templates": len(templates),
+            "evicted_templates": miner.evicted,
+            "analysis": summarize_templates(miner.lines, templates)
+        }
+
+def summarize_templates(lines: int, templates: List[LogTemplate]) -> Dict[str, Any]:
+    """
+    Build the automatic analysis of a log file
+    
+    Args:
+        lines: Number of lines read
+        templates: Templates, most frequent first
+        
+    Returns:
+        Dictionary with summary, errors and patterns
+    """
+    error_templates = [template for template in templates if template.level in ERROR_LEVELS]
+    error_lines = sum(template.count for template in error_templates)
+    timestamps = [t for template in templates for t in (template.first_seen, template.last_seen) if t]
+    
+    summary = (
+        f"{lines} lines collapsed into {len(templates)} templates"
+        f" ({lines / max(len(templates), 1):.0f}x fewer entries)."
+        f" {error_lines} error lines across {len(error_templates)} templates."
+    )
+    if timestamps:
+        summary += f" Time range: {min(timestamps)} to {max(timestamps)}."
+    
+    def describe(template: LogTemplate) -> str:
+        text = f"{template.template} ({template.count}x"
+        if template.first_seen:
+            text += f", {template.first_seen} to {template.last_seen}"
+        return text + ")"
+    
+    return {
+        "summary": summary,
+        "errors": [describe(template) for template in error_templates[:LOG_SUMMARY_TEMPLATES]],
+        "patterns": "\n".join(
+            f"- `{template.template}`: {template.count} lines"
+            for template in templates[:LOG_SUMMARY_TEMPLATES]
+        )
+    }
\ No newline at end of file
@@ -1,8 +1,17 @@
+import asyncio
+import os
+import threading
+import time
 import uuid
-from typing import Dict, Any, Tuple, Optional
+from typing import AsyncIterator, Dict, Any, List, Tuple, Optional
 
-# In-memory store for tracking processing status
-processing_status: Dict[str, Dict[str, Any]] = {}
+from app.core.collection_registry import validate_collection_name
+from app.core.metrics import JOB_STAGE_DURATION, JOBS_FINISHED, registry
+from app.services.job_store import get_job_store
+
+# Progress updates are written at most this often unless something important happens
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", 1.0))
+PROGRESS_MIN_FILES = int(os.getenv("PROGRESS_MIN_FILES", 500))
 
 def create_job(name: Optional[str] = None, job_type: str = "code") -> Tuple[str, str]:
     """
@@ -14,18 +23,21 @@ def create_job(name: Optional[str] = None, job_type: str = "code") -> Tuple[str,
         
     Returns:
         Tuple of (job_id, collection_name)
+        
+    Raises:
+        ValueError: If the provided name is not a valid collection name
     """
     job_id = str(uuid.uuid4())
     
     # Generate collection name based on type and provided name
     if name:
-        collection_name = name
+        collection_name = validate_collection_name(name)
     else:
         prefix = job_type if job_type else "project"
         collection_name = f"{prefix}_{uuid.uuid4().hex[:8]}"
     
     # Initialize job status
-    processing_status[job_id] = {
+    get_job_store().create(job_id, job_type, collection_name, {
         "status": "processing",
         "message": f"{job_type.capitalize()} processing started",
         "collection_name": collection_name,
@@ -35,7 +47,7 @@ def create_job(name: Optional[str] = None, job_type: str = "code") -> Tuple[str,
             "progress_percentage": 0,
             "errors": []
         }
-    }
+    })
     
     return job_id, collection_name
 
@@ -49,17 +61,70 @@ def get_status(job_id: str) -> Dict[str, Any]:
     Returns:
         Status information dictionary
     """
-    if job_id not in processing_status:
-        raise KeyError(f"Job ID {job_id} not found")
+    return get_job_store().get(job_id)
+
+async def watch_status(job_id: str,
+                       interval: float = 0.5,
+                       heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Yield the status of a job every time it changes
+    
+    Only the job's version counter is read between changes, so watching is
+    much cheaper than repeated full status reads. None is yielded as a
+    heartbeat when nothing changed for a while. The generator ends after
+    the job completes or fails.
+    
+    Args:
+        job_id: The ID of the job
+        interval: Seconds between version checks
+        heartbeat: Seconds of silence after which None is yielded
+        
+    Yields:
+        Status information dictionaries, or None as a heartbeat
+    """
+    store = get_job_store()
+    last_version = -1
+    last_sent = time.monotonic()
+    
+    while True:
+        version = store.get_version(job_id)
+        if version != last_version:
+            last_version = version
+            last_sent = time.monotonic()
+            status = store.get(job_id)
+            yield status
+            if status.get("status") in ("completed", "failed"):
+                return
+        elif time.monotonic() - last_sent >= heartbeat:
+            last_sent = time.monotonic()
+            yield None
+        
+        await asyncio.sleep(interval)
+
+def list_jobs(collection_name: Optional[str] = None,
+              status: Optional[str] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    List jobs, newest first
     
-    return processing_status[job_id]
+    Args:
+        collection_name: Only return jobs for this collection
+        status: Only return jobs with this status
+        limit: Maximum number of jobs to return
+        
+    Returns:
+        List of status dictionaries including job_id and job_type
+    """
+    return get_job_store().list(collection_name=collection_name, status=status, limit=limit)
 
 def update_status(job_id: str, 
                  stage: Optional[str] = None, 
                  files_processed: Optional[int] = None, 
                  progress: Optional[int] = None, 
                  error: Optional[str] = None,
-                 status: Optional[str] = None) -> None:
+                 status: Optional[str] = None,
+                 errors: Optional[List[str]] = None,
+                 extra_details: Optional[Dict[str, Any]] = None) -> None:
     """
     Update the status of a job
     
@@ -70,40 +135,45 @@ def update_status(job_id: str,
         progress: Progress percentage (0-100)
         error: Error message to append
         status: Overall status (processing, completed, failed)
+        errors: Several error messages to append at once
+        extra_details: Additional entries merged into the job details
     """
-    if job_id not in processing_status:
-        raise KeyError(f"Job ID {job_id} not found")
-    
-    job_status = processing_status[job_id]
-    
-    if stage:
-        if "details" not in job_status:
-            job_status["details"] = {}
-        job_status["details"]["current_stage"] = stage
-        job_status["message"] = stage
-    
-    if files_processed is not None:
-        if "details" not in job_status:
-            job_status["details"] = {}
-        job_status["details"]["files_processed"] = files_processed
+    new_errors = ([error] if error else []) + (errors or [])
     
-    if progress is not None:
-        if "details" not in job_status:
-            job_status["details"] = {}
-        job_status["details"]["progress_percentage"] = progress
-    
-    if error:
-        if "details" not in job_status:
-            job_status["details"] = {"errors": []}
-        elif "errors" not in job_status["details"]:
-            job_status["details"]["errors"] = []
+    def mutate(job_status: Dict[str, Any]) -> Dict[str, Any]:
+        if stage:
+            if "details" not in job_status:
+                job_status["details"] = {}
+            job_status["details"]["current_stage"] = stage
+            job_status["message"] = stage
         
-        job_status["details"]["errors"].append(error)
-    
-    if status:
-        job_status["status"] = status
+        if files_processed is not None:
+            if "details" not in job_status:
+                job_status["details"] = {}
+            job_status["details"]["files_processed"] = files_processed
+        
+        if progress is not None:
+            if "details" not in job_status:
+                job_status["details"] = {}
+            job_status["details"]["progress_percentage"] = progress
+        
+        if new_errors:
+            if "details" not in job_status:
+                job_status["details"] = {"errors": []}
+            elif "errors" not in job_status["details"]:
+                job_status["details"]["errors"] = []
+            
+            job_status["details"]["errors"].extend(new_errors)
+        
+        if extra_details:
+            job_status.setdefault("details", {}).update(extra_details)
+        
+        if status:
+            job_status["status"] = status
+        
+        return job_status
     
-    processing_status[job_id] = job_status
+    get_job_store().update(job_id, mutate)
 
 def complete_job(job_id: str, message: str, processed_files: int) -> None:
     """
@@ -114,23 +184,21 @@ def complete_job(job_id: str, message: str, processed_files: int) -> None:
         message: Completion message
         processed_files: Number of files processed
     """
-    if job_id not in processing_status:
-        raise KeyError(f"Job ID {job_id} not found")
-    
-    job_status = processing_status[job_id]
-    collection_name = job_status.get("collection_name", "")
-    
-    processing_status[job_id] = {
-        "status": "completed",
-        "message": message,
-        "collection_name": collection_name,
-        "details": {
-            "files_processed": processed_files,
-            "current_stage": "Completed",
-            "progress_percentage": 100,
-            "errors": job_status.get("details", {}).get("errors", [])
+    def mutate(job_status: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "completed",
+            "message": message,
+            "collection_name": job_status.get("collection_name", ""),
+            "details": {
+                **job_status.get("details", {}),
+                "files_processed": processed_files,
+                "current_stage": "Completed",
+                "progress_percentage": 100,
+                "errors": job_status.get("details", {}).get("errors", [])
+            }
         }
-    }
+    
+    get_job_store().update(job_id, mutate)
 
 def fail_job(job_id: str, error_message: str) -> None:
     """
@@ -140,23 +208,158 @@ def fail_job(job_id: str, error_message: str) -> None:
         job_id: The ID of the job
         error_message: Error message
     """
-    if job_id not in processing_status:
-        raise KeyError(f"Job ID {job_id} not found")
+    def mutate(job_status: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": "failed",
+            "message": f"Processing failed: {error_message}",
+            "collection_name": job_status.get("collection_name", ""),
+            "details": {
+                **job_status.get("details", {}),
+                "files_processed": job_status.get("details", {}).get("files_processed", 0),
+                "current_stage": "Failed",
+                "progress_percentage": 0,
+                "errors": [error_message] + (
+                    job_status.get("details", {}).get("errors", [])
+                )
+            }
+        }
     
-    job_status = processing_status[job_id]
-    collection_name = job_status.get("collection_name", "")
-    processed = job_status.get("details", {}).get("files_processed", 0)
+    get_job_store().update(job_id, mutate)
+
+def stage_label(stage: str) -> str:
+    """Turn a stage message such as "Reading archive..." into a metric label"""
+    return stage.strip().rstrip(".").lower()
+
+class ProgressReporter:
+    """
+    Coalesces per-file progress of a job into a few status writes
     
-    processing_status[job_id] = {
-        "status": "failed",
-        "message": f"Processing failed: {error_message}",
-        "collection_name": collection_name,
-        "details": {
-            "files_processed": processed,
-            "current_stage": "Failed",
-            "progress_percentage": 0,
-            "errors": [error_message] + (
-                job_status.get("details", {}).get("errors", [])
-            )
-        }
-    } 
\ No newline at end of file
+    File counts and progress are written at most every min_interval seconds
+    or every min_files files. Stage changes, errors, completion and failure
+    are always written immediately so nothing important is delayed. The
+    duration of each stage is recorded in the ingest stage histogram and
+    in the job details once the job ends.
+    """
+    
+    def __init__(self,
+                 job_id: str,
+                 min_interval: float = PROGRESS_MIN_INTERVAL,
+                 min_files: int = PROGRESS_MIN_FILES,
+                 job_type: str = "unknown"):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.min_interval = min_interval
+        self.min_files = min_files
+        self.writes = 0
+        
+        self._pending: Dict[str, Any] = {}
+        self._errors: List[str] = []
+        self._last_write = 0.0
+        self._last_files = 0
+        self.stage_durations: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._stage_started = 0.0
+        self._lock = threading.Lock()
+    
+    def stage(self, stage: str, progress: Optional[int] = None, files_processed: Optional[int] = None) -> None:
+        """Switch to a new stage and write it immediately"""
+        with self._lock:
+            self._end_stage()
+            self._stage = stage_label(stage)
+            self._stage_started = time.perf_counter()
+            self._pending["stage"] = stage
+            if progress is not None:
+                self._pending["progress"] = progress
+            if files_processed is not None:
+                self._pending["files_processed"] = files_processed
+            self._flush()
+    
+    def advance(self,
+                files_processed: Optional[int] = None,
+                progress: Optional[int] = None,
+                label: Optional[str] = None) -> None:
+        """
+        Record progress within the current stage
+        
+        Args:
+            files_processed: Number of files processed so far
+            progress: Progress percentage (0-100)
+            label: Optional stage text, e.g. "Processing file 10 of 200"
+        """
+        with self._lock:
+            if files_processed is not None:
+                self._pending["files_processed"] = files_processed
+            if progress is not None:
+                self._pending["progress"] = progress
+            if label is not None:
+                self._pending["stage"] = label
+            
+            files = self._pending.get("files_processed", self._last_files)
+            if (time.monotonic() - self._last_write >= self.min_interval
+                    or files - self._last_files >= self.min_files):
+                self._flush()
+    
+    def details(self, **entries: Any) -> None:
+        """Attach extra entries to the job details and write them immediately"""
+        with self._lock:
+            self._pending.setdefault("extra_details", {}).update(entries)
+            self._flush()
+    
+    def error(self, message: str) -> None:
+        """Append an error message and write it immediately"""
+        with self._lock:
+            self._errors.append(message)
+            self._flush()
+    
+    def flush(self) -> None:
+        """Write any pending progress"""
+        with self._lock:
+            self._flush()
+    
+    def complete(self, message: str, processed_files: int) -> None:
+        """Write pending updates and mark the job as completed"""
+        self._end_job()
+        complete_job(job_id=self.job_id, message=message, processed_files=processed_files)
+        self._finish("completed")
+    
+    def fail(self, error_message: str) -> None:
+        """Write pending updates and mark the job as failed"""
+        self._end_job()
+        fail_job(job_id=self.job_id, error_message=error_message)
+        self._finish("failed")
+    
+    def _end_stage(self) -> None:
+        if self._stage is not None:
+            seconds = time.perf_counter() - self._stage_started
+            JOB_STAGE_DURATION.labels(self.job_type, self._stage).observe(seconds)
+            self.stage_durations[self._stage] = round(self.stage_durations.get(self._stage, 0.0) + seconds, 3)
+            self._stage = None
+    
+    def _end_job(self) -> None:
+        with self._lock:
+            self._end_stage()
+            if self.stage_durations:
+                self._pending.setdefault("extra_details", {})["stage_durations"] = dict(self.stage_durations)
+            self._flush()
+    
+    def _finish(self, status: str) -> None:
+        JOBS_FINISHED.labels(self.job_type, status).inc()
+        # Jobs run in worker processes, make their metrics visible right away
+        registry.flush()
+    
+    def _flush(self) -> None:
+        if not self._pending and not self._errors:
+            return
+        update_status(
+            self.job_id,
+            stage=self._pending.get("stage"),
+            files_processed=self._pending.get("files_processed"),
+            progress=self._pending.get("progress"),
+            errors=self._errors,
+            extra_details=self._pending.get("extra_details")
+        )
+        self.writes += 1
+        self._last_write = time.monotonic()
+        self._last_files = self._pending.get("files_processed", self._last_files)
+        self._pending = {}
+        self._errors = []
\ No newline at end of file
@@ -0,0 +1,307 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.llm_service import get_llm
+from app.services.query_cache import get_query_cache
+from app.services.retrieval_service import RetrievalService
+
+# Number of chunks placed in the prompt
+QA_TOP_K = int(os.getenv("QA_TOP_K", 5))
+
+# Retrieval mode used for questions
+QA_SEARCH_MODE = os.getenv("QA_SEARCH_MODE", "hybrid")
+
+# Concurrent LLM generations for a batch of questions
+QA_BATCH_CONCURRENCY = int(os.getenv("QA_BATCH_CONCURRENCY", 4))
+
+# Largest batch accepted in one request
+QA_BATCH_MAX_QUESTIONS = int(os.getenv("QA_BATCH_MAX_QUESTIONS", 1000))
+
+PROMPT_TEMPLATE = """You are a helpful assistant answering questions about a codebase.
+Use the code context below to answer the question. If the context does not
+contain the answer, say so.
+
+{context}
+
+Question: {question}
+Answer:"""
+
+CONVERSATION_TEMPLATE = """You are a helpful coding assistant.
+
+Question: {question}
+Answer:"""
+
+LOG_PROMPT_TEMPLATE = """You are a helpful assistant analyzing application logs.
+The log templates below group similar lines, with wildcards for variable parts,
+and show how often and when they occurred. Use them to answer the question. If
+they do not contain the answer, say so.
+
+{context}
+
+Question: {question}
+Answer:"""
+
+def build_prompt(question: str, chunks: List[Dict[str, Any]], template: str = PROMPT_TEMPLATE) -> str:
+    """
+    Build the prompt for a question
+    
+    Args:
+        question: Question text
+        chunks: Retrieved chunks, best first
+        template: Prompt template with context and question fields
+        
+    Returns:
+        Prompt text
+    """
+    if not chunks:
+        return CONVERSATION_TEMPLATE.format(question=question)
+    
+    def header(metadata: Dict[str, Any]) -> str:
+        if "start_line" in metadata:
+            return f"File: {metadata.get('file_path')} (lines {metadata['start_line']}-{metadata.get('end_line')})"
+        return f"File: {metadata.get('file_path')}"
+    
+    context = "\n\n".join(
+        f"{header(chunk['metadata'])}\n{chunk['document']}"
+        for chunk in chunks
+    )
+    return template.format(context=context, question=question)
+
+def chunk_sources(chunks: List[Dict[str, Any]]) -> List[str]:
+    """Return the distinct files of the chunks, best first"""
+    return list(dict.fromkeys(chunk["metadata"].get("file_path") for chunk in chunks))
+
+class QAService:
+    """
+    Service for answering questions about indexed collections
+    """
+    
+    prompt_template = PROMPT_TEMPLATE
+    
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm()
+        self.retrieval = RetrievalService()
+        self.cache = get_query_cache()
+    
+    def retrieve(self, collection_name: str, question: str, k: int = QA_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Retrieve context chunks for a question, using the query cache
+        
+        Args:
+            collection_name: Name of the collection
+            question: Question text
+            k: Number of chunks
+            
+        Returns:
+            List of chunk dictionaries, best first
+        """
+        return self.retrieve_many(collection_name, [question], k)[0]
+    
+    def retrieve_many(self, collection_name: str, questions: List[str], k: int = QA_TOP_K) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve context chunks for several questions, using the query cache
+        
+        Questions missing from the cache are searched together in one
+        batched embedding and search pass.
+        
+        Args:
+            collection_name: Name of the collection
+            questions: Question texts
+            k: Number of chunks per question
+            
+        Returns:
+            One list of chunk dictionaries per question, best first
+        """
+        params = {"k": k, "mode": QA_SEARCH_MODE, "embedder": self._embedder_id()}
+        keys = [self.cache.key("retrieval", collection_name, question, params) for question in questions]
+        results: List[Optional[List[Dict[str, Any]]]] = [self.cache.get("retrieval", key) for key in keys]
+        
+        missing = [i for i, chunks in enumerate(results) if chunks is None]
+        if missing:
+            started = time.perf_counter()
+            found = self.retrieval.search_many(
+                collection_name, [questions[i] for i in missing], k=k, mode=QA_SEARCH_MODE
+            )
+            compute_ms = (time.perf_counter() - started) * 1000 / len(missing)
+            for i, chunks in zip(missing, found):
+                results[i] = chunks
+                self.cache.put(keys[i], chunks, compute_ms)
+        return results
+    
+    def answer_question(self, collection_name: str, question: str, k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Answer a question, using the query cache
+        
+        An empty collection name means general conversation without context.
+        
+        Args:
+            collection_name: Name of the collection, or "" for conversation
+            question: Question text
+            k: Number of context chunks
+            
+        Returns:
+            Dictionary with answer, sources and is_conversation
+        """
+        k = k or QA_TOP_K
+        key = self._answer_key(collection_name, question, k)
+        cached = self.cache.get("answer", key)
+        if cached is not None:
+            return cached
+        
+        started = time.perf_counter()
+        chunks = self.retrieve(collection_name, question, k) if collection_name else []
+        result = self._generate(collection_name, question, chunks)
+        self.cache.put(key, result, (time.perf_counter() - started) * 1000)
+        return result
+    
+    def stream_answer(self,
+                      collection_name: str,
+                      question: str,
+                      k: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Answer a question as a stream of events
+        
+        Emits a "sources" event as soon as retrieval finishes, a "token"
+        event per generated fragment and a final "done" event with the full
+        answer. Closing the iterator early stops generation, and only
+        complete answers are cached.
+        
+        Args:
+            collection_name: Name of the collection, or "" for conversation
+            question: Question text
+            k: Number of context chunks
+            
+        Returns:
+            Iterator of (event, payload) tuples
+        """
+        k = k or QA_TOP_K
+        key = self._answer_key(collection_name, question, k)
+        cached = self.cache.get("answer", key)
+        if cached is not None:
+            yield "sources", {"sources": cached["sources"], "is_conversation": cached["is_conversation"]}
+            yield "token", {"text": cached["answer"]}
+            yield "done", {**cached, "cached": True}
+            return
+        
+        started = time.perf_counter()
+        chunks = self.retrieve(collection_name, question, k) if collection_name else []
+        sources = chunk_sources(chunks)
+        is_conversation = not collection_name
+        yield "sources", {"sources": sources, "is_conversation": is_conversation}
+        
+        tokens: List[str] = []
+        stream = self.llm.stream(build_prompt(question, chunks, self.prompt_template))
+        try:
+            for token in stream:
+                tokens.append(token)
+                yield "token", {"text": token}
+        finally:
+            stream.close()
+        
+        result = {"answer": "".join(tokens), "sources": sources, "is_conversation": is_conversation}
+        self.cache.put(key, result, (time.perf_counter() - started) * 1000)
+        yield "done", {**result, "cached": False}
+    
+    def answer_batch(self,
+                     collection_name: str,
+                     questions: List[str],
+                     k: Optional[int] = None,
+                     concurrency: int = QA_BATCH_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+        """
+        Answer many questions about a collection
+        
+        Cached answers are returned first. The remaining questions share one
+        retrieval pass, then answers are generated at bounded concurrency and
+        yielded as each one completes, so results arrive out of order and
+        carry the index of their question.
+        
+        Args:
+            collection_name: Name of the collection, or "" for conversation
+            questions: Question texts
+            k: Number of context chunks per question
+            concurrency: Maximum concurrent LLM generations
+            
+        Returns:
+            Iterator of dictionaries with index, question, answer, sources,
+            is_conversation and, for failed questions, error
+        """
+        k = k or QA_TOP_K
+        keys = [self._answer_key(collection_name, question, k) for question in questions]
+        
+        pending = []
+        for index, (question, key) in enumerate(zip(questions, keys)):
+            cached = self.cache.get("answer", key)
+            if cached is not None:
+                yield {"index": index, "question": question, **cached}
+            else:
+                pending.append(index)
+        if not pending:
+            return
+        
+        started = time.perf_counter()
+        if collection_name:
+            contexts = self.retrieve_many(collection_name, [questions[i] for i in pending], k)
+        else:
+            contexts = [[] for _ in pending]
+        retrieval_ms = (time.perf_counter() - started) * 1000 / len(pending)
+        
+        def generate(index: int, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+            generation_started = time.perf_counter()
+            result = self._generate(collection_name, questions[index], chunks)
+            compute_ms = retrieval_ms + (time.perf_counter() - generation_started) * 1000
+            self.cache.put(keys[index], result, compute_ms)
+            return result
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {
+                executor.submit(generate, index, chunks): index
+                for index, chunks in zip(pending, contexts)
+            }
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        yield {"index": index, "question": questions[index], **future.result()}
+                    except Exception as e:
+                        yield {
+                            "index": index,
+                            "question": questions[index],
+                            "answer": "",
+                            "sources": [],
+                            "is_conversation": not collection_name,
+                            "error": str(e)
+                        }
+            finally:
+                # A consumer that stops early does not wait for queued generations
+                for future in futures:
+                    future.cancel()
+    
+    def _answer_key(self, collection_name: str, question: str, k: int) -> str:
+        params = {
+            "k": k,
+            "mode": QA_SEARCH_MODE,
+            "embedder": self._embedder_id(),
+            "prompt": hashlib.sha256(self.prompt_template.encode("utf-8")).hexdigest()[:16],
+            **self.llm.params()
+        }
+        return self.cache.key("answer", collection_name, question, params)
+    
+    def _generate(self, collection_name: str, question: str, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "answer": self.llm.generate(build_prompt(question, chunks, self.prompt_template)),
+            "sources": chunk_sources(chunks),
+            "is_conversation": not collection_name
+        }
+    
+    def _embedder_id(self) -> str:
+        return getattr(self.retrieval.code_indexer, "model_name", type(self.retrieval.code_indexer).__name__)
+
+class LogQAService(QAService):
+    """
+    Service for answering questions about indexed log files
+    """
+    
+    prompt_template = LOG_PROMPT_TEMPLATE
\ No newline at end of file
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.collection_registry import get_collection_registry
+
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", os.path.join(os.getcwd(), "data", "query_cache.db"))
+
+# Entries kept in the in-process LRU
+QUERY_CACHE_MEMORY_ENTRIES = int(os.getenv("QUERY_CACHE_MEMORY_ENTRIES", 1000))
+
+# Entries kept on disk before the least recently used are dropped
+QUERY_CACHE_DISK_ENTRIES = int(os.getenv("QUERY_CACHE_DISK_ENTRIES", 100000))
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question so trivial variations share a cache entry
+    
+    Only repeated and surrounding whitespace is ignored. Case is kept,
+    since identifiers like "Parser" and "parser" can name different symbols.
+    """
+    return re.sub(r"\s+", " ", question.strip())
+
+class QueryCache:
+    """
+    Two-level cache for retrieval results and final answers
+    
+    Keys include the collection version from the registry, so any ingest or
+    reindex that changes a collection makes its old entries unreachable
+    without an explicit purge. Hits are served from an in-process LRU first
+    and from a shared SQLite store second.
+    """
+    
+    def __init__(self,
+                 path: str = QUERY_CACHE_PATH,
+                 memory_entries: int = QUERY_CACHE_MEMORY_ENTRIES,
+                 disk_entries: int = QUERY_CACHE_DISK_ENTRIES):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "compute_ms REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+    
+    def key(self, kind: str, collection_name: str, question: str, params: Dict[str, Any]) -> str:
+        """
+        Build a cache key
+        
+        Args:
+            kind: "retrieval" or "answer"
+            collection_name: Name of the collection
+            question: Question as asked
+            params: Model and retrieval parameters that influence the result
+            
+        Returns:
+            Cache key
+        """
+        version = get_collection_registry().version(collection_name) if collection_name else 0
+        material = json.dumps(
+            [kind, collection_name, version, normalize_question(question), params],
+            sort_keys=True
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def _record(self, kind: str, outcome: str, saved_ms: float = 0.0) -> None:
+        stats = self._stats.setdefault(kind, {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "saved_ms": 0.0
+        })
+        stats[outcome] += 1
+        stats["saved_ms"] += saved_ms
+    
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Look up a cached value
+        
+        Args:
+            kind: "retrieval" or "answer", used for statistics
+            key: Cache key
+            
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._record(kind, "memory_hits", entry["compute_ms"])
+                return entry["value"]
+            
+            row = self._conn.execute(
+                "SELECT value, compute_ms FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._record(kind, "misses")
+                return None
+            
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            entry = {"value": json.loads(row[0]), "compute_ms": row[1]}
+            self._remember(key, entry)
+            self._record(kind, "disk_hits", row[1])
+            return entry["value"]
+    
+    def put(self, key: str, value: Any, compute_ms: float) -> None:
+        """
+        Store a value in both levels
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            compute_ms: Time it took to compute, reported as saved on later hits
+        """
+        with self._lock:
+            self._remember(key, {"value": value, "compute_ms": compute_ms})
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, compute_ms, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), compute_ms, time.time())
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.disk_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                )
+            self._conn.commit()
+    
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rates and latency saved per kind of entry"""
+        with self._lock:
+            result: Dict[str, Any] = {}
+            for kind, stats in self._stats.items():
+                hits = stats["memory_hits"] + stats["disk_hits"]
+                lookups = hits + stats["misses"]
+                result[kind] = {
+                    **stats,
+                    "hit_rate": hits / lookups if lookups else 0.0
+                }
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+                "kinds": result
+            }
+
+_query_cache: Optional[QueryCache] = None
+
+def get_query_cache() -> QueryCache:
+    """Return the process-wide query cache"""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryCache()
+    return _query_cache
\ No newline at end of file
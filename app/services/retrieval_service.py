@@ -0,0 +1,220 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from app.core.chunk_locations import ChunkLocations
+from app.core.embedders import create_code_indexer
+from app.core.lexical_index import LexicalIndex
+from app.core.symbol_index import SymbolIndex
+from app.core.sharding import open_vector_store
+
+# Constant of reciprocal rank fusion, larger values flatten rank differences
+RRF_K = int(os.getenv("RRF_K", 60))
+
+# Each side returns this many candidates per requested result before fusion
+CANDIDATE_MULTIPLIER = int(os.getenv("RETRIEVAL_CANDIDATE_MULTIPLIER", 3))
+
+SEARCH_MODES = ("hybrid", "vector", "lexical")
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+class RetrievalService:
+    """
+    Service for retrieving chunks of a collection
+    """
+    
+    def __init__(self):
+        self.code_indexer = create_code_indexer()
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query with the same model used for the chunks
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Query embedding
+        """
+        return self.code_indexer.embed_documents([query])[0]
+    
+    def symbol_chunks(self, collection_name: str, query: str, limit: int = 10) -> List[str]:
+        """
+        Find chunks defining identifiers mentioned in a query
+        
+        Args:
+            collection_name: Name of the collection
+            query: Query text
+            limit: Maximum number of chunk IDs
+            
+        Returns:
+            Chunk IDs of matching definitions
+        """
+        symbol_index = SymbolIndex(collection_name)
+        try:
+            chunk_ids: List[str] = []
+            for identifier in dict.fromkeys(_IDENTIFIER.findall(query)):
+                if len(identifier) < 3:
+                    continue
+                for definition in symbol_index.definitions(identifier, limit=3):
+                    chunk_ids.extend(definition["chunk_ids"][:1])
+            return list(dict.fromkeys(chunk_ids))[:limit]
+        finally:
+            symbol_index.close()
+    
+    def search(self,
+               collection_name: str,
+               query: str,
+               k: int = 5,
+               mode: str = "hybrid",
+               exact: bool = False,
+               nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search a collection
+        
+        Hybrid mode fuses BM25 and vector rankings with reciprocal rank
+        fusion, so exact identifiers and error strings found by the lexical
+        side rank well even when their embeddings are not close to the query.
+        Chunks defining symbols named in the query join the fusion as a
+        third ranking.
+        
+        Args:
+            collection_name: Name of the collection
+            query: Query text
+            k: Number of results
+            mode: One of hybrid, vector or lexical
+            exact: Scan all vectors even if the collection has an ANN index
+            nprobe: IVF lists scanned per query, defaults to the collection setting
+            
+        Returns:
+            List of chunk dictionaries with a score, best first
+        """
+        return self.search_many(collection_name, [query], k, mode, exact, nprobe)[0]
+    
+    def search_many(self,
+                    collection_name: str,
+                    queries: List[str],
+                    k: int = 5,
+                    mode: str = "hybrid",
+                    exact: bool = False,
+                    nprobe: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search a collection for several queries at once
+        
+        All queries are embedded in one batched call and scored against the
+        collection in a single matrix product.
+        
+        Args:
+            collection_name: Name of the collection
+            queries: Query texts
+            k: Number of results per query
+            mode: One of hybrid, vector or lexical
+            exact: Scan all vectors even if the collection has an ANN index
+            nprobe: IVF lists scanned per query, defaults to the collection setting
+            
+        Returns:
+            One list of chunk dictionaries with a score per query, best first
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if not queries:
+            return []
+        
+        return self._with_locations(collection_name, self._search_many(
+            collection_name, queries, k, mode, exact, nprobe
+        ))
+    
+    def _search_many(self,
+                     collection_name: str,
+                     queries: List[str],
+                     k: int,
+                     mode: str,
+                     exact: bool,
+                     nprobe: Optional[int]) -> List[List[Dict[str, Any]]]:
+        candidates = k * CANDIDATE_MULTIPLIER if mode == "hybrid" else k
+        
+        store = open_vector_store(collection_name)
+        try:
+            vector_hits: List[List[Dict[str, Any]]] = [[] for _ in queries]
+            if mode in ("hybrid", "vector"):
+                vector_hits = store.search_many(
+                    self.code_indexer.embed_documents(queries), candidates, exact=exact, nprobe=nprobe
+                )
+                if mode == "vector":
+                    return vector_hits
+            
+            lexical = LexicalIndex(collection_name)
+            try:
+                lexical_hits = [lexical.search(query, candidates) for query in queries]
+            finally:
+                lexical.close()
+            
+            if mode == "lexical":
+                return [self._with_scores(store, hits) for hits in lexical_hits]
+            
+            results = []
+            for query, query_vector_hits, query_lexical_hits in zip(queries, vector_hits, lexical_hits):
+                rankings = [
+                    [hit["id"] for hit in query_vector_hits],
+                    [chunk_id for chunk_id, _ in query_lexical_hits]
+                ]
+                # Definitions of identifiers named in the query are precise context
+                definition_hits = self.symbol_chunks(collection_name, query)
+                if definition_hits:
+                    rankings.append(definition_hits)
+                results.append(self._with_scores(store, reciprocal_rank_fusion(rankings)[:k]))
+            return results
+        finally:
+            store.close()
+    
+    def _with_locations(self, collection_name: str, results: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """
+        List every location of chunks shared by several files
+        
+        Shared chunks get a "locations" entry in their metadata. If the file
+        a chunk was first stored for no longer contains it, the metadata
+        points at a remaining location instead.
+        """
+        chunk_ids = [result["id"] for hits in results for result in hits]
+        if not chunk_ids:
+            return results
+        locations = ChunkLocations(collection_name)
+        try:
+            found = locations.locations(chunk_ids)
+        finally:
+            locations.close()
+        for hits in results:
+            for result in hits:
+                chunk_locations = found.get(result["id"])
+                if not chunk_locations:
+                    continue
+                metadata = result["metadata"]
+                if not any(location["file_path"] == metadata.get("file_path") for location in chunk_locations):
+                    metadata.update(chunk_locations[0])
+                if len(chunk_locations) > 1:
+                    metadata["locations"] = chunk_locations
+        return results
+    
+    def _with_scores(self, store, ranked: List[tuple[str, float]]) -> List[Dict[str, Any]]:
+        results = store.get([chunk_id for chunk_id, _ in ranked])
+        scores = dict(ranked)
+        for result in results:
+            result["score"] = scores[result["id"]]
+        return results
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[tuple[str, float]]:
+    """
+    Fuse several rankings of chunk IDs
+    
+    Args:
+        rankings: Ranked lists of chunk IDs, best first
+        k: RRF constant
+        
+    Returns:
+        List of (chunk_id, fused_score), best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
\ No newline at end of file
@@ -1,227 +1,282 @@
 import os
-import shutil
-from typing import List
+from typing import Dict, List, Optional
 
-from app.services.processing_service import update_status, complete_job, fail_job
+from app.services.processing_service import ProgressReporter
 from app.services.code_service import CodeService
+from app.services.log_service import LogService
+from app.core.archive_stream import open_archive
+from app.core.ingest_filter import SkippedFiles
 
-def process_zip_file(file_path: str, job_id: str, collection_name: str) -> None:
+def stage_seconds(pipeline) -> Dict[str, float]:
+    """Return the time an indexing pipeline spent in each stage, for the job details"""
+    return {stage: round(seconds, 3) for stage, seconds in pipeline.stage_seconds.items()}
+
+def process_archive_file(file_path: str, job_id: str, collection_name: str, job_type: str = "archive") -> None:
     """
-    Process a zip file in the background
+    Process an uploaded archive in the background
+    
+    Any format open_archive recognizes is accepted. Members are streamed
+    into the indexer in batches instead of extracting the archive first.
     
     Args:
-        file_path: Path to the zip file
+        file_path: Path to the archive
         job_id: Job ID
         collection_name: Collection name
+        job_type: Job type reported in metrics, e.g. zip for the zip upload endpoint
     """
     code_service = CodeService()
+    reporter = ProgressReporter(job_id, job_type=job_type)
+    skipped = SkippedFiles()
     processed = 0
     
     try:
-        # Extract and get file list
-        update_status(job_id, stage="Extracting files...", progress=10)
-        extract_path, file_list = code_service.process_zip(file_path)
-        total_files = len(file_list)
-        
-        if total_files == 0:
-            raise ValueError("No files found in ZIP archive")
-        
-        # Index files
-        update_status(job_id, stage="Processing files...", progress=30)
-        code_service.index_files(file_list, collection_name)
-        processed = total_files
+        # Listing the members checks the member count and size limits
+        reporter.stage("Reading archive...", progress=10)
+        with open_archive(file_path) as archive:
+            reporter.details(archive_format=archive.name)
+            total_files = 0
+            
+            def on_listed(count: int) -> None:
+                nonlocal total_files
+                total_files = count
+                if total_files == 0:
+                    raise ValueError("No files found in archive")
+                # Stream members into the indexer
+                reporter.stage("Processing files...", progress=30)
+            
+            def on_batch(indexed: int) -> None:
+                reporter.advance(
+                    files_processed=indexed,
+                    progress=30 + int(60 * (indexed / total_files))
+                )
+            
+            def on_error(member_name: str, error: str) -> None:
+                reporter.error(f"Warning: Skipped {member_name}: {error}")
+            
+            # Indexed members are kept as the sources for later reindexing
+            source_dir = os.path.join(os.getcwd(), "temp", collection_name)
+            processed = code_service.index_archive_streaming(
+                archive,
+                collection_name,
+                on_batch=on_batch,
+                on_skip=skipped.add,
+                on_error=on_error,
+                source_dir=source_dir,
+                on_listed=on_listed
+            )
         
         # Final cleanup
-        update_status(job_id, stage="Cleaning up...", files_processed=processed, progress=90)
-        code_service.cleanup()
+        reporter.stage("Cleaning up...", files_processed=processed, progress=90)
         os.remove(file_path)
+        code_service.register_collection(collection_name, source_root=source_dir)
         
         # Update final status
-        complete_job(
-            job_id=job_id,
+        reporter.details(
+            stage_seconds=stage_seconds(code_service.pipeline),
+            chunks=dict(code_service.pipeline.chunk_counts),
+            skipped=skipped.summary()
+        )
+        reporter.complete(
             message=f"Successfully processed {processed} files",
             processed_files=processed
         )
         
     except Exception as e:
-        fail_job(job_id=job_id, error_message=str(e))
+        reporter.fail(str(e))
         
         # Clean up on failure
         try:
-            code_service.cleanup()
             if os.path.exists(file_path):
                 os.remove(file_path)
         except Exception:
             pass
 
-def process_rar_file(file_path: str, job_id: str, collection_name: str) -> None:
+def process_github_repo(repo_url: str, job_id: str, collection_name: str) -> None:
     """
-    Process a rar file in the background
+    Process a GitHub repository in the background
+    
+    The checkout is kept under repos/<collection_name> so the collection
+    can be reindexed later.
     
     Args:
-        file_path: Path to the rar file
+        repo_url: URL of the GitHub repository
         job_id: Job ID
         collection_name: Collection name
     """
     code_service = CodeService()
+    reporter = ProgressReporter(job_id, job_type="github")
+    skipped = SkippedFiles()
     processed = 0
     
     try:
-        # Extract and get file list
-        update_status(job_id, stage="Extracting files...", progress=10)
-        extract_path, file_list = code_service.process_rar(file_path)
+        # Clone repository
+        reporter.stage("Cloning repository...", progress=10)
+        repo_path, file_list, fetch_stats = code_service.process_github(repo_url, collection_name)
+        reporter.details(clone=fetch_stats)
         total_files = len(file_list)
         
         if total_files == 0:
-            raise ValueError("No files found in RAR archive")
+            raise ValueError("No files found in repository")
         
-        # Index files
-        update_status(job_id, stage="Processing files...", progress=30)
-        code_service.index_files(file_list, collection_name)
-        processed = total_files
+        # Process files through the staged pipeline
+        reporter.stage("Scanning repository...", progress=30)
+        
+        def on_progress(indexed: int) -> None:
+            reporter.advance(
+                files_processed=indexed,
+                progress=30 + int(60 * (indexed / total_files)),
+                label=f"Processing file {min(indexed + 1, total_files)} of {total_files}"
+            )
+        
+        def on_error(file_path: str, error: str) -> None:
+            reporter.error(f"Warning: Failed to process {os.path.basename(file_path)}: {error}")
+        
+        indexed = code_service.index_files_tracked(
+            file_list,
+            collection_name,
+            root=repo_path,
+            on_progress=on_progress,
+            on_error=on_error,
+            on_skip=skipped.add
+        )
+        processed = len(indexed)
         
         # Final cleanup
-        update_status(job_id, stage="Cleaning up...", files_processed=processed, progress=90)
+        reporter.stage("Cleaning up...", files_processed=processed, progress=90)
         code_service.cleanup()
-        os.remove(file_path)
+        code_service.register_collection(collection_name, source_root=repo_path)
         
         # Update final status
-        complete_job(
-            job_id=job_id,
-            message=f"Successfully processed {processed} files",
+        reporter.details(
+            stage_seconds=stage_seconds(code_service.pipeline),
+            chunks=dict(code_service.pipeline.chunk_counts),
+            skipped=skipped.summary()
+        )
+        reporter.complete(
+            message=f"Successfully processed {processed} out of {total_files} files",
             processed_files=processed
         )
         
     except Exception as e:
-        fail_job(job_id=job_id, error_message=str(e))
+        reporter.fail(str(e))
         
-        # Clean up on failure
+        # Attempt cleanup
         try:
             code_service.cleanup()
-            if os.path.exists(file_path):
-                os.remove(file_path)
         except Exception:
             pass
 
-def process_github_repo(repo_url: str, job_id: str, collection_name: str) -> None:
+def process_code_files(file_paths: List[str], collection_name: str, job_id: str, shard: Optional[int] = None) -> None:
     """
-    Process a GitHub repository in the background
+    Incrementally reindex a collection from its source files
+    
+    Only added and changed files are re-chunked and re-embedded, chunks of
+    removed files are deleted from the collection.
     
     Args:
-        repo_url: URL of the GitHub repository
-        job_id: Job ID
+        file_paths: List of file paths to process
         collection_name: Collection name
+        job_id: Job ID
+        shard: Only reindex the files of this shard of a sharded collection
     """
     code_service = CodeService()
-    processed = 0
+    reporter = ProgressReporter(job_id, job_type="reindex")
+    skipped = SkippedFiles()
+    total_files = len(file_paths)
     
     try:
-        # Clone repository
-        update_status(job_id, stage="Cloning repository...", progress=10)
-        repo_path, file_list = code_service.process_github(repo_url)
-        total_files = len(file_list)
+        # Initialize
+        reporter.stage("Comparing files with the last index...", progress=5)
+        root = code_service.find_source_root(collection_name) or os.path.commonpath(
+            [os.path.dirname(path) for path in file_paths]
+        )
         
-        if total_files == 0:
-            raise ValueError("No files found in repository")
+        def on_progress(indexed: int) -> None:
+            reporter.advance(files_processed=indexed)
         
-        # Process files
-        update_status(job_id, stage="Scanning repository...", progress=30)
-        
-        processed = 0
-        for file_path in file_list:
-            try:
-                update_status(
-                    job_id=job_id,
-                    stage=f"Processing file {processed + 1} of {total_files}",
-                    files_processed=processed,
-                    progress=30 + int(60 * (processed / total_files))
-                )
-                code_service.index_files([file_path], collection_name)
-                processed += 1
-            except Exception as e:
-                update_status(
-                    job_id=job_id,
-                    stage=f"Processing file {processed + 1} of {total_files}",
-                    error=f"Warning: Failed to process {os.path.basename(file_path)}: {str(e)}"
-                )
-                continue
+        def on_error(file_path: str, error: str) -> None:
+            reporter.error(f"Warning: Failed to process {os.path.basename(file_path)}: {error}")
         
-        # Final cleanup
-        update_status(job_id, stage="Cleaning up...", files_processed=processed, progress=90)
-        code_service.cleanup()
+        changes = code_service.reindex_files(
+            file_paths,
+            collection_name,
+            root=root,
+            on_progress=on_progress,
+            on_error=on_error,
+            shard=shard,
+            on_skip=skipped.add
+        )
         
-        # Update final status
-        complete_job(
-            job_id=job_id,
-            message=f"Successfully processed {processed} out of {total_files} files",
-            processed_files=processed
+        # The registry records the source root, so later reindexes read the sources in place
+        code_service.register_collection(collection_name, source_root=root)
+        reindexed = len(changes["added"]) + len(changes["changed"])
+        
+        # Update completion status
+        reporter.details(
+            stage_seconds=stage_seconds(code_service.pipeline),
+            chunks=dict(code_service.pipeline.chunk_counts),
+            skipped=skipped.summary()
+        )
+        reporter.complete(
+            message=(
+                f"Successfully reindexed {total_files} files: "
+                f"{len(changes['added'])} added, {len(changes['changed'])} changed, "
+                f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged"
+            ),
+            processed_files=reindexed
         )
         
     except Exception as e:
-        fail_job(job_id=job_id, error_message=str(e))
-        
-        # Attempt cleanup
-        try:
-            code_service.cleanup()
-        except Exception:
-            pass
+        reporter.fail(str(e))
 
-def process_code_files(file_paths: List[str], collection_name: str, job_id: str) -> None:
+def process_log_file(file_path: str, job_id: str, collection_name: str) -> None:
     """
-    Process a list of code files for reindexing
+    Process a log file in the background
+    
+    Lines are collapsed into templates before embedding, so only one entry
+    per template is indexed.
     
     Args:
-        file_paths: List of file paths to process
-        collection_name: Collection name
+        file_path: Path to the log file
         job_id: Job ID
+        collection_name: Collection name
     """
-    code_service = CodeService()
-    total_files = len(file_paths)
+    log_service = LogService()
+    reporter = ProgressReporter(job_id, job_type="log")
     
     try:
-        # Initialize
-        update_status(job_id, stage="Initializing...", progress=5)
-        
-        # Create temp directory for the reindexed collection
-        temp_dir = os.path.join(os.getcwd(), "temp", collection_name)
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Copy files to the temp directory to make them available for future reindexing
-        for i, file_path in enumerate(file_paths):
-            progress = int(10 + (i / total_files) * 40)
-            update_status(
-                job_id=job_id,
-                stage=f"Copying file {i+1}/{total_files}",
-                files_processed=i,
-                progress=progress
+        reporter.stage("Mining log templates...", progress=10)
+        
+        def on_progress(lines: int, fraction: float) -> None:
+            reporter.advance(
+                progress=10 + int(70 * fraction),
+                label=f"Mining log templates ({lines} lines read)..."
             )
-            
-            try:
-                # Get the relative path part from the original file path
-                relative_path = os.path.basename(file_path)
-                target_path = os.path.join(temp_dir, relative_path)
-                
-                # Create directory if needed
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                
-                # Copy the file
-                shutil.copy2(file_path, target_path)
-            except Exception as e:
-                update_status(
-                    job_id=job_id,
-                    error=f"Warning: Failed to copy {os.path.basename(file_path)}: {str(e)}"
-                )
         
-        # Index the files
-        update_status(job_id, stage="Indexing files...", progress=50)
-        code_service.index_files(file_paths, collection_name)
+        result = log_service.index_log_file(file_path, collection_name, on_progress=on_progress)
         
-        # Update completion status
-        complete_job(
-            job_id=job_id,
-            message=f"Successfully reindexed {total_files} files",
-            processed_files=total_files
+        reporter.stage("Cleaning up...", progress=90)
+        os.remove(file_path)
+        CodeService().register_collection(collection_name, source_root=None)
+        
+        reporter.details(
+            lines=result["lines"],
+            templates=result["templates"],
+            evicted_templates=result["evicted_templates"],
+            analysis=result["analysis"],
+            stage_seconds=stage_seconds(log_service.pipeline)
+        )
+        reporter.complete(
+            message=f"Successfully indexed {result['lines']} log lines as {result['templates']} templates",
+            processed_files=1
         )
         
     except Exception as e:
-        fail_job(job_id=job_id, error_message=str(e)) 
\ No newline at end of file
+        reporter.fail(str(e))
+        
+        # Clean up on failure
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception:
+            pass
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Compare two benchmark result files
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10 --fail-on-regression
+
+Metrics ending in _per_s or qps are better when higher; metrics ending in
+_ms, _seconds or _mb are better when lower. Other metrics, such as counts,
+are listed but never flagged.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+HIGHER_IS_BETTER = ("_per_s", ".qps")
+LOWER_IS_BETTER = ("_ms", "_seconds", "_mb")
+
+# Changes below this absolute value are timer noise, not regressions
+NOISE_FLOOR = {"_ms": 0.05, "_seconds": 0.005, "_mb": 1.0}
+
+
+def direction(metric: str) -> int:
+    """Return 1 if higher values are better, -1 if lower values are better, 0 if neither"""
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER) and not metric.startswith("data."):
+        return -1
+    return 0
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare the metrics of two result documents
+
+    Args:
+        baseline: Result document of the reference run
+        candidate: Result document of the run being evaluated
+        threshold: Relative change in percent that counts as a regression or improvement
+
+    Returns:
+        One row per metric with baseline, candidate, change in percent and verdict
+    """
+    rows = []
+    base_metrics, new_metrics = baseline["metrics"], candidate["metrics"]
+    for metric in sorted(set(base_metrics) | set(new_metrics)):
+        base, new = base_metrics.get(metric), new_metrics.get(metric)
+        row = {"metric": metric, "baseline": base, "candidate": new, "change": None, "verdict": ""}
+        rows.append(row)
+        if base is None or new is None:
+            row["verdict"] = "missing"
+            continue
+        if base:
+            row["change"] = (new - base) / abs(base) * 100
+
+        sign = direction(metric)
+        if not sign or row["change"] is None:
+            continue
+        floor = next((value for suffix, value in NOISE_FLOOR.items() if metric.endswith(suffix)), 0.0)
+        if abs(new - base) <= floor:
+            continue
+        if row["change"] * sign <= -threshold:
+            row["verdict"] = "regression"
+        elif row["change"] * sign >= threshold:
+            row["verdict"] = "improvement"
+    return rows
+
+
+def _format(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", help="Results of the reference run")
+    parser.add_argument("candidate", help="Results of the run being evaluated")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Relative change in percent that is reported")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any metric regressed")
+    parser.add_argument("--all", action="store_true", help="List unchanged metrics too")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r") as f:
+        candidate = json.load(f)
+
+    if baseline.get("schema") != candidate.get("schema"):
+        print("Result files have different schema versions and cannot be compared", file=sys.stderr)
+        return 2
+    for section in ("params", "environment"):
+        differing = sorted(
+            key for key in set(baseline.get(section, {})) | set(candidate.get(section, {}))
+            if baseline.get(section, {}).get(key) != candidate.get(section, {}).get(key)
+        )
+        if differing:
+            print(f"Warning: {section} differ: {', '.join(differing)}", file=sys.stderr)
+
+    rows = compare(baseline, candidate, args.threshold)
+    shown = [row for row in rows if args.all or row["verdict"]]
+    width = max([len(row["metric"]) for row in shown] + [len("metric")])
+    print(f"{'metric':<{width}}  {'baseline':>12}  {'candidate':>12}  {'change':>8}  verdict")
+    for row in shown:
+        change = f"{row['change']:+.1f}%" if row["change"] is not None else "-"
+        print(f"{row['metric']:<{width}}  {_format(row['baseline']):>12}  "
+              f"{_format(row['candidate']):>12}  {change:>8}  {row['verdict']}")
+
+    regressions = [row for row in rows if row["verdict"] == "regression"]
+    print(f"\n{len(regressions)} regressions, "
+          f"{sum(row['verdict'] == 'improvement' for row in rows)} improvements "
+          f"at a {args.threshold:g}% threshold")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
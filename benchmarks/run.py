@@ -0,0 +1,487 @@
+"""
+Benchmark the ingest and query paths on synthetic data
+
+Usage:
+    python -m benchmarks.run --files 2000 --log-lines 200000 --output results.json
+
+Every scenario runs in a fresh process so its peak RSS is its own. Embeddings
+and answers come from the stub backends unless EMBEDDING_BACKEND or
+LLM_BACKEND are set, so results measure the pipeline rather than a model.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import LANGUAGES, generate_log, generate_queries, generate_repository, modify_files
+
+SCENARIOS = ("ingest", "reindex", "zip", "log", "query")
+
+# Results with a different schema version are not compared
+SCHEMA_VERSION = 1
+
+
+def percentiles(samples: List[float], prefix: str) -> Dict[str, float]:
+    """
+    Summarize latency samples in milliseconds
+
+    Args:
+        samples: Latencies in seconds
+        prefix: Metric name prefix
+
+    Returns:
+        Metrics for the count, p50, p95, p99 and max
+    """
+    if not samples:
+        return {f"{prefix}.count": 0}
+    values = np.asarray(samples) * 1000
+    return {
+        f"{prefix}.count": len(samples),
+        f"{prefix}.p50_ms": round(float(np.percentile(values, 50)), 3),
+        f"{prefix}.p95_ms": round(float(np.percentile(values, 95)), 3),
+        f"{prefix}.p99_ms": round(float(np.percentile(values, 99)), 3),
+        f"{prefix}.max_ms": round(float(values.max()), 3),
+    }
+
+
+def peak_rss() -> Dict[str, Optional[float]]:
+    """Return the peak resident set size of this process and its reaped children in MB"""
+    try:
+        import resource
+    except ImportError:
+        return {"peak_rss_mb": None, "children_peak_rss_mb": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        "children_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1),
+    }
+
+
+class StatusPoller:
+    """
+    Polls a job's status the way the frontend does and records each latency
+    """
+
+    def __init__(self, job_id: str, interval: float):
+        self.job_id = job_id
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        from app.services.processing_service import get_status
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            get_status(self.job_id)
+            self.samples.append(time.perf_counter() - started)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "StatusPoller":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _run_job(name: str, task: Callable[[str], None], collection_name: str, job_type: str,
+             poll_interval: float) -> Dict[str, Any]:
+    from app.services.processing_service import create_job, get_status
+
+    job_id, _ = create_job(collection_name, job_type)
+    started = time.perf_counter()
+    with StatusPoller(job_id, poll_interval) as poller:
+        task(job_id)
+    seconds = time.perf_counter() - started
+
+    status = get_status(job_id)
+    if status.get("status") != "completed":
+        raise RuntimeError(f"{name} job failed: {status.get('message')}")
+
+    details = status.get("details", {})
+    metrics = {f"{name}.seconds": round(seconds, 3)}
+    for stage, stage_seconds in (details.get("stage_seconds") or {}).items():
+        metrics[f"{name}.stage.{stage}_seconds"] = stage_seconds
+    metrics.update(percentiles(poller.samples, f"{name}.status_poll"))
+    return {"metrics": metrics, "details": details}
+
+
+def _throughput(name: str, seconds: float, files: int, size: int) -> Dict[str, float]:
+    return {
+        f"{name}.files_per_s": round(files / seconds, 1) if seconds else 0.0,
+        f"{name}.mb_per_s": round(size / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+    }
+
+
+def scenario_ingest(params: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, float]:
+    """Index the synthetic tree into an empty collection"""
+    from app.core.sharding import open_vector_store
+    from app.tasks.background_tasks import process_code_files
+
+    paths = data["repository"]["paths"]
+    result = _run_job(
+        "ingest",
+        lambda job_id: process_code_files(paths, "bench_code", job_id),
+        "bench_code", "code", params["poll_interval"]
+    )
+    metrics = result["metrics"]
+    metrics.update(_throughput("ingest", metrics["ingest.seconds"], len(paths), data["repository"]["bytes"]))
+
+    store = open_vector_store("bench_code")
+    try:
+        metrics["ingest.chunks"] = store.count()
+    finally:
+        store.close()
+    return metrics
+
+
+def scenario_reindex(params: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, float]:
+    """Reindex the collection without changes, then after changing a fraction of the files"""
+    from app.tasks.background_tasks import process_code_files
+
+    paths = data["repository"]["paths"]
+    metrics = _run_job(
+        "reindex_unchanged",
+        lambda job_id: process_code_files(paths, "bench_code", job_id),
+        "bench_code", "code", params["poll_interval"]
+    )["metrics"]
+
+    modified = modify_files(paths, params["change_rate"], seed=params["seed"])
+    metrics.update(_run_job(
+        "reindex_changed",
+        lambda job_id: process_code_files(paths, "bench_code", job_id),
+        "bench_code", "code", params["poll_interval"]
+    )["metrics"])
+    metrics["reindex_changed.files"] = len(modified)
+    return metrics
+
+
+def scenario_zip(params: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, float]:
+    """Index a zip archive of the synthetic tree, streamed from the archive"""
+    from app.tasks.background_tasks import process_archive_file
+
+    # The task deletes its upload, so it gets a copy
+    upload_path = os.path.join(params["workdir"], "upload.zip")
+    shutil.copyfile(data["archive"], upload_path)
+    metrics = _run_job(
+        "zip",
+        lambda job_id: process_archive_file(upload_path, job_id, "bench_zip"),
+        "bench_zip", "code", params["poll_interval"]
+    )["metrics"]
+    metrics.update(_throughput(
+        "zip", metrics["zip.seconds"], len(data["repository"]["paths"]), data["repository"]["bytes"]
+    ))
+    metrics["zip.archive_mb"] = round(os.path.getsize(data["archive"]) / (1024 * 1024), 2)
+    return metrics
+
+
+def scenario_log(params: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, float]:
+    """Mine and index the synthetic log file"""
+    from app.tasks.background_tasks import process_log_file
+
+    upload_path = os.path.join(params["workdir"], "upload.log")
+    shutil.copyfile(data["log"]["path"], upload_path)
+    result = _run_job(
+        "log",
+        lambda job_id: process_log_file(upload_path, job_id, "bench_logs"),
+        "bench_logs", "log", params["poll_interval"]
+    )
+    metrics = result["metrics"]
+    seconds = metrics["log.seconds"]
+    metrics["log.lines_per_s"] = round(data["log"]["lines"] / seconds, 1) if seconds else 0.0
+    metrics["log.mb_per_s"] = round(data["log"]["bytes"] / (1024 * 1024) / seconds, 2) if seconds else 0.0
+    metrics["log.templates"] = result["details"].get("templates", 0)
+    return metrics
+
+
+def scenario_query(params: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, float]:
+    """Search the ingested collection and answer questions with a cold and a warm cache"""
+    from app.services.qa_service import QAService
+    from app.services.retrieval_service import RetrievalService
+
+    queries = data["queries"]
+    warmup = queries[:min(5, len(queries))]
+    retrieval = RetrievalService()
+    metrics: Dict[str, float] = {}
+
+    for mode in ("hybrid", "vector", "lexical"):
+        for query in warmup:
+            retrieval.search("bench_code", query, k=params["k"], mode=mode)
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            retrieval.search("bench_code", query, k=params["k"], mode=mode)
+            samples.append(time.perf_counter() - started)
+        metrics.update(percentiles(samples, f"search.{mode}"))
+        metrics[f"search.{mode}.qps"] = round(len(samples) / sum(samples), 1) if samples else 0.0
+
+    started = time.perf_counter()
+    retrieval.search_many("bench_code", queries, k=params["k"])
+    seconds = time.perf_counter() - started
+    metrics["search.batch.queries_per_s"] = round(len(queries) / seconds, 1) if seconds else 0.0
+
+    qa = QAService()
+    for phase in ("cold", "warm"):
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            qa.answer_question("bench_code", query, k=params["k"])
+            samples.append(time.perf_counter() - started)
+        metrics.update(percentiles(samples, f"qa.{phase}"))
+    return metrics
+
+
+def _scenario_entry(name: str, params: Dict[str, Any], data: Dict[str, Any], connection) -> None:
+    try:
+        os.chdir(params["workdir"])
+        metrics = globals()[f"scenario_{name}"](params, data)
+        for key, value in peak_rss().items():
+            metrics[f"{name}.{key}"] = value
+        connection.send({"metrics": metrics})
+    except BaseException as e:
+        connection.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        connection.close()
+
+
+def run_isolated(name: str, params: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a scenario in a fresh process
+
+    Args:
+        name: Scenario name
+        params: Benchmark parameters
+        data: Paths and sizes of the generated data
+
+    Returns:
+        Metrics of the scenario
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_scenario_entry, args=(name, params, data, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": "scenario process exited without a result"}
+    process.join()
+    if "error" in result:
+        raise RuntimeError(f"Scenario {name} failed: {result['error']}")
+    return result["metrics"]
+
+
+def prepare_data(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate the synthetic tree, its archive, the log file and the queries"""
+    workdir = params["workdir"]
+    source_root = os.path.join(workdir, "source")
+    repository = generate_repository(
+        source_root,
+        files=params["files"],
+        languages=params["languages"],
+        duplication=params["duplication"],
+        functions_per_file=params["functions_per_file"],
+        seed=params["seed"]
+    )
+
+    archive = os.path.join(workdir, "source.zip")
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in repository["paths"]:
+            zf.write(path, os.path.relpath(path, source_root))
+
+    log = generate_log(
+        os.path.join(workdir, "app.log"),
+        lines=params["log_lines"],
+        templates=params["log_templates"],
+        seed=params["seed"]
+    )
+    log["path"] = os.path.join(workdir, "app.log")
+
+    return {
+        "repository": repository,
+        "archive": archive,
+        "log": log,
+        "queries": generate_queries(params["queries"], seed=params["seed"])
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def median_metrics(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the metrics of repeated runs into their per-metric median"""
+    combined = {}
+    for metric in runs[0]:
+        values = [metrics[metric] for metrics in runs if metrics.get(metric) is not None]
+        combined[metric] = round(float(np.median(values)), 3) if values else None
+    return combined
+
+
+def run_once(params: Dict[str, Any], scenarios: List[str]) -> Dict[str, Any]:
+    """
+    Generate data and run benchmark scenarios once
+
+    Args:
+        params: Benchmark parameters
+        scenarios: Scenario names, in SCENARIOS order
+
+    Returns:
+        Metrics of all scenarios
+    """
+    # Collections, caches and job state all live under the working directory
+    os.makedirs(params["workdir"], exist_ok=True)
+    os.chdir(params["workdir"])
+    data = prepare_data(params)
+
+    metrics: Dict[str, Any] = {
+        "data.files": data["repository"]["files"],
+        "data.mb": round(data["repository"]["bytes"] / (1024 * 1024), 2),
+        "data.duplicate_files": data["repository"]["duplicates"],
+        "data.log_lines": data["log"]["lines"],
+        "data.log_mb": round(data["log"]["bytes"] / (1024 * 1024), 2),
+    }
+    for name in scenarios:
+        print(f"Running {name}...", file=sys.stderr)
+        metrics.update(run_isolated(name, params, data))
+    return metrics
+
+
+def run(params: Dict[str, Any], scenarios: List[str], repeat: int = 1) -> Dict[str, Any]:
+    """
+    Run benchmark scenarios, repeated on fresh data to reduce noise
+
+    Args:
+        params: Benchmark parameters
+        scenarios: Scenario names, in SCENARIOS order
+        repeat: Number of runs, metrics are the median over the runs
+
+    Returns:
+        Result document with environment, parameters and metrics
+    """
+    runs = []
+    for attempt in range(repeat):
+        attempt_params = dict(params, workdir=os.path.join(params["workdir"], f"run-{attempt}"))
+        runs.append(run_once(attempt_params, scenarios))
+    metrics = median_metrics(runs)
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "label": params["label"],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedding_backend": os.environ["EMBEDDING_BACKEND"],
+            "llm_backend": os.environ["LLM_BACKEND"],
+        },
+        "params": dict({key: value for key, value in params.items() if key != "workdir"}, repeat=repeat),
+        "metrics": metrics
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest and query paths on synthetic data")
+    parser.add_argument("--files", type=int, default=1000, help="Files in the synthetic tree")
+    parser.add_argument("--languages", default=",".join(LANGUAGES),
+                        help=f"Comma-separated languages out of {', '.join(LANGUAGES)}")
+    parser.add_argument("--duplication", type=float, default=0.1,
+                        help="Fraction of files that copy another file")
+    parser.add_argument("--functions-per-file", type=int, default=8)
+    parser.add_argument("--change-rate", type=float, default=0.05,
+                        help="Fraction of files changed before the incremental reindex")
+    parser.add_argument("--log-lines", type=int, default=100000)
+    parser.add_argument("--log-templates", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--poll-interval", type=float, default=0.05,
+                        help="Seconds between status polls while a job runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs on fresh data, metrics are the median over the runs")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios out of {', '.join(SCENARIOS)}")
+    parser.add_argument("--label", default="", help="Name recorded in the results")
+    parser.add_argument("--workdir", help="Directory for generated data and collections, default is temporary")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory")
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    # Later scenarios query or reindex the collection built by ingest
+    if any(name in ("reindex", "query") for name in scenarios) and "ingest" not in scenarios:
+        scenarios.insert(0, "ingest")
+    scenarios = [name for name in SCENARIOS if name in scenarios]
+
+    os.environ.setdefault("EMBEDDING_BACKEND", "stub")
+    os.environ.setdefault("LLM_BACKEND", "stub")
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="cqe-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    params = {
+        "label": args.label,
+        "files": args.files,
+        "languages": [language for language in args.languages.split(",") if language],
+        "duplication": args.duplication,
+        "functions_per_file": args.functions_per_file,
+        "change_rate": args.change_rate,
+        "log_lines": args.log_lines,
+        "log_templates": args.log_templates,
+        "queries": args.queries,
+        "k": args.k,
+        "poll_interval": args.poll_interval,
+        "seed": args.seed,
+        "scenarios": scenarios,
+        "workdir": workdir,
+    }
+
+    cwd = os.getcwd()
+    try:
+        results = run(params, scenarios, max(1, args.repeat))
+    finally:
+        os.chdir(cwd)
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    document = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as f:
+            f.write(document + "\n")
+        print(f"Results written to {output}", file=sys.stderr)
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+VERBS = ["load", "parse", "build", "fetch", "render", "validate", "merge", "encode", "decode",
+         "resolve", "schedule", "compute", "flush", "index", "normalize", "dispatch", "refresh"]
+NOUNS = ["config", "session", "user", "order", "invoice", "token", "payload", "cache", "report",
+         "record", "message", "account", "document", "template", "request", "metric", "queue"]
+PACKAGES = ["api", "core", "services", "models", "utils", "workers", "storage", "auth", "billing"]
+
+
+def _python(name: str, noun: str, body: List[str]) -> str:
+    lines = [f"def {name}({noun}, options=None):", f'    """{name.replace("_", " ").capitalize()}"""']
+    lines += [f"    {line}" for line in body]
+    return "\n".join(lines + [f"    return {noun}", ""])
+
+
+def _javascript(name: str, noun: str, body: List[str]) -> str:
+    lines = [f"export function {_camel(name)}({noun}, options = {{}}) {{"]
+    lines += [f"  {line};" for line in body]
+    return "\n".join(lines + [f"  return {noun};", "}", ""])
+
+
+def _typescript(name: str, noun: str, body: List[str]) -> str:
+    lines = [f"export function {_camel(name)}({noun}: any, options: Record<string, any> = {{}}): any {{"]
+    lines += [f"  {line};" for line in body]
+    return "\n".join(lines + [f"  return {noun};", "}", ""])
+
+
+def _go(name: str, noun: str, body: List[str]) -> str:
+    lines = [f"func {_camel(name, upper=True)}({noun} interface{{}}, options map[string]interface{{}}) interface{{}} {{"]
+    lines += [f"\t{line}" for line in body]
+    return "\n".join(lines + [f"\treturn {noun}", "}", ""])
+
+
+def _java(name: str, noun: str, body: List[str]) -> str:
+    lines = [f"    public static Object {_camel(name)}(Object {noun}, Map<String, Object> options) {{"]
+    lines += [f"        {line};" for line in body]
+    return "\n".join(lines + [f"        return {noun};", "    }", ""])
+
+
+def _camel(name: str, upper: bool = False) -> str:
+    parts = name.split("_")
+    head = parts[0].capitalize() if upper else parts[0]
+    return head + "".join(part.capitalize() for part in parts[1:])
+
+
+LANGUAGES = {
+    "python": (".py", _python),
+    "javascript": (".js", _javascript),
+    "typescript": (".ts", _typescript),
+    "go": (".go", _go),
+    "java": (".java", _java),
+}
+
+
+def _statement(language: str, target: str, call: str, arguments: str) -> str:
+    if language in ("python", "go"):
+        return f"{target} = {call}({arguments})"
+    declaration = "Object" if language == "java" else "const"
+    return f"{declaration} {_camel(target)} = {_camel(call)}({arguments})"
+
+
+def _source_file(rng: random.Random, language: str, functions: int, lines_per_function: int) -> str:
+    render = LANGUAGES[language][1]
+    parts = []
+    for _ in range(functions):
+        verb, noun = rng.choice(VERBS), rng.choice(NOUNS)
+        name = f"{verb}_{noun}_{rng.randrange(1000)}"
+        body = [
+            _statement(language, f"{rng.choice(NOUNS)}_{i}", f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}",
+                       f"{noun}, {rng.randrange(100)}")
+            for i in range(lines_per_function)
+        ]
+        parts.append(render(name, noun, body))
+
+    source = "\n".join(parts)
+    if language == "go":
+        return "package main\n\n" + source
+    if language == "java":
+        return "import java.util.Map;\n\npublic class Generated {\n" + source + "}\n"
+    return source
+
+
+def generate_repository(root: str,
+                        files: int = 1000,
+                        languages: Optional[List[str]] = None,
+                        duplication: float = 0.1,
+                        functions_per_file: int = 8,
+                        lines_per_function: int = 6,
+                        seed: int = 0) -> Dict[str, Any]:
+    """
+    Write a synthetic source tree
+
+    Args:
+        root: Directory to write the tree to
+        files: Number of files
+        languages: Languages to mix, see LANGUAGES
+        duplication: Fraction of files that are copies of an earlier file
+        functions_per_file: Functions per generated file
+        lines_per_function: Statements per generated function
+        seed: Random seed, the same arguments always produce the same tree
+
+    Returns:
+        Dictionary with files, bytes, duplicates and the file paths
+    """
+    languages = languages or list(LANGUAGES)
+    unknown = [language for language in languages if language not in LANGUAGES]
+    if unknown:
+        raise ValueError(f"Unknown languages: {', '.join(unknown)}")
+
+    rng = random.Random(seed)
+    paths: List[str] = []
+    contents: List[str] = []
+    duplicates = 0
+    total_bytes = 0
+    for i in range(files):
+        language = languages[i % len(languages)]
+        extension = LANGUAGES[language][0]
+        directory = os.path.join(root, rng.choice(PACKAGES), rng.choice(PACKAGES))
+        path = os.path.join(directory, f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}_{i}{extension}")
+
+        if contents and rng.random() < duplication:
+            # Vendored copies and generated files repeat earlier content verbatim
+            content = contents[rng.randrange(len(contents))]
+            duplicates += 1
+        else:
+            content = _source_file(rng, language, functions_per_file, lines_per_function)
+            contents.append(content)
+
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        paths.append(path)
+        total_bytes += len(content.encode("utf-8"))
+
+    return {"files": files, "bytes": total_bytes, "duplicates": duplicates, "paths": paths}
+
+
+def modify_files(paths: List[str], fraction: float, seed: int = 0) -> List[str]:
+    """
+    Append a line to a fraction of the files, to benchmark incremental reindexing
+
+    Returns:
+        Paths of the modified files
+    """
+    rng = random.Random(seed)
+    modified = rng.sample(paths, max(1, int(len(paths) * fraction))) if paths else []
+    for path in modified:
+        with open(path, "a", encoding="utf-8") as f:
+            comment = "#" if path.endswith(".py") else "//"
+            f.write(f"\n{comment} revision {rng.randrange(1 << 30)}\n")
+    return modified
+
+
+LOG_MESSAGES = [
+    "INFO Request {method} {path} completed with status {status} in {duration}ms",
+    "INFO User {user} logged in from {ip}",
+    "DEBUG Cache lookup for key {hex} returned {count} entries",
+    "INFO Job {uuid} scheduled on worker {worker}",
+    "WARN Slow query on table {table} took {duration}ms",
+    "ERROR Failed to connect to {ip}:{port}: connection refused",
+    "ERROR Timeout after {duration}ms waiting for {table} lock held by {uuid}",
+    "INFO Flushed {count} records to {table} in {duration}ms",
+    "WARN Retrying request {uuid} attempt {count}",
+    "FATAL Out of memory allocating {count} bytes in worker {worker}",
+]
+
+
+def _log_message(rng: random.Random, template: str) -> str:
+    return template.format(
+        method=rng.choice(["GET", "POST", "PUT", "DELETE"]),
+        path=f"/{rng.choice(PACKAGES)}/{rng.choice(NOUNS)}",
+        status=rng.choice([200, 200, 200, 201, 404, 500]),
+        duration=rng.randrange(1, 5000),
+        user=f"user{rng.randrange(10000)}",
+        ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+        port=rng.randrange(1024, 65536),
+        hex=f"{rng.getrandbits(64):016x}",
+        count=rng.randrange(1, 100000),
+        uuid=uuid.UUID(int=rng.getrandbits(128)),
+        worker=rng.randrange(64),
+        table=rng.choice(NOUNS)
+    )
+
+
+def generate_log(path: str,
+                 lines: int = 100000,
+                 templates: int = 50,
+                 error_rate: float = 0.02,
+                 seed: int = 0) -> Dict[str, Any]:
+    """
+    Write a synthetic log file with timestamps and a known number of message templates
+
+    Args:
+        path: Path of the log file
+        lines: Number of lines
+        templates: Number of distinct message templates
+        error_rate: Fraction of lines using an error template
+        seed: Random seed
+
+    Returns:
+        Dictionary with lines, bytes and templates
+    """
+    rng = random.Random(seed)
+    # Distinct templates are the base messages with a component prefix
+    formats = [
+        f"[{PACKAGES[i % len(PACKAGES)]}-{i // len(LOG_MESSAGES)}] {LOG_MESSAGES[i % len(LOG_MESSAGES)]}"
+        for i in range(templates)
+    ]
+    errors = [fmt for fmt in formats if " ERROR " in fmt or " FATAL " in fmt]
+    regular = [fmt for fmt in formats if fmt not in errors] or formats
+
+    timestamp = datetime(2024, 1, 1)
+    total_bytes = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(lines):
+            timestamp += timedelta(milliseconds=rng.randrange(1, 200))
+            pool = errors if errors and rng.random() < error_rate else regular
+            line = f"{timestamp:%Y-%m-%d %H:%M:%S},{timestamp.microsecond // 1000:03d} {_log_message(rng, rng.choice(pool))}\n"
+            f.write(line)
+            total_bytes += len(line)
+    return {"lines": lines, "bytes": total_bytes, "templates": templates}
+
+
+def generate_queries(count: int = 100, seed: int = 0) -> List[str]:
+    """
+    Generate questions mixing natural language with identifiers of the synthetic tree
+
+    Returns:
+        Questions
+    """
+    rng = random.Random(seed)
+    shapes = [
+        "How does {verb}_{noun} work?",
+        "Where is the {noun} {verb}ed?",
+        "What calls {verb}_{noun} with options?",
+        "Explain how {noun} is passed to {verb}{Noun}",
+        "Which module handles {noun} {other}?",
+    ]
+    # Distinct questions, so a cold cache is never hit by a repeat
+    questions: Dict[str, None] = {}
+    for _ in range(count * 20):
+        if len(questions) >= count:
+            break
+        noun = rng.choice(NOUNS)
+        questions[rng.choice(shapes).format(
+            verb=rng.choice(VERBS), noun=noun, Noun=noun.capitalize(), other=rng.choice(NOUNS)
+        )] = None
+    return list(questions)
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+# Point every data path at a scratch directory before the app modules read their settings
+_DATA_DIR = tempfile.mkdtemp(prefix="codebase-query-tests-")
+for name, relative in (
+    ("COLLECTIONS_DIR", "collections"),
+    ("COLLECTION_REGISTRY_PATH", "registry.db"),
+    ("EMBEDDING_CACHE_PATH", "embedding_cache.db"),
+    ("QUERY_CACHE_PATH", "query_cache.db"),
+    ("JOB_STORE_PATH", "jobs.db"),
+    ("PROFILE_DIR", "profiles"),
+    ("METRICS_DIR", "metrics"),
+    ("MIRROR_CACHE_DIR", "mirrors"),
+    ("CHECKOUT_DIR", "repos"),
+):
+    os.environ.setdefault(name, os.path.join(_DATA_DIR, relative))
+os.environ.setdefault("EMBEDDING_BACKEND", "stub")
+os.environ.setdefault("LLM_BACKEND", "stub")
+
+# Uploaded sources are kept under temp/ in the working directory, keep them out of the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(_DATA_DIR)
@@ -0,0 +1,139 @@
+import io
+import json
+import os
+import time
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.job_scheduler import get_scheduler
+
+SOURCES = {
+    "repo/app/parser.py": "def parse_request(text):\n    return text.split()\n",
+    "repo/app/handler.py": "from app.parser import parse_request\n\n\ndef handle(text):\n    return parse_request(text)\n",
+    "repo/README.md": "# Sample\n\nParses requests.\n",
+}
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _wait(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/api/code/status/{job_id}").json()
+        if status["status"] != "processing":
+            return status
+        time.sleep(0.1)
+    raise AssertionError(f"Job {job_id} did not finish: {status}")
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def uploaded(client):
+    response = client.post(
+        "/api/code/upload/archive",
+        files={"file": ("sample.zip", _zip(SOURCES), "application/zip")},
+        data={"project_name": "api_sample", "profile": "true"}
+    )
+    assert response.status_code == 200, response.text
+    job_id = response.json()["job_id"]
+    status = _wait(client, job_id)
+    assert status["status"] == "completed", status
+    return job_id
+
+
+def test_upload_archive_indexes_the_members(client, uploaded):
+    status = client.get(f"/api/code/status/{uploaded}").json()
+    assert status["collection_name"] == "api_sample"
+    assert status["details"]["archive_format"] == "zip"
+
+    info = client.get("/api/code/collections/api_sample").json()
+    assert info["file_count"] == len(SOURCES)
+
+
+def test_upload_rejected_with_retry_after_when_queue_is_full(client, monkeypatch):
+    monkeypatch.setattr(get_scheduler(), "max_queued", 0)
+    response = client.post(
+        "/api/code/upload/archive",
+        files={"file": ("sample.zip", _zip(SOURCES), "application/zip")}
+    )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_status_events_end_with_the_result(client, uploaded):
+    with client.stream("GET", f"/api/code/status/{uploaded}/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    assert "event: result" in body
+    payload = json.loads(body.split("data: ", 1)[1].split("\n", 1)[0])
+    assert payload["status"] == "completed"
+
+
+def test_status_websocket_sends_the_final_status(client, uploaded):
+    with client.websocket_connect(f"/api/code/status/{uploaded}/ws") as websocket:
+        status = websocket.receive_json()
+    assert status["job_id"] == uploaded
+    assert status["status"] == "completed"
+
+
+def test_job_profile_summary(client, uploaded):
+    # The profile is written once the task function returns, just after the job completes
+    deadline = time.monotonic() + 10
+    response = client.get(f"/api/code/jobs/{uploaded}/profile")
+    while response.status_code == 404 and time.monotonic() < deadline:
+        time.sleep(0.1)
+        response = client.get(f"/api/code/jobs/{uploaded}/profile")
+    assert response.status_code == 200, response.text
+    assert response.json()["job_id"] == uploaded
+    assert client.get(f"/api/code/jobs/{uploaded}/profile?format=bogus").status_code == 400
+    assert client.get("/api/code/jobs/unknown/profile").status_code == 404
+
+
+def test_question_stream_sends_tokens_then_done(client, uploaded):
+    with client.stream("POST", "/api/qa/question/stream",
+                       json={"collection_name": "api_sample", "question": "Where are requests parsed?"}) as response:
+        body = "".join(response.iter_text())
+    events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert events[0] == "sources"
+    assert "token" in events
+    assert events[-1] == "done"
+
+
+def test_batch_answers_every_question(client, uploaded):
+    questions = ["Where are requests parsed?", "What does handle do?", "What is in the README?"]
+    response = client.post("/api/qa/batch", json={"collection_name": "api_sample", "questions": questions})
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+
+
+def test_search_finds_the_uploaded_code(client, uploaded):
+    response = client.post("/api/code/search", json={"collection_name": "api_sample", "query": "parse_request"})
+    assert response.status_code == 200, response.text
+    assert response.json()["results"]
+
+
+@pytest.mark.parametrize("path,body", [
+    ("/api/code/search", {"query": "parse"}),
+    ("/api/qa/question", {"question": "Where are requests parsed?"}),
+    ("/api/qa/question/stream", {"question": "Where are requests parsed?"}),
+    ("/api/qa/batch", {"questions": ["Where are requests parsed?"]}),
+])
+def test_unknown_collection_is_not_found(client, path, body):
+    response = client.post(path, json={"collection_name": "missing_collection", **body})
+    assert response.status_code == 404
+    assert not os.path.exists(os.path.join(os.environ["COLLECTIONS_DIR"], "missing_collection"))
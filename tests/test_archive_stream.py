@@ -0,0 +1,113 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from app.core.archive_stream import ArchiveError, TarReader, open_archive
+from app.services.code_service import CodeService
+
+SOURCES = {
+    "repo/.gitignore": b"generated/\n",
+    "repo/app/main.py": b"def main():\n    return 1\n",
+    "repo/app/util.py": b"def helper(value):\n    return value * 2\n",
+    "repo/generated/schema.py": b"SCHEMA = {}\n",
+}
+
+
+def _tar(path, files, mode="w:gz"):
+    with tarfile.open(path, mode) as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return str(path)
+
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def test_tar_scan_lists_and_captures_in_one_pass(tmp_path, monkeypatch):
+    opened = []
+    stream = TarReader._stream
+    monkeypatch.setattr(TarReader, "_stream", lambda self: opened.append(1) or stream(self))
+
+    with open_archive(_tar(tmp_path / "repo.tar.gz", SOURCES)) as archive:
+        names, captured = archive.scan(lambda name: name.endswith(".gitignore"))
+        assert len(opened) == 1
+        assert sorted(names) == sorted(SOURCES)
+        assert captured == {"repo/.gitignore": b"generated/\n"}
+        # The member list is reused by the reading pass
+        assert dict(archive.iter_members())["repo/app/main.py"] == SOURCES["repo/app/main.py"]
+        assert len(opened) == 2
+
+
+def test_index_archive_decompresses_a_tar_twice(tmp_path, monkeypatch):
+    opened = []
+    stream = TarReader._stream
+    monkeypatch.setattr(TarReader, "_stream", lambda self: opened.append(1) or stream(self))
+    skipped = {}
+    listed = []
+
+    with open_archive(_tar(tmp_path / "repo.tar.gz", SOURCES)) as archive:
+        indexed = CodeService().index_archive_streaming(
+            archive, "tar_single_pass",
+            on_skip=lambda name, reason: skipped.setdefault(name, reason),
+            on_listed=listed.append
+        )
+
+    assert len(opened) == 2
+    assert listed == [len(SOURCES)]
+    assert indexed == len(SOURCES) - 1
+    assert "repo/generated/schema.py" in skipped
+
+
+def test_member_count_limit(tmp_path):
+    with open_archive(_tar(tmp_path / "repo.tar", SOURCES, mode="w"), max_members=3) as archive:
+        with pytest.raises(ArchiveError, match="more than 3 files"):
+            archive.names()
+
+
+def test_total_size_limit_is_checked_while_listing(tmp_path):
+    with open_archive(_tar(tmp_path / "repo.tar.gz", SOURCES), max_total_size=60) as archive:
+        with pytest.raises(ArchiveError, match="decompress to more than 60 bytes"):
+            archive.scan(lambda name: False)
+
+
+def test_total_size_limit_counts_decompressed_bytes(tmp_path):
+    path = _zip(tmp_path / "repo.zip", SOURCES)
+    with open_archive(path, max_total_size=60) as archive:
+        # As if the headers understated the sizes
+        archive._members = [(stored, name, 1, handle) for stored, name, _, handle in archive._listed()]
+        with pytest.raises(ArchiveError, match="decompressed to more than 60 bytes"):
+            list(archive.iter_members())
+
+
+def test_large_members_and_unsafe_names_are_skipped(tmp_path):
+    files = {**SOURCES, "../escape.py": b"x = 1\n", "repo/big.py": b"x" * 2000}
+    skipped = {}
+    with open_archive(_tar(tmp_path / "repo.tar.gz", files)) as archive:
+        members = dict(archive.iter_members(max_member_size=1000,
+                                            on_skip=lambda name, reason: skipped.setdefault(name, reason)))
+
+    assert "repo/big.py" not in members
+    assert skipped["repo/big.py"].startswith("too large")
+    assert skipped["../escape.py"] == "unsafe path"
+    assert set(members) == set(SOURCES)
+
+
+def test_zip_members_with_a_suspicious_ratio_are_skipped(tmp_path):
+    files = {**SOURCES, "repo/bomb.txt": b"\0" * (4 * 1024 * 1024)}
+    skipped = {}
+    with open_archive(_zip(tmp_path / "repo.zip", files)) as archive:
+        members = dict(archive.iter_members(max_member_size=8 * 1024 * 1024,
+                                            on_skip=lambda name, reason: skipped.setdefault(name, reason)))
+
+    assert skipped["repo/bomb.txt"].startswith("suspicious compression ratio")
+    assert set(members) == set(SOURCES)
+    assert os.path.getsize(tmp_path / "repo.zip") < 64 * 1024
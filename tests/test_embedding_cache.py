@@ -0,0 +1,64 @@
+import sqlite3
+
+import numpy as np
+
+from app.core.embedding_cache import EmbeddingCache
+
+DIMENSION = 8
+
+
+def _entries(start, count):
+    return {f"model:{i}": np.full(DIMENSION, i, dtype=np.float32).tolist() for i in range(start, start + count)}
+
+
+def _actual(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+
+
+def test_running_totals_follow_inserts_replaces_and_evictions(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache(path, max_bytes=100 * DIMENSION * 4)
+    cache.put_many(_entries(0, 60))
+    cache.put_many(_entries(30, 60))
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["size_bytes"]) == _actual(path) == (90, 90 * DIMENSION * 4)
+
+    cache.put_many(_entries(90, 20))
+    stats = cache.stats()
+    assert stats["evictions"] > 0
+    assert (stats["entries"], stats["size_bytes"]) == _actual(path)
+    assert stats["size_bytes"] <= 0.9 * cache.max_bytes
+    # The oldest entries went first
+    assert "model:0" not in cache.get_many(["model:0"])
+    assert "model:109" in cache.get_many(["model:109"])
+
+
+def test_lookups_of_fresh_entries_do_not_write(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    cache.put_many(_entries(0, 10))
+    changes = cache._conn.total_changes
+
+    assert len(cache.get_many([f"model:{i}" for i in range(20)])) == 10
+    assert len(cache.get_many(["model:missing"])) == 0
+    assert cache._conn.total_changes == changes
+    assert not cache._conn.in_transaction
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (10, 11)
+
+
+def test_totals_are_counted_for_caches_without_them(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+                     "size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        conn.execute("CREATE TABLE cache_stats (id INTEGER PRIMARY KEY CHECK (id = 0), hits INTEGER NOT NULL, "
+                     "misses INTEGER NOT NULL, evictions INTEGER NOT NULL)")
+        conn.execute("INSERT INTO cache_stats VALUES (0, 5, 7, 0)")
+        conn.executemany("INSERT INTO embeddings VALUES (?, ?, ?, 0)",
+                         [(f"model:{i}", b"\0" * 32, 32) for i in range(4)])
+
+    stats = EmbeddingCache(path).stats()
+    assert (stats["entries"], stats["size_bytes"], stats["hits"]) == (4, 128, 5)
@@ -0,0 +1,38 @@
+import socket
+import subprocess
+import sys
+import time
+
+from app.services.job_scheduler import JobScheduler
+from app.services.job_store import get_job_store
+from app.services.processing_service import create_job, get_status
+
+
+def test_jobs_of_an_exited_process_are_failed_at_startup():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    orphan_id, _ = create_job(job_type="archive")
+    live_id, _ = create_job(job_type="archive")
+    store = get_job_store()
+    with store._lock:
+        store._conn.execute("UPDATE jobs SET owner = ? WHERE job_id = ?",
+                            (f"{socket.gethostname()}:{process.pid}", orphan_id))
+
+    assert JobScheduler().fail_orphaned_jobs() == 1
+    assert get_status(orphan_id)["status"] == "failed"
+    assert get_status(live_id)["status"] == "processing"
+
+
+def test_shutdown_fails_queued_jobs():
+    scheduler = JobScheduler(max_concurrent=1, type_limits={}, max_queued=5)
+    running_id, _ = create_job(job_type="archive")
+    queued_id, _ = create_job(job_type="archive")
+    scheduler.submit("archive", running_id, time.sleep, 0.5)
+    scheduler.submit("archive", queued_id, time.sleep, 0.5)
+    assert scheduler.stats()["queued"] == {"archive": 1}
+
+    scheduler.shutdown()
+
+    assert scheduler.stats()["queued"] == {}
+    assert get_status(queued_id)["status"] == "failed"
+    assert get_status(running_id)["status"] == "processing"
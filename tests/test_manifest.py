@@ -0,0 +1,34 @@
+import threading
+import time
+
+from app.core.manifest import CollectionManifest, manifest_lock
+
+
+def test_concurrent_updates_keep_every_entry(tmp_path):
+    root = str(tmp_path)
+
+    def update(file_path):
+        with manifest_lock("shared", root=root):
+            manifest = CollectionManifest("shared", root=root)
+            # Widen the window between load and save
+            time.sleep(0.05)
+            manifest.record(file_path, "hash", [f"{file_path}-chunk"])
+            manifest.save()
+
+    threads = [threading.Thread(target=update, args=(f"file_{i}.py",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(CollectionManifest("shared", root=root).files) == [f"file_{i}.py" for i in range(8)]
+
+
+def test_lock_is_reentrant_within_a_thread(tmp_path):
+    with manifest_lock("nested", root=str(tmp_path)):
+        with manifest_lock("nested", root=str(tmp_path)):
+            manifest = CollectionManifest("nested", root=str(tmp_path))
+            manifest.record("a.py", "hash", [])
+            manifest.save()
+
+    assert CollectionManifest("nested", root=str(tmp_path)).get("a.py")["hash"] == "hash"
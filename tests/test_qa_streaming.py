@@ -0,0 +1,57 @@
+from app.services.llm_service import StubLLM
+from app.services.qa_service import QAService
+
+
+class TrackingLLM(StubLLM):
+    """Stub model that records how many fragments it produced and whether its stream was closed"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.produced = 0
+        self.closed = False
+
+    def stream(self, prompt):
+        try:
+            for token in super().stream(prompt):
+                self.produced += 1
+                yield token
+        finally:
+            self.closed = True
+
+
+def test_stub_stream_is_deterministic():
+    llm = StubLLM(words=8)
+    tokens = list(llm.stream("prompt"))
+
+    assert len(tokens) == 8
+    assert "".join(tokens) == llm.generate("prompt") == "".join(StubLLM(words=8).stream("prompt"))
+    assert llm.generate("other prompt") != llm.generate("prompt")
+
+
+def test_stream_answer_sends_sources_tokens_and_done_then_caches():
+    service = QAService(llm=StubLLM(words=5))
+    events = list(service.stream_answer("", "What is a generator?"))
+
+    assert [event for event, _ in events] == ["sources"] + ["token"] * 5 + ["done"]
+    assert events[0][1]["is_conversation"]
+    done = events[-1][1]
+    assert done["answer"] == "".join(payload["text"] for event, payload in events if event == "token")
+    assert not done["cached"]
+
+    cached = list(service.stream_answer("", "What is a generator?"))
+    assert cached[-1][1]["cached"]
+    assert cached[-1][1]["answer"] == done["answer"]
+
+
+def test_closing_the_stream_stops_generation_and_skips_the_cache():
+    llm = TrackingLLM(words=50)
+    events = QAService(llm=llm).stream_answer("", "How are streams closed?")
+    assert next(events)[0] == "sources"
+    next(events)
+    next(events)
+    events.close()
+
+    assert llm.closed
+    assert llm.produced == 2
+    rerun = list(QAService(llm=StubLLM(words=50)).stream_answer("", "How are streams closed?"))
+    assert not rerun[-1][1]["cached"]
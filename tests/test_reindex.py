@@ -0,0 +1,72 @@
+import os
+
+from app.core.chunk_locations import ChunkLocations
+from app.core.manifest import CollectionManifest
+from app.core.sharding import open_vector_store
+from app.services.code_service import CodeService
+
+
+def _function(name, lines=45):
+    # Long enough that every function becomes a chunk of its own
+    body = "".join(f"    value_{i} = values[{i}] * {i}\n" for i in range(lines))
+    return f"def {name}(values):\n{body}    return value_{lines - 1}\n"
+
+
+def _write(root, files):
+    for name, content in files.items():
+        with open(os.path.join(root, name), "w") as f:
+            f.write(content)
+    return sorted(os.path.join(root, name) for name in os.listdir(root))
+
+
+def test_duplicate_chunks_are_stored_once_and_kept_while_shared(tmp_path):
+    root = str(tmp_path)
+    paths = _write(root, {
+        "copy.py": _function("shared_helper") + "\n\n" + _function("copy_only"),
+        "util.py": _function("shared_helper") + "\n\n" + _function("util_only"),
+        "main.py": _function("main"),
+    })
+    service = CodeService()
+    indexed = service.index_files_tracked(paths, "reindex_sample", root=root)
+
+    assert service.pipeline.chunk_counts == {"stored": 4, "duplicate": 1}
+    shared = set(indexed["copy.py"]) & set(indexed["util.py"])
+    assert len(shared) == 1
+    shared_id = shared.pop()
+    copy_only = [chunk_id for chunk_id in indexed["copy.py"] if chunk_id != shared_id]
+
+    # copy.py stored the shared chunk first, removing it must not drop the chunk util.py still uses
+    os.remove(os.path.join(root, "copy.py"))
+    paths = _write(root, {"main.py": _function("main", lines=50), "new.py": _function("new_helper")})
+    result = CodeService().reindex_files(paths, "reindex_sample", root)
+
+    assert result == {"added": ["new.py"], "changed": ["main.py"], "removed": ["copy.py"], "unchanged": ["util.py"]}
+    store = open_vector_store("reindex_sample")
+    locations = ChunkLocations("reindex_sample")
+    try:
+        assert store.get([shared_id])
+        assert not store.get(copy_only)
+        assert store.count() == 4
+        assert [location["file_path"] for location in locations.locations([shared_id])[shared_id]] == ["util.py"]
+    finally:
+        store.close()
+        locations.close()
+
+    manifest = CollectionManifest("reindex_sample")
+    assert sorted(manifest.files) == ["main.py", "new.py", "util.py"]
+
+
+def test_reindex_without_changes_reads_nothing(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    paths = _write(root, {"a.py": _function("a"), "b.py": _function("b")})
+    CodeService().index_files_tracked(paths, "reindex_unchanged", root=root)
+    CodeService().reindex_files(paths, "reindex_unchanged", root)
+
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda path, *args, **kwargs: opened.append(path) or real_open(path, *args, **kwargs))
+    result = CodeService().reindex_files(paths, "reindex_unchanged", root)
+
+    assert result["unchanged"] == ["a.py", "b.py"]
+    assert not result["added"] and not result["changed"] and not result["removed"]
+    assert not [path for path in opened if str(path).startswith(root)]
@@ -0,0 +1,64 @@
+import os
+import subprocess
+
+import pytest
+
+from app.core.repo_fetcher import fetch_repository
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def _commit(repo, files):
+    for name, content in files.items():
+        path = os.path.join(repo, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "update")
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = str(tmp_path / "origin")
+    os.makedirs(repo)
+    _git(repo, "init", "-q", "-b", "main")
+    _git(repo, "config", "uploadpack.allowFilter", "true")
+    return repo
+
+
+def test_fetch_through_the_mirror_over_file_urls(tmp_path, origin):
+    first = _commit(origin, {
+        "app/main.py": b"def main():\n    return 1\n",
+        "README.md": b"# Sample\n",
+        "assets/logo.bin": b"\0\1\2\3",
+    })
+    checkouts = str(tmp_path / "checkouts")
+    target = os.path.join(checkouts, "sample")
+    fetch = lambda: fetch_repository(f"file://{origin}", target,
+                                     mirror_dir=str(tmp_path / "mirrors"), checkout_dir=checkouts)
+
+    files, stats = fetch()
+    assert sorted(os.path.relpath(path, target) for path in files) == ["README.md", "app/main.py"]
+    assert stats["commit"] == first
+    assert not stats["mirror_hit"]
+
+    os.remove(os.path.join(origin, "README.md"))
+    second = _commit(origin, {"app/util.py": b"def helper():\n    return 2\n"})
+    files, stats = fetch()
+    assert sorted(os.path.relpath(path, target) for path in files) == ["app/main.py", "app/util.py"]
+    assert stats["mirror_hit"]
+    assert stats["commit"] == second
+
+
+def test_checkout_outside_the_checkout_directory_is_refused(tmp_path, origin):
+    _commit(origin, {"main.py": b"x = 1\n"})
+    with pytest.raises(ValueError, match="outside"):
+        fetch_repository(f"file://{origin}", str(tmp_path / "elsewhere"),
+                         mirror_dir=str(tmp_path / "mirrors"), checkout_dir=str(tmp_path / "checkouts"))
@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.core.vector_store import VectorStore
+
+DIMENSION = 16
+
+
+def _batch(rng, start, size):
+    vectors = rng.standard_normal((size, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"chunk-{start + i}" for i in range(size)]
+    return ids, vectors
+
+
+def _add(store, ids, vectors):
+    store.add(ids=ids, documents=ids, embeddings=vectors.tolist(),
+              metadatas=[{"file_path": f"{chunk_id}.py"} for chunk_id in ids])
+
+
+@pytest.mark.parametrize("kind,storage", [("flat", "float32"), ("flat", "int8"), ("ivf", "float32")])
+def test_search_while_another_store_appends(tmp_path, kind, storage):
+    rng = np.random.default_rng(0)
+    writer = VectorStore("concurrent", root=str(tmp_path))
+    reader = VectorStore("concurrent", root=str(tmp_path))
+    ids, vectors = _batch(rng, 0, 200)
+    _add(writer, ids, vectors)
+    writer.configure_index(kind=kind, storage=storage, nlist=4, nprobe=4)
+
+    errors = []
+    done = threading.Event()
+
+    def write():
+        try:
+            for start in range(200, 20200, 20):
+                _add(writer, *_batch(rng, start, 20))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    searches = 0
+    query = vectors[0].tolist()
+    while not done.is_set() or searches < 10:
+        try:
+            for exact in (False, True):
+                hits = reader.search_many([query], k=5, exact=exact)[0]
+                assert hits and hits[0]["id"] == "chunk-0"
+        except Exception as e:
+            errors.append(e)
+            break
+        searches += 1
+    thread.join()
+    writer.close()
+    reader.close()
+
+    assert not errors, errors
+    assert searches >= 10
+
+
+def test_compact_keeps_search_results(tmp_path):
+    rng = np.random.default_rng(1)
+    store = VectorStore("compact", root=str(tmp_path))
+    ids, vectors = _batch(rng, 0, 400)
+    _add(store, ids, vectors)
+    store.delete(ids[::2])
+
+    assert store.compact(min_dead_fraction=0.2)
+    assert not store.compact(min_dead_fraction=0.2)
+    assert store.count() == 200
+    hits = store.search(vectors[1].tolist(), k=1)
+    assert hits[0]["id"] == "chunk-1"
+    assert "chunk-0" not in {hit["id"] for hit in store.search(vectors[0].tolist(), k=200)}
+    store.close()
+
+
+def test_rows_committed_after_the_snapshot_are_ignored(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    store = VectorStore("snapshot", root=str(tmp_path))
+    ids, vectors = _batch(rng, 0, 200)
+    _add(store, ids, vectors)
+    # As if another process committed rows 100-199 after this search mapped the file
+    monkeypatch.setattr(store, "_row_count", lambda: 100)
+
+    assert len(store.sample_vectors(200)) == 100
+    hits = store.search_many([vectors[150].tolist()], k=200, exact=True)[0]
+    assert len(hits) == 100
+    assert "chunk-150" not in {hit["id"] for hit in hits}
+    assert store.measure_recall(k=5, queries=50)["recall"] == 1.0
+    store.close()
+
+
+@pytest.mark.parametrize("kind,storage,minimum", [("flat", "float32", 1.0), ("flat", "int8", 0.9),
+                                                  ("ivf", "float32", 0.8), ("ivf", "int8", 0.75)])
+def test_recall_against_exact_scan(tmp_path, kind, storage, minimum):
+    rng = np.random.default_rng(3)
+    store = VectorStore("recall", root=str(tmp_path))
+    # Clustered vectors, like embeddings of related code
+    centers = rng.standard_normal((20, DIMENSION)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, 4000)] + 0.3 * rng.standard_normal((4000, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    _add(store, [f"chunk-{i}" for i in range(len(vectors))], vectors)
+    store.configure_index(kind=kind, storage=storage, nlist=16, nprobe=2)
+
+    result = store.measure_recall(k=10, queries=100)
+    store.close()
+
+    assert result["queries"] == 100
+    assert result["recall"] >= minimum